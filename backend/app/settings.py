@@ -68,6 +68,21 @@ MIKROTIK_URL = os.environ.get(
 )  # Use http:// or https://
 MIKROTIK_USER = os.environ.get("MIKROTIK_USER", "kamrul")
 MIKROTIK_PASS = os.environ.get("MIKROTIK_PASS", "kamrul#2025")
+# customer.services.mikrotik.MikroTikClient
+MIKROTIK_POOL_SIZE = int(os.environ.get("MIKROTIK_POOL_SIZE", 10))
+MIKROTIK_CONNECT_TIMEOUT = float(os.environ.get("MIKROTIK_CONNECT_TIMEOUT", 3))
+MIKROTIK_READ_TIMEOUT = float(os.environ.get("MIKROTIK_READ_TIMEOUT", 10))
+MIKROTIK_RETRIES = int(os.environ.get("MIKROTIK_RETRIES", 2))
+# Concurrent router calls of customer.services.suspension.bulk_toggle, which
+# opens its own pool when that's more than MIKROTIK_POOL_SIZE; the rate limit
+# is requests per second, 0 for none
+MIKROTIK_BULK_CONCURRENCY = int(os.environ.get("MIKROTIK_BULK_CONCURRENCY", 8))
+MIKROTIK_RATE_LIMIT = float(os.environ.get("MIKROTIK_RATE_LIMIT", 50))
+MIKROTIK_VERIFY_SSL = os.environ.get("MIKROTIK_VERIFY_SSL", "False").lower() in (
+    "true",
+    "1",
+    "yes",
+)
 
 # Application definition
 
@@ -79,6 +94,7 @@ DJANGO_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 ]
 PROJECT_APPS = [
     "core",
@@ -102,6 +118,7 @@ INSTALLED_APPS = DJANGO_APPS + PROJECT_APPS + THIRD_PARTY_APPS
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "common.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -159,6 +176,25 @@ DATABASES = {
     )
 }
 
+# "shared" is seen by every web and worker process, for cached data that
+# writes elsewhere must be able to invalidate
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "django_cache",
+    },
+}
+
+# Smaller responses aren't worth compressing, see common.middleware
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+
+# The revenue rollup's nulls-not-distinct unique key is only enforced on
+# PostgreSQL 15+, other databases rely on the update-then-create upsert.
+SILENCED_SYSTEM_CHECKS = ["models.W047"]
+
 # DATABASES = {
 #     "default": {
 #         "ENGINE": "django.db.backends.sqlite3",
@@ -246,9 +282,15 @@ REST_FRAMEWORK = {
     ],
     # "DEFAULT_FILTER_BACKENDS": ("django_filters.rest_framework.DjangoFilterBackend",),
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        # orjson when installed, the stdlib JSONRenderer otherwise
+        "common.renderers.ORJSONRenderer",
         # "rest_framework.renderers.BrowsableAPIRenderer",
     ],
+    "DEFAULT_PARSER_CLASSES": [
+        "common.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     # "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_THROTTLE_RATES": {"anon": "300/minute", "user": "1200/minute"},
     "DEFAULT_PAGINATION_CLASS": "common.pagination.ListPagination",
@@ -10,6 +10,7 @@ from django.http import JsonResponse
 
 from rest_framework import permissions
 from customer.views.customer import Dashboard
+from customer.views.report import DashboardTimeseries, RevenueReport
 
 def health_check(request):
     """Health check endpoint for Docker."""
@@ -30,6 +31,13 @@ urlpatterns = [
     # include core endpoints
     # Dashboard endpoints
     path("api/v1/dashboard", Dashboard.as_view(), name="dashboard"),
+    path(
+        "api/v1/dashboard/timeseries",
+        DashboardTimeseries.as_view(),
+        name="dashboard-timeseries",
+    ),
+    # Report endpoints
+    path("api/v1/reports/revenue", RevenueReport.as_view(), name="revenue-report"),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,138 @@
+"""
+Row counts for paginated lists: exact, cached by query signature, or
+estimated from the PostgreSQL planner.
+"""
+
+import hashlib
+import json
+from functools import partial
+
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from common.models import TableVersion
+
+EXACT = "exact"
+CACHED = "cached"
+ESTIMATE = "estimate"
+COUNT_MODES = (EXACT, CACHED, ESTIMATE)
+
+COUNT_CACHE_TIMEOUT = 60 * 60
+# Below this the planner's guess is too rough to be worth it, count instead
+ESTIMATE_MIN_ROWS = 10_000
+
+
+def table_versions(tables):
+    """Current write version of each of `tables`."""
+    return {table: version for table, (version, _) in table_state(tables).items()}
+
+
+def table_state(tables):
+    """
+    Write version and last write time (a Unix timestamp) of each of
+    `tables`, in one query. Tables never written start at version 1, now.
+    """
+    rows = TableVersion.objects.filter(table__in=tables).values_list(
+        "table", "version", "modified"
+    )
+    state = {table: (version, modified) for table, version, modified in rows}
+    missing = [table for table in tables if table not in state]
+    if missing:
+        TableVersion.objects.bulk_create(
+            [TableVersion(table=table) for table in missing], ignore_conflicts=True
+        )
+        rows = TableVersion.objects.filter(table__in=missing).values_list(
+            "table", "version", "modified"
+        )
+        state.update((table, (version, modified)) for table, version, modified in rows)
+    return {
+        table: (version, modified.timestamp())
+        for table, (version, modified) in state.items()
+    }
+
+
+def bump_table_version(table):
+    """
+    Invalidate cached counts and ETags of queries that read `table`.
+
+    The increment is a single UPDATE, so concurrent bumps never collapse into
+    one version the way a cache get-then-set can.
+    """
+    changes = {"version": F("version") + 1, "modified": timezone.now()}
+    if not TableVersion.objects.filter(table=table).update(**changes):
+        # First write to the table, unless a concurrent bump just created it
+        TableVersion.objects.bulk_create(
+            [TableVersion(table=table)], ignore_conflicts=True
+        )
+        TableVersion.objects.filter(table=table).update(**changes)
+
+
+def tables_changed(*models):
+    """Bump the table versions of `models` once the current transaction commits."""
+    for model in models:
+        transaction.on_commit(partial(bump_table_version, model._meta.db_table))
+
+
+def exact_count(queryset):
+    return queryset.count()
+
+
+def cached_count(queryset):
+    """
+    Exact count, cached per SQL and parameters until a write bumps the
+    version of any table the query reads.
+    """
+    query = queryset.query.chain()
+    sql, params = query.sql_with_params()
+    tables = sorted({alias.table_name for alias in query.alias_map.values()})
+    signature = json.dumps(
+        [queryset.db, sql, params, table_versions(tables)], default=str
+    )
+    key = "count:" + hashlib.sha1(signature.encode()).hexdigest()
+
+    cache = caches["shared"]
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def estimated_count(queryset):
+    """
+    Planner estimate on PostgreSQL: `reltuples` for a whole table, EXPLAIN
+    for a filtered query. Small or unknown estimates fall back to
+    `cached_count`, as does every other database.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return cached_count(queryset)
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            estimate = row[0] if row else -1
+        else:
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = plan[0]["Plan"]["Plan Rows"]
+
+    if estimate < ESTIMATE_MIN_ROWS:
+        return cached_count(queryset)
+    return int(estimate)
+
+
+COUNTERS = {EXACT: exact_count, CACHED: cached_count, ESTIMATE: estimated_count}
+
+
+def count_queryset(queryset, mode=CACHED):
+    return COUNTERS[mode](queryset)
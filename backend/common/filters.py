@@ -0,0 +1,105 @@
+"""
+Declarative query param filters for list views.
+
+Each filter names its lookup and the index that serves it, so every
+combination a list endpoint accepts stays an index search, see
+customer.tests.test_filters. Views list them in `query_filters` and add
+`IndexedFilterBackend` to `filter_backends`.
+"""
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+POSTGRESQL = ("postgresql",)
+
+
+def parse_bool(value):
+    return value.lower() == "true"
+
+
+def parse_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError("Must be an integer.")
+
+
+class QueryFilter:
+    """
+    Filter on `lookup` with the query param `param` (or one of `aliases`).
+
+    `index` names the index that serves the lookup: a Meta or migration
+    index, or a field of the filtered model whose own index does (unique
+    and foreign key fields). `vendors` lists the databases that index
+    exists on, None for all of them.
+    """
+
+    def __init__(self, param, lookup, index, parse=str, aliases=(), vendors=None):
+        self.param = param
+        self.lookup = lookup
+        self.index = index
+        self.parse = parse
+        self.aliases = aliases
+        self.vendors = vendors
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.param}>"
+
+    def get_value(self, params):
+        for name in (self.param, *self.aliases):
+            if params.get(name):
+                return params[name]
+        return None
+
+    def to_q(self, value):
+        return Q(**{self.lookup: value})
+
+    def filter(self, queryset, raw):
+        try:
+            value = self.parse(raw)
+        except ValueError as e:
+            raise ValidationError({self.param: str(e)})
+        return queryset.filter(self.to_q(value))
+
+
+class BooleanFilter(QueryFilter):
+    """`?param=true` filters on True, any other value on False."""
+
+    def __init__(self, param, lookup, index, **kwargs):
+        super().__init__(param, lookup, index, parse=parse_bool, **kwargs)
+
+    def to_q(self, value):
+        # `field=True` renders as a bare `WHERE field`, which SQLite can't
+        # match to an index; a one item IN is planned as equality
+        return Q(**{f"{self.lookup}__in": [value]})
+
+
+class ConditionFilter(QueryFilter):
+    """`?param=true` filters on `when_true`, any other value on `when_false`."""
+
+    def __init__(self, param, when_true, when_false, index, **kwargs):
+        super().__init__(param, None, index, parse=parse_bool, **kwargs)
+        self.when_true = when_true
+        self.when_false = when_false
+
+    def to_q(self, value):
+        return self.when_true if value else self.when_false
+
+
+def apply_query_filters(queryset, query_filters, params):
+    """Filter `queryset` by those of `query_filters` present in `params`."""
+    for query_filter in query_filters:
+        raw = query_filter.get_value(params)
+        if raw is not None:
+            queryset = query_filter.filter(queryset, raw)
+    return queryset
+
+
+class IndexedFilterBackend(BaseFilterBackend):
+    """Applies the view's `query_filters` present in the query string."""
+
+    def filter_queryset(self, request, queryset, view):
+        return apply_query_filters(
+            queryset, getattr(view, "query_filters", ()), request.query_params
+        )
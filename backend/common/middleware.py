@@ -0,0 +1,109 @@
+"""Response compression negotiated from Accept-Encoding."""
+
+import os
+import secrets
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip only
+    brotli = None
+
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# Quality 11 is meant for static assets, 5 compresses about as well as gzip
+# at a similar speed
+BROTLI_QUALITY = 5
+
+
+def brotli_padding(max_random_bytes):
+    """
+    A metadata meta-block of 1 to `max_random_bytes` (at most 256) random
+    bytes, which decoders skip. Only valid on a byte boundary, i.e. right
+    after a flush.
+    """
+    size = secrets.randbelow(max_random_bytes) + 1
+    # ISLAST=0, MNIBBLES=0 (metadata), reserved, MSKIPBYTES=1, MSKIPLEN - 1
+    header = 0b010110 | (size - 1) << 6
+    return header.to_bytes(2, "little") + os.urandom(size)
+
+
+def start_brotli(max_random_bytes):
+    """A compressor and the stream header it starts with, padded."""
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    header = compressor.process(b"") + compressor.flush()
+    return compressor, header + brotli_padding(max_random_bytes)
+
+
+def compress_brotli(data, max_random_bytes):
+    compressor, header = start_brotli(max_random_bytes)
+    return header + compressor.process(data) + compressor.finish()
+
+
+def compress_brotli_sequence(sequence, max_random_bytes):
+    compressor, header = start_brotli(max_random_bytes)
+    yield header
+    for item in sequence:
+        # Flush per chunk so streamed rows reach the client as they're made
+        data = compressor.process(item) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Brotli (when installed) or gzip for JSON, NDJSON, CSV and text responses
+    of at least COMPRESSION_MIN_SIZE bytes; streamed responses always.
+
+    Customer responses carry PPP passwords and credentials next to echoed
+    query parameters, which is what BREACH needs. As GZipMiddleware does for
+    gzip (max_random_bytes), brotli output gets up to that many random bytes
+    of padding, here as a metadata block. That only blurs compressed lengths
+    so an attack needs many more requests, at a cost of up to ~100 bytes a
+    response; it is a mitigation, not a fix.
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get("Content-Type", "")
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        min_size = settings.COMPRESSION_MIN_SIZE
+        if not response.streaming and len(response.content) < min_size:
+            return response
+
+        accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if (
+            brotli is None
+            or not re_accepts_brotli.search(accept_encoding)
+            or response.has_header("Content-Encoding")
+            or (response.streaming and response.is_async)
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if response.streaming:
+            response.streaming_content = compress_brotli_sequence(
+                response.streaming_content, self.max_random_bytes
+            )
+            del response.headers["Content-Length"]
+        else:
+            compressed_content = compress_brotli(
+                response.content, self.max_random_bytes
+            )
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers["Content-Length"] = str(len(response.content))
+
+        # Weak, as GZipMiddleware does, so conditional requests still match
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
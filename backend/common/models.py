@@ -3,10 +3,39 @@
 import uuid
 
 from django.db import models
+from django.utils import timezone
 
 from common.choices import Status
 
 
+class LoadedValuesMixin:
+    """
+    Remember the values of `tracked_fields` as last read from the database.
+
+    Lets signal receivers see what changed on save without re-reading the row.
+    """
+
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value
+            for name, value in zip(field_names, values)
+            if name in cls.tracked_fields
+        }
+        return instance
+
+    @property
+    def loaded_values(self):
+        """Tracked values as stored in the database, empty for unsaved rows."""
+        return getattr(self, "_loaded_values", {})
+
+    def remember_loaded_values(self, values):
+        self._loaded_values = dict(values)
+
+
 class BaseModelWithUID(models.Model):
     uid = models.UUIDField(
         default=uuid.uuid4,
@@ -65,3 +94,17 @@ class NameDescriptionBaseModel(BaseModelWithUID):
 
     class Meta:
         abstract = True
+
+
+class TableVersion(models.Model):
+    """
+    Write version of a table, bumped with an atomic UPDATE after every
+    committed write to it. Keys cached counts and ETags, see common.counts.
+    """
+
+    table = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=1)
+    modified = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
@@ -1,12 +1,170 @@
+import base64
+import json
+from datetime import datetime
+from functools import cached_property, partial
+
+from django.core.paginator import EmptyPage, Paginator
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from common.counts import CACHED, COUNT_MODES, ESTIMATE, count_queryset
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = "page_size"
 
 
+class CountingPaginator(Paginator):
+    """Paginator whose total comes from common.counts in the given mode."""
+
+    def __init__(self, *args, count_mode=CACHED, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_mode = count_mode
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, "query"):
+            return super().count
+        return count_queryset(self.object_list, self.count_mode)
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # An estimate may fall short of the real count, serve pages past it
+            if self.count_mode == ESTIMATE and int(number) > 1:
+                return int(number)
+            raise
+
+    def page(self, number):
+        if self.count_mode != ESTIMATE:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom : bottom + self.per_page], number, self
+        )
+
+
 class ListPagination(PageNumberPagination):
+    """
+    Page number pagination, or keyset pagination over (created_at, id) when
+    the request opts in with `?pagination=cursor` or passes a `cursor`.
+
+    Keyset pages cost the same at any depth: there is no COUNT and no OFFSET,
+    `count` is null and `next`/`previous` carry opaque cursors.
+
+    In page number mode `count_mode` picks how the total is counted: `exact`,
+    `cached` (the default, invalidated on writes) or `estimate`.
+    """
+
     page_size_query_param = "page_size"
+    pagination_query_param = "pagination"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+    count_mode_query_param = "count_mode"
+    default_count_mode = CACHED
+
+    def get_count_mode(self, request):
+        mode = request.query_params.get(
+            self.count_mode_query_param, self.default_count_mode
+        )
+        if mode not in COUNT_MODES:
+            message = f"Must be one of: {', '.join(COUNT_MODES)}."
+            raise ValidationError({self.count_mode_query_param: message})
+        return mode
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.pagination_query_param) == "cursor"
+            or self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.use_cursor(request)
+        if not self.cursor_mode:
+            self.django_paginator_class = partial(
+                CountingPaginator, count_mode=self.get_count_mode(request)
+            )
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        position, reverse = self.decode_cursor(request)
+
+        if reverse:
+            queryset = queryset.order_by("created_at", "id")
+        else:
+            queryset = queryset.order_by("-created_at", "-id")
+        if position is not None:
+            created_at, pk = position
+            if reverse:
+                # The first condition alone bounds the index range scan
+                queryset = queryset.filter(created_at__gte=created_at).filter(
+                    Q(created_at__gt=created_at) | Q(id__gt=pk)
+                )
+            else:
+                queryset = queryset.filter(created_at__lte=created_at).filter(
+                    Q(created_at__lt=created_at) | Q(id__lt=pk)
+                )
+
+        results = list(queryset[: page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        # Coming back from a later page there's always a next one, and vice versa
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = has_more if reverse else position is not None
+        self.page_results = results
+        return results
+
+    def decode_cursor(self, request):
+        """Return ((created_at, id) or None, reverse) from the request's cursor."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded))
+            position = (datetime.fromisoformat(data["c"]), int(data["i"]))
+            return position, bool(data.get("r"))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance, reverse):
+        # `instance` may also be a named values_list() row, see common.projection
+        data = {"c": instance.created_at.isoformat(), "i": instance.id}
+        if reverse:
+            data["r"] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(data, separators=(",", ":")).encode()
+        )
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, encoded.decode().rstrip("=")
+        )
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next or not self.page_results:
+            return None
+        return self.encode_cursor(self.page_results[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page_results:
+            return None
+        return self.encode_cursor(self.page_results[0], reverse=True)
 
     def get_paginated_response(self, data):
         from rest_framework.response import Response
@@ -17,7 +175,7 @@ class ListPagination(PageNumberPagination):
                 "code": status.HTTP_200_OK,
                 "next": self.get_next_link(),
                 "previous": self.get_previous_link(),
-                "count": self.page.paginator.count,
+                "count": None if self.cursor_mode else self.page.paginator.count,
                 "results": data,
             }
         )
@@ -0,0 +1,155 @@
+"""
+Read-only projections: serialize list rows straight from `values_list()`
+instead of model instances and per-row serializer field calls.
+
+A projection is compiled once per serializer class and field set into a
+`values_list()` column list and a generated row -> dict function whose
+output is identical to the serializer's `to_representation()`.
+"""
+
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import fields as drf_fields
+from rest_framework import relations
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+from common.serializers import prune_fields
+
+# Converters for field types whose to_representation() is a plain builtin
+BUILTIN_CONVERTERS = {
+    drf_fields.CharField: "str",
+    drf_fields.EmailField: "str",
+    drf_fields.IntegerField: "int",
+    drf_fields.BooleanField: "bool",
+    drf_fields.ReadOnlyField: "",
+}
+# Extra columns list views read from rows, e.g. for keyset cursors
+ROW_COLUMNS = ("id", "created_at")
+# Field sets come from ?fields=, so only keep the most recently used ones
+PROJECTION_CACHE_SIZE = 256
+
+
+class NotProjectable(Exception):
+    """The serializer has a field a projection can't reproduce."""
+
+
+def field_signature(serializer):
+    return tuple(
+        (name, field_signature(field) if isinstance(field, BaseSerializer) else None)
+        for name, field in serializer.fields.items()
+        if not field.write_only
+    )
+
+
+def get_projection(serializer):
+    """
+    Compiled projection for a serializer instance (as pruned by sparse
+    fieldsets), cached per class and field set.
+
+    Raises:
+        NotProjectable: If a field has no column to project from.
+    """
+    projection = _cached_projection(type(serializer), field_signature(serializer))
+    if projection is None:
+        raise NotProjectable(type(serializer).__name__)
+    return projection
+
+
+def signature_tree(signature):
+    """The `prune_fields()` include tree that keeps the fields of a signature."""
+    return {
+        name: {} if nested is None else signature_tree(nested)
+        for name, nested in signature
+    }
+
+
+@lru_cache(maxsize=PROJECTION_CACHE_SIZE)
+def _cached_projection(serializer_class, signature):
+    """Projection for a field signature, or None if it isn't projectable."""
+    serializer = serializer_class()
+    prune_fields(serializer, signature_tree(signature), {})
+    try:
+        return Projection(serializer)
+    except NotProjectable:
+        return None
+
+
+class Projection:
+    def __init__(self, serializer):
+        self.columns = []
+        self._positions = {}
+        self._namespace = {}
+        model = serializer.Meta.model
+        body = self._compile(serializer, model, "")
+        for name in ROW_COLUMNS:
+            if any(field.name == name for field in model._meta.concrete_fields):
+                self._column(name)
+
+        source = f"def project(r):\n    return {body}\n"
+        code = compile(source, f"<projection {type(serializer).__name__}>", "exec")
+        exec(code, self._namespace)
+        self.project = self._namespace["project"]
+
+    def queryset(self, queryset):
+        """Rows for `project()`; named so list views can read `row.id` etc."""
+        return queryset.values_list(*self.columns, named=True)
+
+    def _column(self, path):
+        if path not in self._positions:
+            self._positions[path] = len(self.columns)
+            self.columns.append(path)
+        return f"r[{self._positions[path]}]"
+
+    def _converter(self, field):
+        if type(field) in BUILTIN_CONVERTERS:
+            return BUILTIN_CONVERTERS[type(field)]
+        if isinstance(field, drf_fields.UUIDField) and field.uuid_format == "hex_verbose":
+            return "str"
+        if (
+            isinstance(field, relations.PrimaryKeyRelatedField)
+            and field.pk_field is None
+        ):
+            return ""
+        if isinstance(field, (relations.RelatedField, drf_fields.FileField)):
+            # Hyperlinks and file URLs need the request
+            raise NotProjectable(field.field_name)
+        name = f"c{len(self._namespace)}"
+        self._namespace[name] = field.to_representation
+        return name
+
+    def _compile(self, serializer, model, prefix):
+        items = []
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            if (
+                field.source == "*"
+                or "." in field.source
+                or isinstance(field, drf_fields.SerializerMethodField)
+                or isinstance(field, ListSerializer)
+            ):
+                raise NotProjectable(field.field_name)
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise NotProjectable(field.field_name)
+            if not model_field.concrete or model_field.many_to_many:
+                raise NotProjectable(field.field_name)
+
+            value = self._column(prefix + field.source)
+            if isinstance(field, BaseSerializer):
+                if not model_field.is_relation:
+                    raise NotProjectable(field.field_name)
+                nested = self._compile(
+                    field, model_field.related_model, f"{prefix}{field.source}__"
+                )
+                expression = f"None if {value} is None else {nested}"
+            else:
+                converted = f"{self._converter(field)}({value})"
+                if model_field.null or model_field.is_relation:
+                    expression = f"None if {value} is None else {converted}"
+                else:
+                    expression = converted
+            items.append(f"{field.field_name!r}: {expression}")
+        return "{" + ", ".join(items) + "}"
@@ -0,0 +1,161 @@
+"""
+API renderers and parsers: orjson backed JSON, and row-by-row exports
+(see common.views.StreamingListMixin).
+"""
+
+import csv
+import io
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.serializers import BaseSerializer, ListSerializer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional, the stdlib json renderer and parser are used
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer on orjson, with the same output for what the API renders:
+    types orjson doesn't encode like DRF (Decimal, datetimes, lazy
+    strings...) go through DRF's JSONEncoder. Indented or ASCII-only output
+    and a missing orjson fall back to the stdlib renderer.
+    """
+
+    options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        stdlib = orjson is None or self.ensure_ascii or not self.compact
+        if stdlib or indent is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default, option=self.options
+            )
+        except TypeError:
+            # Beyond orjson, e.g. integers over 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like JSONRenderer, for a strict javascript subset
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser on orjson; without orjson or for non UTF-8 bodies, JSONParser."""
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+class JSONArrayRenderer:
+    """Streams rows as one JSON array, the shape of an unpaginated list."""
+
+    media_type = "application/json"
+    format = "json"
+
+    def stream(self, rows):
+        encoder = JSONEncoder(ensure_ascii=False)
+        yield "["
+        for index, row in enumerate(rows):
+            yield ("," if index else "") + encoder.encode(row)
+        yield "]"
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline delimited JSON, one row per line."""
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return "".join(self.stream(rows)).encode(self.charset)
+
+    def stream(self, rows):
+        encoder = JSONEncoder(ensure_ascii=False)
+        for row in rows:
+            yield encoder.encode(row) + "\n"
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    CSV with a header row. Nested objects are flattened to dotted columns,
+    e.g. `customer.name`; without explicit columns the first row sets them.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return "".join(self.stream(rows)).encode(self.charset)
+
+    def stream(self, rows, columns=None):
+        buffer = io.StringIO()
+
+        def flush():
+            value = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return value
+
+        writer = None
+        if columns:
+            writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            yield flush()
+        for row in rows:
+            row = flatten_row(row)
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+            yield flush()
+
+
+def flatten_row(row, prefix=""):
+    flat = {}
+    for key, value in row.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_row(value, f"{name}."))
+        elif isinstance(value, list):
+            flat[name] = json.dumps(value, cls=JSONEncoder)
+        else:
+            flat[name] = "" if value is None else value
+    return flat
+
+
+def csv_columns(serializer, prefix=""):
+    """Dotted column names of the fields a serializer outputs."""
+    columns = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, BaseSerializer) and not isinstance(field, ListSerializer):
+            columns += csv_columns(field, f"{prefix}{name}.")
+        else:
+            columns.append(f"{prefix}{name}")
+    return columns
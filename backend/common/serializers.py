@@ -1,6 +1,13 @@
 """Common Serializers for our app."""
 
-from rest_framework.serializers import ModelSerializer, HyperlinkedModelSerializer
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import BaseSerializer as DRFBaseSerializer
+from rest_framework.serializers import (
+    HyperlinkedModelSerializer,
+    ListSerializer,
+    ModelSerializer,
+)
 
 
 class BaseSerializer(ModelSerializer):
@@ -29,3 +36,122 @@ class LinkSerializer(HyperlinkedModelSerializer):
             "id",
             "uid",
         )
+
+
+def parse_field_paths(value):
+    """Turn "id,name,package.name" into {"id": {}, "name": {}, "package": {"name": {}}}."""
+    tree = {}
+    for path in (value or "").split(","):
+        path = path.strip()
+        if not path:
+            continue
+        node = tree
+        for name in path.split("."):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def prune_fields(serializer, include, exclude, prefix=""):
+    """Drop fields of `serializer` (and nested serializers) per the parsed trees."""
+    unknown = [
+        prefix + name for name in (*include, *exclude) if name not in serializer.fields
+    ]
+    if unknown:
+        raise ValidationError({"fields": f"Unknown field(s): {', '.join(unknown)}."})
+
+    for name in list(serializer.fields):
+        if include and name not in include:
+            serializer.fields.pop(name)
+        elif exclude.get(name) == {}:
+            serializer.fields.pop(name)
+        elif include.get(name) or exclude.get(name):
+            nested = serializer.fields[name]
+            if not isinstance(nested, DRFBaseSerializer) or isinstance(
+                nested, ListSerializer
+            ):
+                raise ValidationError(
+                    {"fields": f"{prefix}{name} has no nested fields."}
+                )
+            prune_fields(
+                nested, include.get(name, {}), exclude.get(name, {}), f"{prefix}{name}."
+            )
+
+
+class SparseFieldsMixin:
+    """
+    Let GET requests pick the output fields with `?fields=` and/or
+    `?exclude=`, comma separated, dotted for nested serializers
+    (`?fields=id,name,package.name`).
+
+    See common.views.SparseFieldsViewMixin for pruning the queryset to match.
+    """
+
+    fields_query_param = "fields"
+    exclude_query_param = "exclude"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None or request.method not in ("GET", "HEAD"):
+            return
+        include = parse_field_paths(request.query_params.get(self.fields_query_param))
+        exclude = parse_field_paths(request.query_params.get(self.exclude_query_param))
+        if include or exclude:
+            prune_fields(self, include, exclude)
+
+
+def sparse_queryset(queryset, serializer, always=()):
+    """
+    Limit `queryset` to the columns and joins `serializer` reads: only() the
+    model fields behind its fields (plus `always`) and select_related() the
+    forward relations behind its nested serializers. Falls back to loading
+    every column, and keeping the view's joins, when a field's source can't
+    be mapped to the model.
+    """
+    columns, relations = list(always), []
+    complete = _collect_sources(serializer, queryset.model, "", columns, relations)
+    if complete:
+        # Only the joins the remaining fields read
+        queryset = queryset.select_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    if complete:
+        queryset = queryset.only(*columns, *relations)
+    return queryset
+
+
+def _collect_sources(serializer, model, prefix, columns, relations):
+    complete = True
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == "*" or "." in field.source:
+            complete = False
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            complete = False
+            continue
+
+        nested = isinstance(field, DRFBaseSerializer) and not isinstance(
+            field, ListSerializer
+        )
+        if nested and (model_field.many_to_one or model_field.one_to_one):
+            if not model_field.concrete:
+                # Reverse one-to-one, can't be pruned with only()
+                complete = False
+                continue
+            relations.append(prefix + field.source)
+            complete &= _collect_sources(
+                field,
+                model_field.related_model,
+                f"{prefix}{field.source}__",
+                columns,
+                relations,
+            )
+        elif model_field.concrete and not model_field.many_to_many:
+            columns.append(prefix + field.source)
+        else:
+            complete = False
+    return complete
@@ -0,0 +1,15 @@
+"""Signal receivers shared by every app."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from common.counts import tables_changed
+from common.models import BaseModelWithUID
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_counted_table(sender, **kwargs):
+    # Listed models all derive from BaseModelWithUID, skip ledger tables
+    if issubclass(sender, BaseModelWithUID):
+        tables_changed(sender)
@@ -1,7 +1,18 @@
 """Common views that will be used in another app."""
 
+import hashlib
+import json
+import math
+import time
+
 from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.generics import (
     ListAPIView,
     CreateAPIView,
@@ -9,12 +20,268 @@ from rest_framework.generics import (
     RetrieveUpdateDestroyAPIView,
 )
 
+from common.counts import table_state
 from common.helpers import pk_extractor
 from common.pagination import CustomPagination
+from common.projection import NotProjectable, get_projection
+from common.serializers import SparseFieldsMixin, sparse_queryset
 from common.choices import Status
+from common.renderers import (
+    CSVRenderer,
+    JSONArrayRenderer,
+    NDJSONRenderer,
+    csv_columns,
+)
 
 
-class ListAPICustomView(ListAPIView):
+class ConditionalGetMixin:
+    """
+    ETag and Last-Modified on GET, answering a matching conditional request
+    with 304 before the view runs its query or serializes anything.
+
+    By default the validators come from the write versions of the tables of
+    `conditional_models` (common.counts), which every save and delete bumps.
+    Override `get_validators()` for other sources.
+
+    HTTP dates are whole seconds, so Last-Modified is rounded up to the end
+    of the second and only sent once that second is over: a later write in
+    the same second would otherwise be answered 304 to If-Modified-Since.
+    The ETag is always sent and wins when a client sends both.
+    """
+
+    conditional_models = ()
+
+    def get_validators(self, request):
+        """Return (etag state, last modified timestamp), or (None, None) to skip."""
+        state = table_state(
+            sorted({model._meta.db_table for model in self.conditional_models})
+        )
+        last_modified = max((modified for _, modified in state.values()), default=None)
+        # Both, so the ETag changes even if two writes ever shared a version
+        return state, last_modified
+
+    def get_etag(self, request, state):
+        signature = json.dumps(
+            [
+                type(self).__name__,
+                request.get_full_path(),
+                request.accepted_media_type,
+                state,
+            ],
+            default=str,
+        )
+        return quote_etag(hashlib.sha1(signature.encode()).hexdigest())
+
+    def conditional_get(self, request, handler, *args, **kwargs):
+        state, last_modified = self.get_validators(request)
+        if state is None:
+            return handler(request, *args, **kwargs)
+
+        etag = self.get_etag(request, state)
+        if last_modified is not None:
+            last_modified = math.floor(last_modified) + 1
+            if last_modified > time.time():
+                last_modified = None
+        not_modified = get_conditional_response(
+            request._request, etag=etag, last_modified=last_modified
+        )
+        response = not_modified or handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+            # Let browsers keep the response but revalidate it on every use
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get(self, request, *args, **kwargs):
+        return self.conditional_get(request, super().get, *args, **kwargs)
+
+
+class StreamingListMixin:
+    """
+    Stream the whole list instead of a page for `?page_size=showall` or an
+    export format (`?format=ndjson|csv` or the matching Accept header).
+
+    Rows are read with a server-side cursor in chunks and serialized one at a
+    time, so memory stays flat and the first row is sent before the query is
+    exhausted.
+    """
+
+    stream_chunk_size = 2000
+    streaming_renderer_classes = (NDJSONRenderer, CSVRenderer)
+
+    def get_renderers(self):
+        return super().get_renderers() + [
+            renderer() for renderer in self.streaming_renderer_classes
+        ]
+
+    def wants_stream(self, request):
+        return request.query_params.get("page_size") == "showall" or isinstance(
+            request.accepted_renderer, self.streaming_renderer_classes
+        )
+
+    def list(self, request, *args, **kwargs):
+        if self.wants_stream(request):
+            return self.stream_list(request.accepted_renderer)
+        return super().list(request, *args, **kwargs)
+
+    def iter_rows(self, queryset):
+        """Serialized rows of `queryset`, read in chunks."""
+        serializer_class = self.get_serializer_class()
+        context = self.get_serializer_context()
+        for instance in queryset.iterator(chunk_size=self.stream_chunk_size):
+            yield serializer_class(instance, context=context).data
+
+    def stream_list(self, renderer):
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = self.iter_rows(queryset)
+
+        if isinstance(renderer, CSVRenderer):
+            content = renderer.stream(rows, csv_columns(self.get_serializer()))
+        elif isinstance(renderer, NDJSONRenderer):
+            content = renderer.stream(rows)
+        else:
+            renderer = JSONArrayRenderer()
+            content = renderer.stream(rows)
+
+        response = StreamingHttpResponse(
+            content, content_type=f"{renderer.media_type}; charset=utf-8"
+        )
+        if isinstance(renderer, CSVRenderer):
+            name = queryset.model._meta.verbose_name_plural.lower().replace(" ", "_")
+            response["Content-Disposition"] = f'attachment; filename="{name}.csv"'
+        return response
+
+
+class ProjectionListMixin(StreamingListMixin):
+    """
+    Serve GET lists from a compiled projection (common.projection) of the
+    serializer instead of model instances, when every field can be projected.
+    Output is the same; falls back to the serializer otherwise.
+    """
+
+    def get_projection(self):
+        try:
+            return get_projection(self.get_serializer())
+        except NotProjectable:
+            return None
+
+    def list(self, request, *args, **kwargs):
+        projection = self.get_projection()
+        if projection is None or self.wants_stream(request):
+            return super().list(request, *args, **kwargs)
+
+        queryset = projection.queryset(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            data = [projection.project(row) for row in page]
+            return self.get_paginated_response(data)
+        return Response([projection.project(row) for row in queryset])
+
+    def iter_rows(self, queryset):
+        projection = self.get_projection()
+        if projection is None:
+            yield from super().iter_rows(queryset)
+            return
+        rows = projection.queryset(queryset)
+        for row in rows.iterator(chunk_size=self.stream_chunk_size):
+            yield projection.project(row)
+
+
+class SparseFieldsViewMixin:
+    """
+    When a GET asks for `?fields=`/`?exclude=`, fetch only the columns and
+    joins the pruned serializer outputs. Pair with a serializer using
+    common.serializers.SparseFieldsMixin.
+    """
+
+    # Read by keyset pagination cursors whatever the serializer outputs
+    sparse_always_fields = ("created_at",)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        params = self.request.query_params
+        if self.request.method not in ("GET", "HEAD") or not (
+            params.get(SparseFieldsMixin.fields_query_param)
+            or params.get(SparseFieldsMixin.exclude_query_param)
+        ):
+            return queryset
+        return sparse_queryset(
+            queryset, self.get_serializer(), always=self.sparse_always_fields
+        )
+
+
+class BulkWriteView(APIView):
+    """
+    POST an array of items, each validated by `serializer_class` on its own,
+    and write the valid ones with one `perform_bulk()` call.
+
+    `perform_bulk(entries, user)` gets {position: validated_data} and returns
+    {position: (created, instance)}, or (None, errors) for items it rejects.
+    The response has a result per position, in request order.
+    """
+
+    serializer_class = None
+    max_items = 1000
+
+    def get_serializer_context(self):
+        return {"request": self.request, "format": self.format_kwarg, "view": self}
+
+    def perform_bulk(self, entries, user):
+        raise NotImplementedError
+
+    def post(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"error": "Expected a non-empty list of items."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > self.max_items:
+            return Response(
+                {"error": f"At most {self.max_items} items per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        context = self.get_serializer_context()
+        entries, results = {}, {}
+        for position, item in enumerate(items):
+            serializer = self.serializer_class(data=item, context=context)
+            if serializer.is_valid():
+                entries[position] = serializer.validated_data
+            else:
+                results[position] = (None, serializer.errors)
+        if entries:
+            results.update(self.perform_bulk(entries, request.user))
+
+        response = {"created": 0, "updated": 0, "failed": 0, "results": []}
+        for position in range(len(items)):
+            created, value = results[position]
+            if created is None:
+                response["failed"] += 1
+                response["results"].append(
+                    {"index": position, "status": "error", "errors": value}
+                )
+                continue
+            outcome = "created" if created else "updated"
+            response[outcome] += 1
+            response["results"].append(
+                {
+                    "index": position,
+                    "status": outcome,
+                    "data": self.serializer_class(value, context=context).data,
+                }
+            )
+
+        succeeded = response["created"] + response["updated"]
+        return Response(
+            response,
+            status=status.HTTP_200_OK if succeeded else status.HTTP_400_BAD_REQUEST,
+        )
+
+
+class ListAPICustomView(SparseFieldsViewMixin, StreamingListMixin, ListAPIView):
     available_permission_classes = ()
 
     def pagination_class(self):
@@ -78,7 +345,9 @@ class CreateAPICustomView(CreateAPIView):
         serializer.save(**self.create_data)
 
 
-class ListCreateAPICustomView(ListCreateAPIView):
+class ListCreateAPICustomView(
+    SparseFieldsViewMixin, StreamingListMixin, ListCreateAPIView
+):
     available_permission_classes = ()
     create_data = {}
 
@@ -6,6 +6,8 @@ from rest_framework import status
 from rest_framework import serializers
 from rest_framework.exceptions import APIException
 
+from common.serializers import SparseFieldsMixin
+
 
 User = get_user_model()
 
@@ -19,7 +21,7 @@ class UserLiteSerializer(serializers.ModelSerializer):
         read_only_fields = ("id", "uid")
 
 
-class UserListSerializer(serializers.ModelSerializer):
+class UserListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = (
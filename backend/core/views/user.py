@@ -21,6 +21,7 @@ from rest_framework.generics import (
 #     # AllowAny,
 # )
 
+from common.views import SparseFieldsViewMixin, StreamingListMixin
 from core.token_authentication import JWTAuthentication
 from core.serializers.user import (
     UserListSerializer,
@@ -41,7 +42,7 @@ from core.permissions import (
 User = get_user_model()
 
 
-class UserList(ListCreateAPIView):
+class UserList(SparseFieldsViewMixin, StreamingListMixin, ListCreateAPIView):
     permission_classes = (IsAdminUser | IsManager | IsStaff,)
     serializer_class = UserListSerializer
     queryset = User().get_all_actives()
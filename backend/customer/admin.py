@@ -2,7 +2,15 @@ from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from unfold.admin import ModelAdmin
 
-from customer.models import Package, Customer, Payment
+from customer.models import (
+    Package,
+    Customer,
+    Payment,
+    BillingRun,
+    BulkToggleRun,
+    RouterCommand,
+    RouterSecretSnapshot,
+)
 
 
 class PackageAdmin(ModelAdmin):
@@ -22,9 +30,66 @@ admin.site.register(Customer, CustomerAdmin)
 
 
 class PaymentAdmin(ModelAdmin):
-    list_display = ("id", "customer", "amount", "billing_month", "entry_by", "paid", "payment_date")
+    list_display = ("id", "customer", "amount", "billing_period", "entry_by", "paid", "payment_date")
     search_fields = ("customer__name", "amount", "billing_month", "entry_by__first_name")
-    list_filter = ("paid", "billing_month", "entry_by")
+    list_filter = ("paid", "billing_period", "entry_by")
 
 
 admin.site.register(Payment, PaymentAdmin)
+
+
+class BillingRunAdmin(ModelAdmin):
+    list_display = (
+        "id",
+        "billing_period",
+        "state",
+        "created_count",
+        "total_bill_amount",
+        "started_at",
+        "finished_at",
+    )
+    list_filter = ("state", "billing_period")
+
+
+admin.site.register(BillingRun, BillingRunAdmin)
+
+
+class BulkToggleRunAdmin(ModelAdmin):
+    list_display = (
+        "id",
+        "is_active",
+        "state",
+        "updated_count",
+        "failed_count",
+        "started_at",
+        "finished_at",
+    )
+    list_filter = ("state", "is_active")
+
+
+admin.site.register(BulkToggleRun, BulkToggleRunAdmin)
+
+
+class RouterCommandAdmin(ModelAdmin):
+    list_display = (
+        "id",
+        "username",
+        "disable",
+        "state",
+        "attempts",
+        "next_attempt_at",
+        "sent_at",
+    )
+    list_filter = ("state", "disable")
+    search_fields = ("username",)
+
+
+admin.site.register(RouterCommand, RouterCommandAdmin)
+
+
+class RouterSecretSnapshotAdmin(ModelAdmin):
+    list_display = ("id", "username", "secret_id", "digest", "updated_at")
+    search_fields = ("username",)
+
+
+admin.site.register(RouterSecretSnapshot, RouterSecretSnapshotAdmin)
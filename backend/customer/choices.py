@@ -37,3 +37,22 @@ class Months(TextChoices):
     OCTOBER = "OCTOBER", "October"
     NOVEMBER = "NOVEMBER", "November"
     DECEMBER = "DECEMBER", "December"
+
+
+class BillingRunState(TextChoices):
+    """Choices for the state of a background job: billing runs, ranges, bulk toggles."""
+
+    PENDING = "PENDING", "Pending"
+    RUNNING = "RUNNING", "Running"
+    COMPLETED = "COMPLETED", "Completed"
+    FAILED = "FAILED", "Failed"
+
+
+class RouterCommandState(TextChoices):
+    """Choices for the state of a queued router command."""
+
+    PENDING = "PENDING", "Pending"
+    SENDING = "SENDING", "Sending"
+    SENT = "SENT", "Sent"
+    SUPERSEDED = "SUPERSEDED", "Superseded"
+    FAILED = "FAILED", "Failed"
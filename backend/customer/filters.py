@@ -0,0 +1,72 @@
+"""Query param filters of the customer and payment list endpoints."""
+
+from django.db.models import Q
+
+from common.filters import (
+    POSTGRESQL,
+    BooleanFilter,
+    ConditionFilter,
+    QueryFilter,
+    parse_int,
+)
+from customer.utils import parse_billing_period
+
+# Trigram indexes over UPPER(column) serve `icontains`, PostgreSQL only
+CUSTOMER_NAME_TRGM_INDEX = "customer_name_upper_trgm_idx"
+CUSTOMER_USERNAME_TRGM_INDEX = "customer_username_upper_trgm_idx"
+USER_FIRST_NAME_TRGM_INDEX = "user_first_name_upper_trgm_idx"
+
+CUSTOMER_FILTERS = (
+    QueryFilter(
+        "name",
+        "name__icontains",
+        index=CUSTOMER_NAME_TRGM_INDEX,
+        vendors=POSTGRESQL,
+    ),
+    QueryFilter(
+        "username",
+        "username__icontains",
+        index=CUSTOMER_USERNAME_TRGM_INDEX,
+        vendors=POSTGRESQL,
+    ),
+    QueryFilter("user_id", "user_id", index="user", parse=parse_int),
+    QueryFilter("phone", "phone", index="customer_phone_idx"),
+    QueryFilter(
+        "package_id",
+        "package_id",
+        index="customer_package_active_idx",
+        parse=parse_int,
+    ),
+    BooleanFilter("is_active", "is_active", index="customer_active_created_idx"),
+    BooleanFilter("is_free", "is_free", index="customer_free_created_idx"),
+    ConditionFilter(
+        "has_dues",
+        when_true=Q(outstanding_amount__gt=0),
+        when_false=Q(outstanding_amount__lte=0),
+        index="customer_outstanding_idx",
+    ),
+)
+
+PAYMENT_FILTERS = (
+    BooleanFilter("paid", "paid", index="payment_paid_created_idx"),
+    QueryFilter(
+        "period",
+        "billing_period",
+        index="payment_period_paid_idx",
+        parse=parse_billing_period,
+        aliases=("month",),
+    ),
+    QueryFilter(
+        "collected_by",
+        "entry_by__first_name__icontains",
+        index=USER_FIRST_NAME_TRGM_INDEX,
+        vendors=POSTGRESQL,
+    ),
+    QueryFilter("customer_phone", "customer__phone", index="customer_phone_idx"),
+    QueryFilter(
+        "customer_name",
+        "customer__name__icontains",
+        index=CUSTOMER_NAME_TRGM_INDEX,
+        vendors=POSTGRESQL,
+    ),
+)
@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from common.projection import get_projection
+from customer.models import Customer, Payment
+from customer.serializers.customer import CustomerListSerializer
+from customer.serializers.payment import PaymentListSerializer
+
+BENCHMARKS = {
+    "customers": (
+        CustomerListSerializer,
+        lambda: Customer().get_all_actives().select_related("package"),
+    ),
+    "payments": (
+        PaymentListSerializer,
+        lambda: Payment().get_all_actives().select_related("customer", "entry_by"),
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare list serialization through the serializer and through its "
+        "projection on existing rows, and check the output is identical"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="20,100,1000")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        renderer = JSONRenderer()
+
+        for name, (serializer_class, get_queryset) in BENCHMARKS.items():
+            projection = get_projection(serializer_class())
+            for size in sizes:
+
+                def serialized():
+                    rows = list(get_queryset()[:size])
+                    return renderer.render(serializer_class(rows, many=True).data)
+
+                def projected():
+                    rows = projection.queryset(get_queryset())[:size]
+                    return renderer.render([projection.project(row) for row in rows])
+
+                if serialized() != projected():
+                    raise CommandError(f"{name}: projection output differs")
+                rows = get_queryset()[:size].count()
+                before = self.timed(serialized, options["repeat"])
+                after = self.timed(projected, options["repeat"])
+                self.stdout.write(
+                    f"{name:<10} page_size={size:<5} rows={rows:<5} "
+                    f"serializer={before:8.2f}ms projection={after:8.2f}ms "
+                    f"speedup={before / after:5.1f}x"
+                )
+
+    def timed(self, function, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            function()
+        return (time.perf_counter() - start) * 1000 / repeat
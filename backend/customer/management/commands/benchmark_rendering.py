@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from common.middleware import BROTLI_QUALITY, brotli
+from common.projection import get_projection
+from common.renderers import ORJSONRenderer, orjson
+from customer.models import Payment
+from customer.serializers.payment import PaymentListSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Time JSON rendering of a PaymentsList page with the stdlib and orjson "
+        "renderers, and compare response sizes with gzip and brotli"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        queryset = Payment().get_all_actives().select_related("customer", "entry_by")
+        projection = get_projection(PaymentListSerializer())
+        rows = projection.queryset(queryset)[: options["size"]]
+        results = [projection.project(row) for row in rows]
+        # The paginated envelope, as ListPagination returns it
+        data = {
+            "code": 200,
+            "next": None,
+            "previous": None,
+            "count": len(results),
+            "results": results,
+        }
+
+        content = JSONRenderer().render(data)
+        self.stdout.write(f"rows={len(results)}")
+        self.report("json", content, JSONRenderer().render, data, repeat)
+        if orjson is None:
+            self.stdout.write("orjson     not installed")
+        else:
+            if ORJSONRenderer().render(data) != content:
+                raise CommandError("orjson output differs")
+            self.report("orjson", content, ORJSONRenderer().render, data, repeat)
+
+        self.report("gzip", compress_string(content), compress_string, content, repeat)
+        if brotli is None:
+            self.stdout.write("brotli     not installed")
+        else:
+            compress = lambda value: brotli.compress(value, quality=BROTLI_QUALITY)
+            self.report("brotli", compress(content), compress, content, repeat)
+
+    def report(self, name, output, function, value, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            function(value)
+        elapsed = (time.perf_counter() - start) * 1000 / repeat
+        self.stdout.write(f"{name:<10} {elapsed:8.2f}ms {len(output):>9} bytes")
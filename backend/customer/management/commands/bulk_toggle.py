@@ -0,0 +1,75 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from common.filters import apply_query_filters
+from customer.filters import CUSTOMER_FILTERS
+from customer.models import Customer
+from customer.services.suspension import UPDATED, bulk_toggle
+
+
+class Command(BaseCommand):
+    help = (
+        "Suspend or reactivate the router accounts of the customers matching "
+        "the customer list filters, e.g. --filter has_dues=true"
+    )
+
+    def add_arguments(self, parser):
+        state = parser.add_mutually_exclusive_group(required=True)
+        state.add_argument("--suspend", action="store_true")
+        state.add_argument("--reactivate", action="store_true")
+        parser.add_argument(
+            "--filter",
+            action="append",
+            default=[],
+            metavar="PARAM=VALUE",
+            help="A customer list query param, repeatable.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Toggle every customer when no filter is given.",
+        )
+        parser.add_argument(
+            "--concurrency", type=int, help="Router calls made at once."
+        )
+        parser.add_argument("--rate", type=float, help="Router calls per second.")
+
+    def handle(self, *args, **options):
+        params = {}
+        for item in options["filter"]:
+            name, sep, value = item.partition("=")
+            if not sep:
+                raise CommandError(f"Expected PARAM=VALUE, got {item!r}")
+            params[name] = value
+        if not params and not options["all"]:
+            raise CommandError("Pass --filter, or --all to toggle every customer.")
+
+        customers = Customer().get_all_actives()
+        try:
+            customers = apply_query_filters(customers, CUSTOMER_FILTERS, params)
+        except ValidationError as e:
+            raise CommandError(e.detail)
+
+        start = time.perf_counter()
+        results = bulk_toggle(
+            customers,
+            options["reactivate"],
+            concurrency=options["concurrency"],
+            rate=options["rate"],
+        )
+        elapsed = time.perf_counter() - start
+
+        updated = 0
+        for result in results:
+            if result["status"] == UPDATED:
+                updated += 1
+            else:
+                self.stderr.write(f"{result['username'] or result['id']}: {result['message']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Updated {updated} customer(s), {len(results) - updated} failed "
+                f"in {elapsed:.2f}s."
+            )
+        )
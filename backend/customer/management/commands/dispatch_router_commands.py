@@ -0,0 +1,49 @@
+"""
+Django command to send queued router commands.
+
+Customer saves queue the PPP secret changes they imply as RouterCommands,
+see customer.services.outbox. This worker sends them, outside the gunicorn
+workers, and retries the ones the router didn't take.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from customer.services.outbox import dispatch_router_commands
+
+
+class Command(BaseCommand):
+    help = "Send queued router commands to MikroTik"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when the queue is empty instead of waiting for new commands.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2,
+            help="Seconds to wait between polls of an empty queue.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Commands claimed per poll.",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Waiting for router commands....")
+        while True:
+            counts = dispatch_router_commands(limit=options["batch_size"])
+            if counts:
+                self.stdout.write(
+                    ", ".join(f"{count} {name}" for name, count in sorted(counts.items()))
+                )
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
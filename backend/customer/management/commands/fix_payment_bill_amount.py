@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
-from customer.models import Customer
+from common.counts import tables_changed
+from customer.models import Customer, Payment
 from django.db import transaction
 
 
@@ -16,6 +17,7 @@ class Command(BaseCommand):
             if not customers:
                 self.stdout.write(self.style.WARNING("No customers found."))
                 return
+            tables_changed(Payment)
             for customer in customers:
                 customer.payments.update(bill_amount=customer.package.price)
                 self.stdout.write(
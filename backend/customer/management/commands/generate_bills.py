@@ -0,0 +1,165 @@
+"""
+Django command to generate a month's bills in parallel.
+
+The customer id space is split into ranges that are billed in a process pool.
+Every range is checkpointed on its own, so rerunning the command after a crash
+or a failed range resumes the unfinished run instead of starting over.
+"""
+
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from customer.choices import BillingRunState
+from customer.models import BillingRange
+from customer.services.billing import (
+    DEFAULT_RANGE_SIZE,
+    get_or_create_billing_run,
+    claim_billing_run,
+    release_billing_run,
+    plan_billing_ranges,
+    pending_billing_ranges,
+    bill_range,
+    finish_billing_run,
+)
+from customer.utils import current_billing_period, parse_billing_period
+
+
+def init_worker():
+    """Make sure Django is ready in processes that were spawned, not forked."""
+    django.setup()
+
+
+def exit_on_sigterm(signum, frame):
+    """Turn SIGTERM into SystemExit so the run's claim is released."""
+    sys.exit(128 + signum)
+
+
+class Command(BaseCommand):
+    help = "Generate bills for a billing period in parallel, resuming unfinished runs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--period",
+            help='Billing period as "YYYY-MM" or a month name. Defaults to this month.',
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of worker processes. 1 bills in this process.",
+        )
+        parser.add_argument(
+            "--range-size",
+            type=int,
+            default=DEFAULT_RANGE_SIZE,
+            help="Customer ids per range (ignored when resuming a run).",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Take over a run marked as running after its process was killed.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            period = (
+                parse_billing_period(options["period"])
+                if options["period"]
+                else current_billing_period()
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        workers = options["workers"]
+        if workers > 1 and connection.vendor == "sqlite":
+            self.stdout.write(
+                self.style.WARNING("SQLite allows one writer at a time, using 1 worker.")
+            )
+            workers = 1
+
+        run, _ = get_or_create_billing_run(period, options["range_size"])
+        if not claim_billing_run(run, force=options["force"]):
+            raise CommandError(
+                f"Billing for {period:%B %Y} is already running (run {run.uid}). "
+                "Use --force if its process is gone."
+            )
+
+        previous_handler = signal.signal(signal.SIGTERM, exit_on_sigterm)
+        try:
+            self.bill_run(run, period, workers)
+        except (KeyboardInterrupt, SystemExit):
+            # Leave the run claimable instead of running until it goes stale
+            release_billing_run(run, "Interrupted.")
+            raise
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
+
+    def bill_run(self, run, period, workers):
+        """Bill the claimed run's unfinished ranges and record the outcome."""
+        resumed = not plan_billing_ranges(run)
+        range_pks = list(pending_billing_ranges(run).values_list("pk", flat=True))
+        self.stdout.write(
+            f"{'Resuming' if resumed else 'Starting'} billing for {period:%B %Y}: "
+            f"{len(range_pks)} range(s) of {run.range_size} customer ids"
+        )
+
+        started = time.monotonic()
+        created = 0
+        failed = []
+        for billing_range in self.bill_ranges(range_pks, workers):
+            if billing_range.state == BillingRunState.COMPLETED:
+                created += billing_range.created_count
+            else:
+                failed.append(billing_range)
+        elapsed = time.monotonic() - started
+
+        run = finish_billing_run(run)
+        rate = created / elapsed if elapsed else 0
+        self.stdout.write(
+            f"Created {created} bill(s) in {elapsed:.2f}s ({rate:.0f} customers/sec). "
+            f"Run total: {run.created_count} bill(s), {run.total_bill_amount:.2f}"
+        )
+
+        for billing_range in failed:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"Failed range {billing_range.start_id}-{billing_range.end_id}: "
+                    f"{billing_range.error}"
+                )
+            )
+        if failed:
+            raise CommandError(
+                f"{len(failed)} range(s) failed. Run the command again to resume."
+            )
+        self.stdout.write(self.style.SUCCESS(f"Billing for {period:%B %Y} completed."))
+
+    def bill_ranges(self, range_pks, workers):
+        """Yield each billed range as soon as it finishes."""
+        if workers <= 1:
+            for range_pk in range_pks:
+                yield bill_range(range_pk)
+            return
+
+        # Child processes must open their own database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            futures = {
+                pool.submit(bill_range, range_pk): range_pk for range_pk in range_pks
+            }
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    # The worker died before it could checkpoint the failure
+                    billing_range = BillingRange.objects.get(pk=futures[future])
+                    billing_range.state = BillingRunState.FAILED
+                    billing_range.error = str(e)
+                    billing_range.save(update_fields=["state", "error", "updated_at"])
+                    yield billing_range
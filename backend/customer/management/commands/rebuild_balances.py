@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from customer.models import Customer
+from customer.services.balance import refresh_balances
+
+
+class Command(BaseCommand):
+    help = "Recompute every customer's balance ledger from their payments"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Customer ids recomputed per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        bounds = Customer.objects.aggregate(low=Min("pk"), high=Max("pk"))
+        if bounds["low"] is None:
+            self.stdout.write(self.style.WARNING("No customers found."))
+            return
+
+        batch_size = options["batch_size"]
+        updated = 0
+        for start in range(bounds["low"], bounds["high"] + 1, batch_size):
+            with transaction.atomic():
+                updated += refresh_balances(
+                    Customer.objects.filter(pk__gte=start, pk__lt=start + batch_size)
+                )
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt balances for {updated} customer(s).")
+        )
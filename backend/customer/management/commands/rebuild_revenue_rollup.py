@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from customer.services.revenue import rebuild_revenue_rollup
+from customer.utils import parse_billing_period
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly revenue rollup from payments"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--period",
+            action="append",
+            help='Only rebuild this billing period ("YYYY-MM"). Can be repeated.',
+        )
+
+    def handle(self, *args, **options):
+        periods = None
+        if options["period"]:
+            try:
+                periods = [parse_billing_period(value) for value in options["period"]]
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        written = rebuild_revenue_rollup(periods)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup row(s)."))
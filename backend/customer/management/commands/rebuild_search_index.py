@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from customer.services.search import rebuild_customer_search_index
+
+
+class Command(BaseCommand):
+    help = "Refill the customer search table (SQLite only) after bulk imports"
+
+    def handle(self, *args, **options):
+        rebuild_customer_search_index()
+        self.stdout.write(self.style.SUCCESS("Customer search index rebuilt."))
@@ -0,0 +1,45 @@
+"""
+Django command to bring MikroTik's PPP secrets and the Customer table back
+in step after manual router changes, failed toggles or missed imports.
+
+Only the users changed on either side since the last run are written, see
+customer.services.router_sync.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from customer.services.router_sync import (
+    CONFLICT_POLICIES,
+    PREFER_ROUTER,
+    reconcile_router,
+)
+
+
+class Command(BaseCommand):
+    help = "Reconcile MikroTik PPP secrets with the customers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prefer",
+            choices=CONFLICT_POLICIES,
+            default=PREFER_ROUTER,
+            help="Side whose value wins for a field changed on both, "
+            "'skip' leaves it unsynced.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Count the changes without writing to the router or the database.",
+        )
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        counts = reconcile_router(prefer=options["prefer"], dry_run=options["dry_run"])
+        elapsed = time.monotonic() - start
+        summary = ", ".join(f"{count} {name}" for name, count in sorted(counts.items()))
+        prefix = "Dry run: " if options["dry_run"] else ""
+        self.stdout.write(
+            self.style.SUCCESS(f"{prefix}{summary or 'nothing to do'} in {elapsed:.2f}s")
+        )
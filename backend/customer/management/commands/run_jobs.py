@@ -0,0 +1,92 @@
+"""
+Django command to run queued background jobs.
+
+Bill generation and bulk status toggles requested through the API are
+queued as a BillingRun or BulkToggleRun and picked up here, outside the
+gunicorn workers. The worker also recomputes the
+dashboard metrics snapshot periodically to correct any drift.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from customer.services.billing import (
+    queued_billing_runs,
+    claim_billing_run,
+    plan_billing_ranges,
+    pending_billing_ranges,
+    bill_range,
+    finish_billing_run,
+)
+from customer.services.dashboard import recompute_dashboard_metrics_if_due
+from customer.services.suspension import (
+    queued_bulk_toggles,
+    claim_bulk_toggle,
+    run_bulk_toggle,
+)
+
+
+class Command(BaseCommand):
+    help = "Run queued bill generation and bulk status toggle jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit when the queue is empty instead of waiting for new jobs.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait between polls of an empty queue.",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Waiting for jobs....")
+        while True:
+            if recompute_dashboard_metrics_if_due():
+                self.stdout.write("Recomputed dashboard metrics")
+            run = queued_billing_runs().order_by("created_at").first()
+            if run is not None:
+                # Another worker may have claimed it first
+                if claim_billing_run(run):
+                    self.run_billing(run)
+                continue
+            toggle = queued_bulk_toggles().order_by("created_at").first()
+            if toggle is not None:
+                if claim_bulk_toggle(toggle):
+                    self.run_bulk_toggle(toggle)
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
+
+    def run_billing(self, run):
+        self.stdout.write(f"Billing {run.billing_period:%B %Y} (run {run.uid})")
+        plan_billing_ranges(run)
+        range_pks = list(pending_billing_ranges(run).values_list("pk", flat=True))
+        for range_pk in range_pks:
+            bill_range(range_pk)
+        run = finish_billing_run(run)
+        message = (
+            f"Run {run.uid} {run.state.lower()}: {run.created_count} bill(s), "
+            f"{run.total_bill_amount:.2f}"
+        )
+        if run.error:
+            self.stdout.write(self.style.ERROR(f"{message}. {run.error}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
+
+    def run_bulk_toggle(self, run):
+        self.stdout.write(f"{run} (run {run.uid})")
+        run = run_bulk_toggle(run)
+        message = (
+            f"Run {run.uid} {run.state.lower()}: {run.updated_count} updated, "
+            f"{run.failed_count} failed"
+        )
+        if run.error:
+            self.stdout.write(self.style.ERROR(f"{message}. {run.error}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
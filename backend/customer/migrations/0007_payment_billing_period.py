@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:56
+
+from datetime import date
+
+import customer.utils
+from django.conf import settings
+from django.db import migrations, models
+
+MONTHS = [
+    "JANUARY",
+    "FEBRUARY",
+    "MARCH",
+    "APRIL",
+    "MAY",
+    "JUNE",
+    "JULY",
+    "AUGUST",
+    "SEPTEMBER",
+    "OCTOBER",
+    "NOVEMBER",
+    "DECEMBER",
+]
+
+
+def period_for(month, reference):
+    """Most recent occurrence of `month` relative to `reference`, one month ahead allowed."""
+    month_number = MONTHS.index(month) + 1 if month in MONTHS else reference.month
+    offset = (month_number - reference.month) % 12
+    if offset > 1:
+        offset -= 12
+    months = reference.year * 12 + reference.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def backfill_billing_period(apps, schema_editor):
+    Payment = apps.get_model("customer", "Payment")
+    batch = []
+    payments = Payment.objects.only("id", "billing_month", "created_at").iterator(
+        chunk_size=1000
+    )
+    for payment in payments:
+        payment.billing_period = period_for(
+            payment.billing_month, payment.created_at.date()
+        )
+        batch.append(payment)
+        if len(batch) == 1000:
+            Payment.objects.bulk_update(batch, ["billing_period"])
+            batch = []
+    if batch:
+        Payment.objects.bulk_update(batch, ["billing_period"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0006_customer_is_free_customer_secret_id_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='billing_period',
+            field=models.DateField(default=customer.utils.current_billing_period, help_text='First day of the month for which the payment is made.'),
+        ),
+        migrations.RunPython(backfill_billing_period, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['customer', 'billing_period'], name='payment_customer_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['billing_period', 'paid'], name='payment_period_paid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['entry_by', 'billing_period'], name='payment_entry_by_period_idx'),
+        ),
+    ]
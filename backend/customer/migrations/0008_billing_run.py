@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:58
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0007_payment_billing_period'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, unique=True)),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active'), ('DRAFT', 'DRAFT'), ('INACTIVE', 'Inactive'), ('REMOVED', 'Removed')], db_index=True, default='ACTIVE', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('billing_period', models.DateField(db_index=True, help_text='First day of the month being billed.')),
+                ('state', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], db_index=True, default='PENDING', max_length=20)),
+                ('range_size', models.PositiveIntegerField(default=5000, help_text='Number of customer ids billed per range.')),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('total_bill_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Billing Run',
+                'verbose_name_plural': 'Billing Runs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BillingRange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, unique=True)),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active'), ('DRAFT', 'DRAFT'), ('INACTIVE', 'Inactive'), ('REMOVED', 'Removed')], db_index=True, default='ACTIVE', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('start_id', models.PositiveBigIntegerField(help_text='First customer id, inclusive.')),
+                ('end_id', models.PositiveBigIntegerField(help_text='Last customer id, exclusive.')),
+                ('state', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('created_count', models.PositiveIntegerField(default=0)),
+                ('total_bill_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranges', to='customer.billingrun')),
+            ],
+            options={
+                'verbose_name': 'Billing Range',
+                'verbose_name_plural': 'Billing Ranges',
+                'ordering': ['start_id'],
+                'constraints': [models.UniqueConstraint(fields=('run', 'start_id'), name='unique_billing_range_start')],
+            },
+        ),
+    ]
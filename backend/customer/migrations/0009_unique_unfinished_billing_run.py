@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0008_billing_run'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='billingrun',
+            constraint=models.UniqueConstraint(condition=models.Q(('state', 'COMPLETED'), _negated=True), fields=('billing_period',), name='unique_unfinished_billing_run'),
+        ),
+    ]
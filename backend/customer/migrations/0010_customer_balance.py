@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:01
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_balances(apps, schema_editor):
+    # Frozen copy of customer.services.balance.balance_updates at this point
+    Customer = apps.get_model("customer", "Customer")
+    Payment = apps.get_model("customer", "Payment")
+    unpaid = (
+        Payment.objects.filter(customer_id=OuterRef("pk"), paid=False, status="ACTIVE")
+        .order_by()
+        .values("customer_id")
+    )
+    last_paid = Payment.objects.filter(
+        customer_id=OuterRef("pk"), paid=True, status="ACTIVE"
+    ).order_by("-billing_period")
+    amount_field = models.DecimalField(max_digits=12, decimal_places=2)
+    Customer.objects.update(
+        outstanding_amount=Coalesce(
+            Subquery(
+                unpaid.annotate(
+                    total=Sum(F("bill_amount") - F("amount"), output_field=amount_field)
+                ).values("total")
+            ),
+            Value(Decimal("0.00")),
+            output_field=amount_field,
+        ),
+        unpaid_bills_count=Coalesce(
+            Subquery(unpaid.annotate(total=Count("id")).values("total")),
+            Value(0),
+            output_field=models.IntegerField(),
+        ),
+        last_paid_period=Subquery(last_paid.values("billing_period")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0009_unique_unfinished_billing_run'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='last_paid_period',
+            field=models.DateField(blank=True, help_text='Latest billing period that is paid.', null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='outstanding_amount',
+            field=models.DecimalField(decimal_places=2, default=0.0, help_text='Amount still owed on unpaid bills.', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='unpaid_bills_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of unpaid bills.'),
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(condition=models.Q(('outstanding_amount__gt', 0)), fields=['outstanding_amount'], name='customer_with_dues_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0010_customer_balance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_customers', models.IntegerField(default=0)),
+                ('active_customers', models.IntegerField(default=0)),
+                ('total_packages', models.IntegerField(default=0)),
+                ('paid_payments', models.IntegerField(default=0)),
+                ('pending_payments', models.IntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=16)),
+                ('current_period', models.DateField(blank=True, help_text='Billing period of the current month counts.', null=True)),
+                ('current_period_paid_payments', models.IntegerField(default=0)),
+                ('is_stale', models.BooleanField(default=False, help_text='Recompute from scratch on the next read.')),
+                ('recomputed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Dashboard Metrics',
+                'verbose_name_plural': 'Dashboard Metrics',
+            },
+        ),
+    ]
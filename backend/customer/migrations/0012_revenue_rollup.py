@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0011_dashboard_metrics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('billing_period', models.DateField()),
+                ('payment_method', models.CharField(choices=[('BANK_TRANSFER', 'Bank Transfer'), ('BKASH', 'Bkash'), ('CASH', 'Cash'), ('NAGAD', 'Nagad'), ('MOBILE_BANKING', 'Mobile Banking'), ('ONLINE_PAYMENT', 'Online Payment'), ('ROCKET', 'Rocket'), ('OTHER', 'Other')], max_length=32)),
+                ('billed_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=16)),
+                ('collected_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=16)),
+                ('payments_count', models.IntegerField(default=0)),
+                ('paid_count', models.IntegerField(default=0)),
+                ('entry_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('package', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='customer.package')),
+            ],
+            options={
+                'verbose_name': 'Revenue Rollup',
+                'verbose_name_plural': 'Revenue Rollups',
+                'ordering': ['billing_period'],
+                'constraints': [models.UniqueConstraint(fields=('billing_period', 'package', 'payment_method', 'entry_by'), name='unique_revenue_rollup_key', nulls_distinct=False)],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+SEARCH_FIELDS = ("name", "username", "phone", "nid", "mac_address", "ip_address")
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS customer_{field}_trgm_idx "
+                f"ON customer_customer USING gin ({field} gin_trgm_ops)"
+            )
+    elif vendor == "sqlite":
+        columns = ", ".join(SEARCH_FIELDS)
+        selects = ", ".join(f"COALESCE({field}, '')" for field in SEARCH_FIELDS)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS customer_search "
+            f"USING fts5({columns}, tokenize='trigram')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO customer_search (rowid, {columns}) "
+            f"SELECT id, {selects} FROM customer_customer"
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(f"DROP INDEX IF EXISTS customer_{field}_trgm_idx")
+    elif vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS customer_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customer", "0014_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
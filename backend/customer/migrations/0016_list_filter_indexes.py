@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Trigram indexes over UPPER(column) for `icontains` filters, see customer.filters
+TRGM_INDEXES = {
+    "customer_name_upper_trgm_idx": "name",
+    "customer_username_upper_trgm_idx": "username",
+}
+
+
+def create_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, column in TRGM_INDEXES.items():
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON customer_customer "
+            f"USING gin ((UPPER({column}::text)) gin_trgm_ops)"
+        )
+
+
+def drop_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in TRGM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0015_customer_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='customer',
+            name='customer_with_dues_idx',
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['outstanding_amount'], name='customer_outstanding_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['phone'], name='customer_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['package', 'is_active'], name='customer_package_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['is_active', '-created_at'], name='customer_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['is_free', '-created_at'], name='customer_free_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['paid', '-created_at'], name='payment_paid_created_idx'),
+        ),
+        migrations.RunPython(create_trgm_indexes, drop_trgm_indexes),
+    ]
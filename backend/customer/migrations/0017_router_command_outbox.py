@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:45
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0016_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouterCommand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, unique=True)),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active'), ('DRAFT', 'DRAFT'), ('INACTIVE', 'Inactive'), ('REMOVED', 'Removed')], db_index=True, default='ACTIVE', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('username', models.CharField(db_index=True, max_length=150)),
+                ('disable', models.BooleanField(help_text='Disable the PPP secret, else enable it.')),
+                ('state', models.CharField(choices=[('PENDING', 'Pending'), ('SENDING', 'Sending'), ('SENT', 'Sent'), ('SUPERSEDED', 'Superseded'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('customer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='router_commands', to='customer.customer')),
+            ],
+            options={
+                'verbose_name': 'Router Command',
+                'verbose_name_plural': 'Router Commands',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['state', 'next_attempt_at'], name='router_command_queue_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0017_router_command_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouterSecretSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=150, unique=True)),
+                ('secret_id', models.CharField(blank=True, max_length=64)),
+                ('digest', models.CharField(help_text='SHA-1 of `values`.', max_length=40)),
+                ('values', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Router Secret Snapshot',
+                'verbose_name_plural': 'Router Secret Snapshots',
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:30
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def blank_usernames_to_null(apps, schema_editor):
+    Customer = apps.get_model("customer", "Customer")
+    Customer.objects.filter(username="").update(username=None)
+    duplicates = list(
+        Customer.objects.exclude(username=None)
+        .values("username")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+        .values_list("username", flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Usernames must be unique, rename the customers sharing "
+            f"{', '.join(duplicates)} before migrating."
+        )
+
+
+def null_usernames_to_blank(apps, schema_editor):
+    Customer = apps.get_model("customer", "Customer")
+    Customer.objects.filter(username=None).update(username="")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0018_router_secret_snapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customer',
+            name='username',
+            field=models.CharField(blank=True, max_length=150, null=True),
+        ),
+        migrations.RunPython(blank_usernames_to_null, null_usernames_to_blank),
+        migrations.AlterField(
+            model_name='customer',
+            name='username',
+            field=models.CharField(blank=True, max_length=150, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:20
+
+import django.core.serializers.json
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0019_unique_customer_username'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkToggleRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, unique=True)),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active'), ('DRAFT', 'DRAFT'), ('INACTIVE', 'Inactive'), ('REMOVED', 'Removed')], db_index=True, default='ACTIVE', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_active', models.BooleanField(help_text='The status the customers are set to.')),
+                ('customer_ids', models.JSONField(default=list)),
+                ('concurrency', models.PositiveIntegerField(blank=True, null=True)),
+                ('state', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], db_index=True, default='PENDING', max_length=20)),
+                ('updated_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('results', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Bulk Toggle Run',
+                'verbose_name_plural': 'Bulk Toggle Runs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -1,12 +1,25 @@
 """Customer models for the application."""
 
-from django.db import models
-from django.db.models.signals import pre_save
-from django.dispatch import receiver
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import timezone
 
-from customer.utils import toggle_ppp_user
-from common.models import NameDescriptionBaseModel, BaseModelWithUID
-from customer.choices import ConnectionType, PaymentMethod, Months
+from customer.utils import (
+    current_billing_period,
+    billing_period_month,
+)
+from common.models import (
+    NameDescriptionBaseModel,
+    BaseModelWithUID,
+    LoadedValuesMixin,
+)
+from customer.choices import (
+    ConnectionType,
+    PaymentMethod,
+    Months,
+    BillingRunState,
+    RouterCommandState,
+)
 
 
 class Package(NameDescriptionBaseModel):
@@ -31,7 +44,9 @@ class Package(NameDescriptionBaseModel):
         ordering = ["-created_at"]
 
 
-class Customer(NameDescriptionBaseModel):
+class Customer(LoadedValuesMixin, NameDescriptionBaseModel):
+    tracked_fields = ("is_active", "package_id")
+
     user = models.OneToOneField(
         "core.User",
         on_delete=models.SET_NULL,
@@ -63,7 +78,8 @@ class Customer(NameDescriptionBaseModel):
     # Credentials
     ip_address = models.CharField(max_length=45, blank=True)
     mac_address = models.CharField(max_length=32, blank=True)
-    username = models.CharField(max_length=150, blank=True)
+    # NULL rather than "" when blank, so customers without one don't collide
+    username = models.CharField(max_length=150, blank=True, null=True, unique=True)
     password = models.CharField(max_length=128, blank=True)
     connection_type = models.CharField(
         max_length=32,
@@ -78,18 +94,65 @@ class Customer(NameDescriptionBaseModel):
         help_text="Additional credentials for the customer.",
     )
 
+    # Balance ledger, maintained by customer.services.balance
+    outstanding_amount = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0.0,
+        help_text="Amount still owed on unpaid bills.",
+    )
+    unpaid_bills_count = models.PositiveIntegerField(
+        default=0, help_text="Number of unpaid bills."
+    )
+    last_paid_period = models.DateField(
+        blank=True, null=True, help_text="Latest billing period that is paid."
+    )
+
     def __str__(self):
         return f"{self.name} ({self.phone})"
 
+    def save(self, *args, **kwargs):
+        self.username = self.username or None
+        # The post_save receivers queue router commands, see customer.signals,
+        # keep them in the save's transaction so they commit or roll back with it
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Customer"
         verbose_name_plural = "Customers"
         ordering = ["-created_at"]
+        indexes = [
+            # Filters of the customer list, see customer.filters
+            models.Index(fields=["outstanding_amount"], name="customer_outstanding_idx"),
+            models.Index(fields=["phone"], name="customer_phone_idx"),
+            models.Index(
+                fields=["package", "is_active"], name="customer_package_active_idx"
+            ),
+            models.Index(
+                fields=["is_active", "-created_at"], name="customer_active_created_idx"
+            ),
+            models.Index(
+                fields=["is_free", "-created_at"], name="customer_free_created_idx"
+            ),
+            # Keyset pagination, see common.pagination.ListPagination
+            models.Index(fields=["-created_at", "-id"], name="customer_created_id_idx"),
+        ]
 
 
-class Payment(NameDescriptionBaseModel):
+class Payment(LoadedValuesMixin, NameDescriptionBaseModel):
     """Model representing a payment."""
 
+    tracked_fields = (
+        "customer_id",
+        "entry_by_id",
+        "bill_amount",
+        "amount",
+        "paid",
+        "payment_method",
+        "billing_period",
+    )
+
     customer = models.ForeignKey(
         Customer, on_delete=models.CASCADE, related_name="payments"
     )
@@ -106,6 +169,10 @@ class Payment(NameDescriptionBaseModel):
         default=Months.JANUARY,
         help_text="Month for which the payment is made.",
     )
+    billing_period = models.DateField(
+        default=current_billing_period,
+        help_text="First day of the month for which the payment is made.",
+    )
     payment_method = models.CharField(
         max_length=32,
         choices=PaymentMethod.choices,
@@ -124,19 +191,276 @@ class Payment(NameDescriptionBaseModel):
     def __str__(self):
         return f"Payment of ${self.amount:.2f} by {self.customer.name} on {self.payment_date}"
 
+    def save(self, *args, **kwargs):
+        # billing_period is the source of truth, keep the legacy month name in sync
+        self.billing_period = self.billing_period.replace(day=1)
+        self.billing_month = billing_period_month(self.billing_period)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "billing_period" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "billing_month"}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Payment"
         verbose_name_plural = "Payments"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["customer", "billing_period"],
+                name="payment_customer_period_idx",
+            ),
+            models.Index(
+                fields=["billing_period", "paid"], name="payment_period_paid_idx"
+            ),
+            models.Index(
+                fields=["entry_by", "billing_period"],
+                name="payment_entry_by_period_idx",
+            ),
+            models.Index(
+                fields=["paid", "-created_at"], name="payment_paid_created_idx"
+            ),
+            # Keyset pagination, see common.pagination.ListPagination
+            models.Index(fields=["-created_at", "-id"], name="payment_created_id_idx"),
+            models.Index(
+                fields=["customer", "-created_at", "-id"],
+                name="payment_customer_created_idx",
+            ),
+        ]
+
+
+class BillingRun(BaseModelWithUID):
+    """A bill generation run for one billing period, split into customer id ranges."""
+
+    billing_period = models.DateField(
+        db_index=True, help_text="First day of the month being billed."
+    )
+    state = models.CharField(
+        max_length=20,
+        choices=BillingRunState.choices,
+        default=BillingRunState.PENDING,
+        db_index=True,
+    )
+    range_size = models.PositiveIntegerField(
+        default=5000, help_text="Number of customer ids billed per range."
+    )
+    created_count = models.PositiveIntegerField(default=0)
+    total_bill_amount = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0.0
+    )
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Billing run {self.billing_period:%B %Y} ({self.state})"
+
+    class Meta:
+        verbose_name = "Billing Run"
+        verbose_name_plural = "Billing Runs"
+        ordering = ["-created_at"]
+        constraints = [
+            # Only one run per billing period may be queued or in progress
+            models.UniqueConstraint(
+                fields=["billing_period"],
+                condition=~models.Q(state=BillingRunState.COMPLETED),
+                name="unique_unfinished_billing_run",
+            )
+        ]
+
+
+class BillingRange(BaseModelWithUID):
+    """Checkpoint for one customer id range of a billing run."""
+
+    run = models.ForeignKey(BillingRun, on_delete=models.CASCADE, related_name="ranges")
+    start_id = models.PositiveBigIntegerField(help_text="First customer id, inclusive.")
+    end_id = models.PositiveBigIntegerField(help_text="Last customer id, exclusive.")
+    state = models.CharField(
+        max_length=20,
+        choices=BillingRunState.choices,
+        default=BillingRunState.PENDING,
+    )
+    created_count = models.PositiveIntegerField(default=0)
+    total_bill_amount = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0.0
+    )
+    finished_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Customers {self.start_id}-{self.end_id} ({self.state})"
+
+    class Meta:
+        verbose_name = "Billing Range"
+        verbose_name_plural = "Billing Ranges"
+        ordering = ["start_id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["run", "start_id"], name="unique_billing_range_start"
+            )
+        ]
+
+
+class BulkToggleRun(BaseModelWithUID):
+    """
+    A queued bulk suspension or reactivation, run by the `run_jobs` worker.
+
+    The customers are resolved from the request's filters when it is queued,
+    so the run toggles exactly the ones that matched then.
+    """
+
+    is_active = models.BooleanField(help_text="The status the customers are set to.")
+    customer_ids = models.JSONField(default=list)
+    concurrency = models.PositiveIntegerField(blank=True, null=True)
+    state = models.CharField(
+        max_length=20,
+        choices=BillingRunState.choices,
+        default=BillingRunState.PENDING,
+        db_index=True,
+    )
+    updated_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    results = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        action = "Reactivate" if self.is_active else "Suspend"
+        return f"{action} {len(self.customer_ids)} customer(s) ({self.state})"
+
+    class Meta:
+        verbose_name = "Bulk Toggle Run"
+        verbose_name_plural = "Bulk Toggle Runs"
+        ordering = ["-created_at"]
 
 
-@receiver(pre_save, sender=Customer)
-def customer_status_toggle(sender, instance, **kwargs):
-    if instance.pk:
-        try:
-            old_instance = sender.objects.get(pk=instance.pk)
-            if old_instance.is_active != instance.is_active:
-                print("Signal: Toggling user status in MikroTik")
-                toggle_ppp_user(instance.username, not instance.is_active)
-        except sender.DoesNotExist:
-            pass  #
+class RouterCommand(BaseModelWithUID):
+    """
+    Outbox row for a change to push to the router's PPP secret.
+
+    Written in the transaction of the Customer save that causes it, so a
+    rollback drops it too, and sent by the `dispatch_router_commands` worker.
+    """
+
+    customer = models.ForeignKey(
+        Customer,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="router_commands",
+    )
+    username = models.CharField(max_length=150, db_index=True)
+    disable = models.BooleanField(help_text="Disable the PPP secret, else enable it.")
+    state = models.CharField(
+        max_length=20,
+        choices=RouterCommandState.choices,
+        default=RouterCommandState.PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        action = "Disable" if self.disable else "Enable"
+        return f"{action} {self.username} ({self.state})"
+
+    class Meta:
+        verbose_name = "Router Command"
+        verbose_name_plural = "Router Commands"
+        ordering = ["-created_at"]
+        indexes = [
+            # The dispatcher's queue, see customer.services.outbox
+            models.Index(
+                fields=["state", "next_attempt_at"], name="router_command_queue_idx"
+            ),
+        ]
+
+
+class DashboardMetrics(models.Model):
+    """
+    Precomputed dashboard numbers, a single row kept up to date by signals.
+    """
+
+    total_customers = models.IntegerField(default=0)
+    active_customers = models.IntegerField(default=0)
+    total_packages = models.IntegerField(default=0)
+    paid_payments = models.IntegerField(default=0)
+    pending_payments = models.IntegerField(default=0)
+    total_revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0.0)
+    current_period = models.DateField(
+        blank=True, null=True, help_text="Billing period of the current month counts."
+    )
+    current_period_paid_payments = models.IntegerField(default=0)
+    is_stale = models.BooleanField(
+        default=False, help_text="Recompute from scratch on the next read."
+    )
+    recomputed_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Dashboard Metrics"
+        verbose_name_plural = "Dashboard Metrics"
+
+
+class RevenueRollup(models.Model):
+    """
+    Billed and collected totals per billing period, package, payment method
+    and collector. Kept up to date from payment writes, rebuilt by the
+    `rebuild_revenue_rollup` command.
+    """
+
+    billing_period = models.DateField()
+    package = models.ForeignKey(
+        Package, on_delete=models.SET_NULL, blank=True, null=True, related_name="+"
+    )
+    payment_method = models.CharField(max_length=32, choices=PaymentMethod.choices)
+    entry_by = models.ForeignKey(
+        "core.User",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="+",
+    )
+    billed_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0.0)
+    collected_amount = models.DecimalField(
+        max_digits=16, decimal_places=2, default=0.0
+    )
+    payments_count = models.IntegerField(default=0)
+    paid_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Revenue {self.billing_period:%B %Y}: {self.collected_amount:.2f}"
+
+    class Meta:
+        verbose_name = "Revenue Rollup"
+        verbose_name_plural = "Revenue Rollups"
+        ordering = ["billing_period"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["billing_period", "package", "payment_method", "entry_by"],
+                name="unique_revenue_rollup_key",
+                nulls_distinct=False,
+            )
+        ]
+
+
+class RouterSecretSnapshot(models.Model):
+    """
+    The synced fields of a PPP secret as last agreed by the router and the
+    database, written by the `reconcile_router` command, see
+    customer.services.router_sync.
+    """
+
+    username = models.CharField(max_length=150, unique=True)
+    secret_id = models.CharField(max_length=64, blank=True)
+    digest = models.CharField(max_length=40, help_text="SHA-1 of `values`.")
+    values = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.username} ({self.digest[:8]})"
+
+    class Meta:
+        verbose_name = "Router Secret Snapshot"
+        verbose_name_plural = "Router Secret Snapshots"
@@ -0,0 +1,40 @@
+from rest_framework import serializers
+
+from customer.choices import BillingRunState
+from customer.models import BillingRun
+
+
+class BillingRunSerializer(serializers.ModelSerializer):
+    """Serializer for reporting the progress of a bill generation run."""
+
+    ranges_total = serializers.IntegerField(read_only=True)
+    ranges_completed = serializers.IntegerField(read_only=True)
+    failed_ranges = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BillingRun
+        fields = (
+            "id",
+            "uid",
+            "billing_period",
+            "state",
+            "range_size",
+            "ranges_total",
+            "ranges_completed",
+            "created_count",
+            "total_bill_amount",
+            "error",
+            "failed_ranges",
+            "started_at",
+            "finished_at",
+            "created_at",
+            "updated_at",
+        )
+        read_only_fields = fields
+
+    def get_failed_ranges(self, obj):
+        return list(
+            obj.ranges.filter(state=BillingRunState.FAILED).values(
+                "start_id", "end_id", "error"
+            )
+        )
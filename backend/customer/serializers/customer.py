@@ -2,7 +2,8 @@ from django.db import transaction
 
 from rest_framework import serializers
 
-from customer.models import Customer, Package
+from common.serializers import SparseFieldsMixin
+from customer.models import BulkToggleRun, Customer, Package
 
 from core.serializers.user import UserListSerializer
 from core.models import User
@@ -33,7 +34,7 @@ class CustomerBase(serializers.ModelSerializer):
         )
 
 
-class CustomerListSerializer(CustomerBase):
+class CustomerListSerializer(SparseFieldsMixin, CustomerBase):
     """Serializer for listing customers."""
 
     package = PackageBase(read_only=True)
@@ -51,8 +52,15 @@ class CustomerListSerializer(CustomerBase):
             "password",
             "connection_type",
             "credentials",
+            "outstanding_amount",
+            "unpaid_bills_count",
+            "last_paid_period",
+        )
+        read_only_fields = CustomerBase.Meta.read_only_fields + (
+            "outstanding_amount",
+            "unpaid_bills_count",
+            "last_paid_period",
         )
-        read_only_fields = CustomerBase.Meta.read_only_fields + ()
         write_only_fields = ("first_name", "last_name", "add")
 
     @transaction.atomic
@@ -94,6 +102,16 @@ class CustomerListSerializer(CustomerBase):
         return Customer.objects.create(**validated_data)
 
 
+class CustomerBulkSerializer(CustomerListSerializer):
+    """
+    CustomerListSerializer for bulk creates, whose usernames are checked
+    for the whole batch at once, see customer.services.bulk.
+    """
+
+    class Meta(CustomerListSerializer.Meta):
+        extra_kwargs = {"username": {"validators": []}}
+
+
 class CustomerDetailSerializer(CustomerBase):
     """Serializer for customer details."""
 
@@ -113,10 +131,16 @@ class CustomerDetailSerializer(CustomerBase):
             "username",
             "password",
             "connection_type",
+            "outstanding_amount",
+            "unpaid_bills_count",
+            "last_paid_period",
         )
         read_only_fields = CustomerBase.Meta.read_only_fields + (
             "user",
             "connection_start_date",
+            "outstanding_amount",
+            "unpaid_bills_count",
+            "last_paid_period",
             # "is_active",
         )
 
@@ -137,3 +161,41 @@ class StatusToggleSerializer(serializers.Serializer):
 
     username = serializers.CharField(required=True, max_length=150)
     is_active = serializers.BooleanField(required=True)
+
+
+class BulkStatusToggleSerializer(serializers.Serializer):
+    """Serializer for suspending or reactivating many customers."""
+
+    is_active = serializers.BooleanField(required=True)
+    uids = serializers.ListField(
+        child=serializers.UUIDField(), required=False, allow_empty=False
+    )
+    concurrency = serializers.IntegerField(required=False, min_value=1, max_value=64)
+
+
+class BulkToggleRunSerializer(serializers.ModelSerializer):
+    """Serializer for reporting the progress of a queued bulk status toggle."""
+
+    customers_total = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BulkToggleRun
+        fields = (
+            "id",
+            "uid",
+            "is_active",
+            "state",
+            "customers_total",
+            "updated_count",
+            "failed_count",
+            "results",
+            "error",
+            "started_at",
+            "finished_at",
+            "created_at",
+            "updated_at",
+        )
+        read_only_fields = fields
+
+    def get_customers_total(self, obj):
+        return len(obj.customer_ids)
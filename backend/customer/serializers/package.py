@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from common.serializers import SparseFieldsMixin
 from customer.models import Package
 
 
@@ -22,7 +23,7 @@ class PackageBase(serializers.ModelSerializer):
         )
 
 
-class PackageListSerializer(PackageBase):
+class PackageListSerializer(SparseFieldsMixin, PackageBase):
     """Serializer for listing packages."""
 
     class Meta(PackageBase.Meta):
@@ -4,14 +4,25 @@ from django.db import transaction
 import logging
 from django.utils import timezone
 from rest_framework import serializers
+from common.serializers import SparseFieldsMixin
 from customer.models import Payment, Customer
 from core.serializers.user import UserLiteSerializer
 from customer.serializers.customer import CustomerBase
+from customer.services.balance import refresh_customer_balance
+from customer.utils import (
+    current_billing_period,
+    billing_period_from_month,
+    billing_period_month,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class PaymentBase(serializers.ModelSerializer):
+    billing_period = serializers.DateField(
+        required=False, input_formats=["%Y-%m", "iso-8601"]
+    )
+
     class Meta:
         model = Payment
         fields = (
@@ -22,6 +33,7 @@ class PaymentBase(serializers.ModelSerializer):
             "bill_amount",
             "amount",
             "billing_month",
+            "billing_period",
             "payment_method",
             "paid",
             "transaction_id",
@@ -32,8 +44,18 @@ class PaymentBase(serializers.ModelSerializer):
         )
         read_only_fields = ("id", "created_at", "updated_at")
 
+    def validate(self, attrs):
+        # Old clients only send a month name, resolve it to a dated period
+        if "billing_period" in attrs:
+            attrs["billing_period"] = attrs["billing_period"].replace(day=1)
+        elif "billing_month" in attrs:
+            attrs["billing_period"] = billing_period_from_month(attrs["billing_month"])
+        if "billing_period" in attrs:
+            attrs["billing_month"] = billing_period_month(attrs["billing_period"])
+        return attrs
+
 
-class PaymentListSerializer(PaymentBase):
+class PaymentListSerializer(SparseFieldsMixin, PaymentBase):
     customer = CustomerBase(read_only=True)
     customer_id = serializers.IntegerField(write_only=True, required=True)
     entry_by = UserLiteSerializer(read_only=True)
@@ -58,6 +80,7 @@ class PaymentListSerializer(PaymentBase):
         transaction_id = uuid.uuid4()
         payment_date = validated_data.get("payment_date", timezone.now())
         customer_id = validated_data["customer_id"]
+        billing_period = validated_data.get("billing_period", current_billing_period())
 
         try:
             customer = Customer.objects.select_related("package").get(id=customer_id)
@@ -74,13 +97,13 @@ class PaymentListSerializer(PaymentBase):
         try:
             payment = Payment.objects.get(
                 customer=customer,
-                billing_month=validated_data.get("billing_month", ""),
+                billing_period=billing_period,
             )
         except Payment.DoesNotExist:
             payment = None
         except Payment.MultipleObjectsReturned:
             logger.error(
-                f"Multiple payments found for customer {customer.id} in {validated_data['billing_month']}"
+                f"Multiple payments found for customer {customer.id} in {billing_period:%B %Y}"
             )
             raise serializers.ValidationError(
                 {"billing_month": "Multiple payments detected. Contact admin."}
@@ -105,7 +128,7 @@ class PaymentListSerializer(PaymentBase):
                 payment.transaction_id = str(transaction_id)
                 payment.entry_by = request.user
                 payment.updated_by = request.user
-                payment.note = f"Payment updated by {request.user.get_full_name() or request.user.username}"
+                payment.note = f"Payment updated by {request.user.first_name} {request.user.last_name}"
                 payment.save(
                     update_fields=[
                         "payment_date",
@@ -125,7 +148,7 @@ class PaymentListSerializer(PaymentBase):
                     bill_amount=bill_amount,
                     amount=amount,
                     paid=is_fully_paid,
-                    billing_month=validated_data["billing_month"],
+                    billing_period=billing_period,
                     payment_method=validated_data["payment_method"],
                     payment_date=payment_date,
                     transaction_id=str(transaction_id),
@@ -141,6 +164,8 @@ class PaymentListSerializer(PaymentBase):
                 customer.save(update_fields=["is_active"])
                 print("Customer activated due to successful payment.")
 
+            refresh_customer_balance(customer.id)
+
         return payment
 
 
@@ -163,7 +188,10 @@ class PaymentDetailSerializer(PaymentBase):
         if not instance.entry_by:
             validated_data["entry_by_id"] = self.context["request"].user.id
         validated_data["updated_by_id"] = self.context["request"].user.id
-        if validated_data.get("paid") and not instance.customer.is_active:
-            instance.customer.is_active = True
-            instance.customer.save(update_fields=["is_active"])
-        return super().update(instance, validated_data)
+        with transaction.atomic():
+            if validated_data.get("paid") and not instance.customer.is_active:
+                instance.customer.is_active = True
+                instance.customer.save(update_fields=["is_active"])
+            payment = super().update(instance, validated_data)
+            refresh_customer_balance(payment.customer_id)
+        return payment
@@ -0,0 +1,67 @@
+"""Per-customer balance ledger kept on the Customer row."""
+
+from decimal import Decimal
+
+from django.db.models import (
+    DecimalField,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Sum,
+    Count,
+    Value,
+)
+from django.db.models.functions import Coalesce
+
+from common.choices import Status
+from common.counts import tables_changed
+from customer.models import Customer, Payment
+
+
+def balance_updates(payments):
+    """
+    Expressions that recompute the ledger columns of a Customer queryset.
+
+    `payments` is the Payment model. Migration 0010 keeps its own frozen copy
+    of these expressions, changes here don't alter what it backfilled.
+    """
+    unpaid = (
+        payments.objects.filter(
+            customer_id=OuterRef("pk"), paid=False, status=Status.ACTIVE
+        )
+        .order_by()
+        .values("customer_id")
+    )
+    last_paid = payments.objects.filter(
+        customer_id=OuterRef("pk"), paid=True, status=Status.ACTIVE
+    ).order_by("-billing_period")
+    amount_field = DecimalField(max_digits=12, decimal_places=2)
+    return {
+        "outstanding_amount": Coalesce(
+            Subquery(
+                unpaid.annotate(
+                    total=Sum(F("bill_amount") - F("amount"), output_field=amount_field)
+                ).values("total")
+            ),
+            Value(Decimal("0.00")),
+            output_field=amount_field,
+        ),
+        "unpaid_bills_count": Coalesce(
+            Subquery(unpaid.annotate(total=Count("id")).values("total")),
+            Value(0),
+            output_field=IntegerField(),
+        ),
+        "last_paid_period": Subquery(last_paid.values("billing_period")[:1]),
+    }
+
+
+def refresh_balances(customers):
+    """Recompute the ledger for a Customer queryset with a single UPDATE."""
+    # update() skips save() and its signals, the ledger never touches the router
+    tables_changed(Customer)
+    return customers.order_by().update(**balance_updates(Payment))
+
+
+def refresh_customer_balance(customer_id):
+    return refresh_balances(Customer.objects.filter(pk=customer_id))
@@ -0,0 +1,382 @@
+"""Monthly bill generation for customers."""
+
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import (
+    Exists,
+    F,
+    Func,
+    Max,
+    Min,
+    OuterRef,
+    Q,
+    Sum,
+    Value,
+    BooleanField,
+    CharField,
+    DateField,
+    DateTimeField,
+    DecimalField,
+    UUIDField,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from common.choices import Status
+from common.counts import tables_changed
+from customer.choices import PaymentMethod, BillingRunState
+from customer.models import Customer, Payment, BillingRun, BillingRange
+from customer.services.balance import refresh_balances
+from customer.services.dashboard import apply_dashboard_delta
+from customer.services.revenue import rollup_key, apply_rollup_delta
+from customer.utils import billing_period_month
+
+logger = logging.getLogger(__name__)
+
+# Rows written per INSERT when the database can't do the work in one statement.
+BATCH_SIZE = 1000
+# Customer ids per range in a parallel billing run.
+DEFAULT_RANGE_SIZE = 5000
+# A running run that hasn't finished a range for this long is considered dead.
+STALE_RUN_AFTER = timedelta(minutes=15)
+
+
+def bill_note(period):
+    return f"Auto-generated bill for {period:%B %Y}"
+
+
+def billable_customers(period, start_id=None, end_id=None):
+    """
+    Customers that should be billed for `period` and don't have a payment yet.
+
+    The "already billed" check is an anti-join against the payment table, so
+    the database never has to hand the full list of billed ids back to us.
+    `start_id` (inclusive) and `end_id` (exclusive) limit it to an id range.
+    """
+    already_billed = Payment.objects.filter(
+        customer_id=OuterRef("pk"), billing_period=period
+    )
+    queryset = Customer.objects.filter(
+        is_active=True, is_free=False, package__price__gt=0
+    )
+    if start_id is not None:
+        queryset = queryset.filter(pk__gte=start_id)
+    if end_id is not None:
+        queryset = queryset.filter(pk__lt=end_id)
+    return queryset.exclude(Exists(already_billed)).order_by()
+
+
+def generate_bills(period, start_id=None, end_id=None):
+    """
+    Create an unpaid Payment for every billable customer for `period`.
+
+    Returns:
+        dict: {"created": int, "total_bill_amount": Decimal}
+    """
+    customers = billable_customers(period, start_id, end_id)
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            by_package = _generate_bills_insert_select(period, customers)
+        else:
+            by_package = _generate_bills_batched(period, customers)
+
+        # Bulk inserts skip the post_save signal, count the new bills here
+        created = sum(count for count, _ in by_package.values())
+        tables_changed(Payment, Customer)
+        apply_dashboard_delta(pending_payments=created)
+        for package_id, (count, total) in by_package.items():
+            apply_rollup_delta(
+                rollup_key(period, package_id, PaymentMethod.OTHER, None),
+                billed_amount=total,
+                payments_count=count,
+            )
+
+    return {
+        "created": created,
+        "total_bill_amount": sum(
+            (total for _, total in by_package.values()), Decimal("0.00")
+        ),
+    }
+
+
+def _generate_bills_insert_select(period, customers):
+    """
+    Generate bills with a single INSERT ... SELECT on the database server.
+
+    Returns:
+        dict: {package_id: (bills created, total bill amount)}
+    """
+    now = timezone.now()
+    columns = (
+        ("uid", Func(function="gen_random_uuid", output_field=UUIDField())),
+        ("status", Value(Status.ACTIVE, output_field=CharField())),
+        ("created_at", Value(now, output_field=DateTimeField())),
+        ("updated_at", Value(now, output_field=DateTimeField())),
+        ("name", Value("", output_field=CharField())),
+        ("customer", F("pk")),
+        ("bill_amount", F("package__price")),
+        ("amount", Value(Decimal("0.00"), output_field=DecimalField())),
+        (
+            "billing_month",
+            Value(billing_period_month(period), output_field=CharField()),
+        ),
+        ("billing_period", Value(period, output_field=DateField())),
+        ("payment_method", Value(PaymentMethod.OTHER, output_field=CharField())),
+        ("paid", Value(False, output_field=BooleanField())),
+        ("note", Value(bill_note(period), output_field=CharField())),
+        ("transaction_id", Value("", output_field=CharField())),
+    )
+    aliases = {f"_{name}": expression for name, expression in columns}
+    select_sql, params = (
+        customers.annotate(**aliases)
+        .values_list(*aliases)
+        .query.sql_with_params()
+    )
+
+    quote = connection.ops.quote_name
+    insert_columns = ", ".join(
+        quote(Payment._meta.get_field(name).column) for name, _ in columns
+    )
+    customer_table = quote(Customer._meta.db_table)
+    outstanding = quote(Customer._meta.get_field("outstanding_amount").column)
+    unpaid_count = quote(Customer._meta.get_field("unpaid_bills_count").column)
+    customer_pk = quote(Customer._meta.pk.column)
+    # The new bills are added to the balance ledger in the same statement
+    sql = (
+        f"WITH inserted AS ("
+        f"INSERT INTO {quote(Payment._meta.db_table)} ({insert_columns}) "
+        f"{select_sql} RETURNING customer_id, bill_amount"
+        f"), ledger AS ("
+        f"UPDATE {customer_table} SET "
+        f"{outstanding} = {customer_table}.{outstanding} + inserted.bill_amount, "
+        f"{unpaid_count} = {customer_table}.{unpaid_count} + 1 "
+        f"FROM inserted WHERE {customer_table}.{customer_pk} = inserted.customer_id"
+        f") SELECT {customer_table}.package_id, COUNT(*), SUM(inserted.bill_amount) "
+        f"FROM inserted JOIN {customer_table} "
+        f"ON {customer_table}.{customer_pk} = inserted.customer_id "
+        f"GROUP BY {customer_table}.package_id"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    return {package_id: (count, Decimal(total)) for package_id, count, total in rows}
+
+
+def _generate_bills_batched(period, customers):
+    """
+    Generate bills in fixed-size batches, walking customers in primary key order.
+
+    Used on databases without data-modifying CTEs (SQLite in development and
+    tests). Memory use is bounded by BATCH_SIZE, not the number of customers.
+    Returns:
+        dict: {package_id: (bills created, total bill amount)}
+    """
+    by_package = {}
+    last_pk = 0
+    month = billing_period_month(period)
+    note = bill_note(period)
+
+    while True:
+        batch = list(
+            customers.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "package_id", "package__price")[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        Payment.objects.bulk_create(
+            [
+                Payment(
+                    customer_id=customer_id,
+                    bill_amount=price,
+                    amount=Decimal("0.00"),
+                    billing_month=month,
+                    billing_period=period,
+                    payment_method=PaymentMethod.OTHER,
+                    paid=False,
+                    note=note,
+                )
+                for customer_id, _, price in batch
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        billed_ids = [customer_id for customer_id, _, _ in batch]
+        refresh_balances(Customer.objects.filter(pk__in=billed_ids))
+        for _, package_id, price in batch:
+            count, total = by_package.get(package_id, (0, Decimal("0.00")))
+            by_package[package_id] = (count + 1, total + price)
+        last_pk = batch[-1][0]
+
+    return by_package
+
+
+def unfinished_billing_runs(period):
+    return BillingRun.objects.filter(billing_period=period).exclude(
+        state=BillingRunState.COMPLETED
+    )
+
+
+def queued_billing_runs():
+    """Runs waiting for a worker: pending, or running without a recent heartbeat."""
+    stale_before = timezone.now() - STALE_RUN_AFTER
+    return BillingRun.objects.filter(
+        Q(state=BillingRunState.PENDING)
+        | Q(state=BillingRunState.RUNNING, updated_at__lt=stale_before)
+    )
+
+
+def get_or_create_billing_run(period, range_size=DEFAULT_RANGE_SIZE):
+    """
+    Return the unfinished run for `period`, creating a pending one if needed.
+
+    There is at most one unfinished run per period (enforced by a unique
+    constraint), so concurrent callers always end up with the same run.
+    Returns:
+        tuple: (run: BillingRun, created: bool)
+    """
+    run = unfinished_billing_runs(period).first()
+    if run:
+        return run, False
+    try:
+        with transaction.atomic():
+            run = BillingRun.objects.create(
+                billing_period=period, range_size=range_size
+            )
+        return run, True
+    except IntegrityError:
+        return unfinished_billing_runs(period).get(), False
+
+
+def enqueue_billing_run(period):
+    """Queue bill generation for `period`, requeueing a failed run if there is one."""
+    run, created = get_or_create_billing_run(period)
+    if run.state == BillingRunState.FAILED:
+        BillingRun.objects.filter(pk=run.pk, state=BillingRunState.FAILED).update(
+            state=BillingRunState.PENDING, updated_at=timezone.now()
+        )
+        run.refresh_from_db()
+    return run, created
+
+
+def claim_billing_run(run, force=False):
+    """
+    Atomically mark `run` as running for the calling worker.
+
+    Returns False if another worker holds it, so two generations for the same
+    period never run at the same time. `force` takes over a running run whose
+    worker is known to be gone without waiting for it to go stale.
+    """
+    now = timezone.now()
+    claimable = queued_billing_runs() | BillingRun.objects.filter(
+        state=BillingRunState.FAILED
+    )
+    if force:
+        claimable |= BillingRun.objects.filter(state=BillingRunState.RUNNING)
+    claimed = claimable.filter(pk=run.pk).update(
+        state=BillingRunState.RUNNING,
+        started_at=Coalesce("started_at", Value(now)),
+        finished_at=None,
+        error="",
+        updated_at=now,
+    )
+    if claimed:
+        run.refresh_from_db()
+    return bool(claimed)
+
+
+def release_billing_run(run, error):
+    """
+    Mark a run this worker holds as failed, so a rerun can claim it right away.
+
+    Used when the worker is stopped before it could finish the run.
+    """
+    now = timezone.now()
+    BillingRun.objects.filter(pk=run.pk, state=BillingRunState.RUNNING).update(
+        state=BillingRunState.FAILED, error=error, finished_at=now, updated_at=now
+    )
+
+
+def plan_billing_ranges(run):
+    """
+    Split the customer id space into the run's ranges, unless already planned.
+
+    Returns:
+        int: Number of ranges created, 0 when the run is being resumed.
+    """
+    if run.ranges.exists():
+        return 0
+    bounds = Customer.objects.aggregate(low=Min("pk"), high=Max("pk"))
+    if bounds["low"] is None:
+        return 0
+    ranges = BillingRange.objects.bulk_create(
+        [
+            BillingRange(
+                run=run,
+                start_id=start,
+                end_id=min(start + run.range_size, bounds["high"] + 1),
+            )
+            for start in range(bounds["low"], bounds["high"] + 1, run.range_size)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    return len(ranges)
+
+
+def pending_billing_ranges(run):
+    return run.ranges.exclude(state=BillingRunState.COMPLETED)
+
+
+def bill_range(range_pk):
+    """
+    Bill one customer id range of a run.
+
+    The range checkpoint is written in the same transaction as its bills, so a
+    killed run never leaves a range half billed or billed but not recorded.
+    """
+    billing_range = BillingRange.objects.select_related("run").get(pk=range_pk)
+    try:
+        with transaction.atomic():
+            result = generate_bills(
+                billing_range.run.billing_period,
+                billing_range.start_id,
+                billing_range.end_id,
+            )
+            billing_range.state = BillingRunState.COMPLETED
+            billing_range.created_count = result["created"]
+            billing_range.total_bill_amount = result["total_bill_amount"]
+            billing_range.error = ""
+            billing_range.finished_at = timezone.now()
+            billing_range.save()
+            # Live progress for the run, doubling as the worker's heartbeat
+            BillingRun.objects.filter(pk=billing_range.run_id).update(
+                created_count=F("created_count") + result["created"],
+                total_bill_amount=F("total_bill_amount")
+                + result["total_bill_amount"],
+                updated_at=timezone.now(),
+            )
+    except Exception as e:
+        logger.exception(f"Failed to bill customers in {billing_range}")
+        billing_range.state = BillingRunState.FAILED
+        billing_range.error = str(e)
+        billing_range.finished_at = timezone.now()
+        billing_range.save(update_fields=["state", "error", "finished_at", "updated_at"])
+    return billing_range
+
+
+def finish_billing_run(run):
+    """Roll the range checkpoints up into the run and set its final state."""
+    totals = run.ranges.filter(state=BillingRunState.COMPLETED).aggregate(
+        created=Sum("created_count"), total=Sum("total_bill_amount")
+    )
+    unfinished = run.ranges.exclude(state=BillingRunState.COMPLETED).count()
+    run.created_count = totals["created"] or 0
+    run.total_bill_amount = totals["total"] or Decimal("0.00")
+    run.state = BillingRunState.FAILED if unfinished else BillingRunState.COMPLETED
+    run.error = f"{unfinished} range(s) not billed." if unfinished else ""
+    run.finished_at = timezone.now()
+    run.save()
+    return run
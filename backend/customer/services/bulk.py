@@ -0,0 +1,268 @@
+"""
+Bulk payment and customer writes.
+
+Each applies the same rules as its one-at-a-time serializer, but looks
+everything up with one IN query per table, writes with bulk_create and
+bulk_update, and applies what the skipped save signals would have (dashboard,
+rollup, balances, search index, table versions) once for the whole batch.
+"""
+
+import logging
+import uuid
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from common.counts import tables_changed
+from core.models import User
+from customer.choices import PaymentMethod
+from customer.models import Customer, Package, Payment
+from customer.services.balance import refresh_balances
+from customer.services.dashboard import (
+    apply_dashboard_delta,
+    counts_delta,
+    customer_counts,
+    payment_counts,
+)
+from customer.services.outbox import enqueue_router_commands
+from customer.services.revenue import apply_payment_changes
+from customer.services.search import index_customers
+from customer.utils import billing_period_month, current_billing_period
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_UPDATE_FIELDS = (
+    "payment_date",
+    "amount",
+    "paid",
+    "transaction_id",
+    "entry_by",
+    "updated_by",
+    "note",
+    "updated_at",
+)
+
+
+def tracked_values(instance):
+    return {name: getattr(instance, name) for name in instance.tracked_fields}
+
+
+def record_payments(entries, user):
+    """
+    Record payments like PaymentListSerializer.create: update the unpaid
+    bill of the customer's billing period or create one, and activate
+    customers whose bill is now fully paid.
+
+    `entries` maps request positions to validated payment data.
+    Returns:
+        dict: position -> (created, payment) or (None, errors).
+    """
+    results = {}
+    now = timezone.now()
+    for data in entries.values():
+        data.setdefault("billing_period", current_billing_period())
+
+    customers = Customer.objects.select_related("package").in_bulk(
+        {data["customer_id"] for data in entries.values()}
+    )
+    existing = {}
+    for payment in Payment.objects.filter(
+        customer_id__in=customers,
+        billing_period__in={data["billing_period"] for data in entries.values()},
+    ):
+        existing.setdefault((payment.customer_id, payment.billing_period), []).append(
+            payment
+        )
+
+    seen = set()
+    to_create, to_update, changes, activated = [], [], [], {}
+    for position, data in entries.items():
+        customer = customers.get(data["customer_id"])
+        period = data["billing_period"]
+        if customer is None:
+            results[position] = (None, {"customer_id": "Customer does not exist."})
+            continue
+        if customer.is_free:
+            results[position] = (
+                None,
+                {"customer_id": "Cannot create payment for free customers."},
+            )
+            continue
+        if (customer.pk, period) in seen:
+            results[position] = (
+                None,
+                {"billing_period": "Duplicate customer and billing period."},
+            )
+            continue
+        seen.add((customer.pk, period))
+
+        matches = existing.get((customer.pk, period), [])
+        if len(matches) > 1:
+            logger.error(
+                f"Multiple payments found for customer {customer.id} in {period:%B %Y}"
+            )
+            results[position] = (
+                None,
+                {"billing_month": "Multiple payments detected. Contact admin."},
+            )
+            continue
+        payment = matches[0] if matches else None
+        if payment and payment.paid:
+            results[position] = (
+                None,
+                {"billing_month": "Payment for this month has already been made."},
+            )
+            continue
+
+        bill_amount = customer.package.price if customer.package else Decimal("0.00")
+        amount = data.get("amount", Decimal("0.00"))
+        is_fully_paid = data.get("paid", False) or amount >= bill_amount
+        if payment:
+            old = tracked_values(payment)
+            payment.payment_date = data.get("payment_date", now)
+            payment.amount = amount
+            payment.paid = is_fully_paid
+            payment.transaction_id = str(uuid.uuid4())
+            payment.entry_by = user
+            payment.updated_by = user
+            payment.note = f"Payment updated by {user.first_name} {user.last_name}"
+            payment.updated_at = now
+            to_update.append(payment)
+        else:
+            old = None
+            payment = Payment(
+                customer=customer,
+                bill_amount=bill_amount,
+                amount=amount,
+                paid=is_fully_paid,
+                billing_period=period,
+                billing_month=billing_period_month(period),
+                payment_method=data.get("payment_method", PaymentMethod.CASH),
+                payment_date=data.get("payment_date", now),
+                transaction_id=str(uuid.uuid4()),
+                entry_by=user,
+                updated_by=user,
+                note=f"Payment received by {user.first_name} {user.last_name}",
+            )
+            to_create.append(payment)
+        payment.customer = customer
+        new = tracked_values(payment)
+        payment.remember_loaded_values(new)
+        changes.append((old, new, customer.package_id))
+        results[position] = (old is None, payment)
+        if is_fully_paid and not customer.is_active:
+            activated[customer.pk] = customer
+
+    if not changes:
+        return results
+
+    with transaction.atomic():
+        Payment.objects.bulk_update(to_update, PAYMENT_UPDATE_FIELDS)
+        Payment.objects.bulk_create(to_create)
+        if activated:
+            Customer.objects.filter(pk__in=activated).update(
+                is_active=True, updated_at=now
+            )
+            for customer in activated.values():
+                customer.is_active = True
+            # What the customer save signal does for a single save
+            enqueue_router_commands(activated.values(), disable=False)
+
+        # Bulk writes skip the save signals, apply their effects for the batch
+        tables_changed(Payment)
+        dashboard = Counter(active_customers=len(activated))
+        for old, new, _ in changes:
+            dashboard.update(counts_delta(payment_counts(old), payment_counts(new)))
+        apply_dashboard_delta(**dashboard)
+        apply_payment_changes(changes)
+        refresh_balances(
+            Customer.objects.filter(pk__in={customer_id for customer_id, _ in seen})
+        )
+
+    return results
+
+
+def create_customers(entries, user):
+    """
+    Create customers like CustomerListSerializer.create, rejecting phones,
+    emails and usernames already in use, or used twice in the batch.
+
+    `entries` maps request positions to validated customer data.
+    Returns:
+        dict: position -> (True, customer) or (None, errors).
+    """
+    results = {}
+    phones = Counter(data.get("phone") for data in entries.values())
+    emails = Counter(data.get("email") for data in entries.values() if data.get("email"))
+    phones_in_use = set(
+        Customer.objects.filter(phone__in=phones).values_list("phone", flat=True)
+    )
+    emails_in_use = set()
+    if emails:
+        emails_in_use.update(
+            Customer.objects.filter(email__in=emails).values_list("email", flat=True)
+        )
+        emails_in_use.update(
+            User.objects.filter(email__in=emails).values_list("email", flat=True)
+        )
+    usernames = Counter(
+        data.get("username") for data in entries.values() if data.get("username")
+    )
+    usernames_in_use = set(
+        Customer.objects.filter(username__in=usernames).values_list(
+            "username", flat=True
+        )
+    )
+    packages = Package.objects.in_bulk(
+        {data["package_id"] for data in entries.values() if "package_id" in data}
+    )
+
+    to_create = []
+    for position, data in entries.items():
+        email, phone = data.get("email"), data.get("phone")
+        if email and (email in emails_in_use or emails[email] > 1):
+            results[position] = (None, {"email": "This email is already in use."})
+            continue
+        if phone in phones_in_use or phones[phone] > 1:
+            results[position] = (
+                None,
+                {"phone": "This phone number is already in use."},
+            )
+            continue
+        username = data.get("username")
+        if username and (username in usernames_in_use or usernames[username] > 1):
+            results[position] = (
+                None,
+                {"username": "This username is already in use."},
+            )
+            continue
+        package_id = data.get("package_id")
+        if package_id is not None and package_id not in packages:
+            results[position] = (None, {"package_id": "Package does not exist."})
+            continue
+
+        customer = Customer(**data, entry_by=user, updated_by=user)
+        customer.package = packages.get(package_id)
+        # Customer.save stores a blank username as NULL, bulk_create doesn't call it
+        customer.username = customer.username or None
+        to_create.append(customer)
+        results[position] = (True, customer)
+
+    if not to_create:
+        return results
+
+    with transaction.atomic():
+        Customer.objects.bulk_create(to_create)
+        for customer in to_create:
+            customer.remember_loaded_values(tracked_values(customer))
+        # Bulk writes skip the save signals, apply their effects for the batch
+        tables_changed(Customer)
+        dashboard = Counter()
+        for customer in to_create:
+            dashboard.update(customer_counts(tracked_values(customer)))
+        apply_dashboard_delta(**dashboard)
+        index_customers(to_create)
+
+    return results
@@ -0,0 +1,123 @@
+"""Dashboard metrics snapshot, updated incrementally as data changes."""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from customer.models import Customer, Package, Payment, DashboardMetrics
+from customer.utils import current_billing_period
+
+SNAPSHOT_PK = 1
+# How often a worker recomputes the snapshot to correct any drift.
+RECOMPUTE_INTERVAL = timedelta(minutes=15)
+
+
+def recompute_dashboard_metrics():
+    """Rebuild the snapshot from full-table aggregates."""
+    current_period = current_billing_period()
+    customer_stats = Customer.objects.aggregate(
+        total=Count("id"), active=Count("id", filter=Q(is_active=True))
+    )
+    package_stats = Package.objects.aggregate(total=Count("id"))
+    payment_stats = Payment.objects.aggregate(
+        total_paid=Count("id", filter=Q(paid=True)),
+        total_amount=Sum("amount", filter=Q(paid=True)),
+        pending=Count("id", filter=Q(paid=False)),
+        current_month_count=Count(
+            "id", filter=Q(paid=True, billing_period=current_period)
+        ),
+    )
+    metrics, _ = DashboardMetrics.objects.update_or_create(
+        pk=SNAPSHOT_PK,
+        defaults={
+            "total_customers": customer_stats["total"],
+            "active_customers": customer_stats["active"],
+            "total_packages": package_stats["total"],
+            "paid_payments": payment_stats["total_paid"],
+            "pending_payments": payment_stats["pending"],
+            "total_revenue": payment_stats["total_amount"] or Decimal("0.00"),
+            "current_period": current_period,
+            "current_period_paid_payments": payment_stats["current_month_count"],
+            "is_stale": False,
+            "recomputed_at": timezone.now(),
+        },
+    )
+    return metrics
+
+
+def get_current_snapshot():
+    """The snapshot if it is current, None if missing, stale or from a past month."""
+    metrics = DashboardMetrics.objects.filter(pk=SNAPSHOT_PK).first()
+    if (
+        metrics is None
+        or metrics.is_stale
+        or metrics.current_period != current_billing_period()
+    ):
+        return None
+    return metrics
+
+
+def get_dashboard_metrics():
+    """Return the snapshot, recomputing it only when it isn't current."""
+    return get_current_snapshot() or recompute_dashboard_metrics()
+
+
+def recompute_dashboard_metrics_if_due():
+    """Recompute the snapshot if it is older than RECOMPUTE_INTERVAL."""
+    due_before = timezone.now() - RECOMPUTE_INTERVAL
+    if DashboardMetrics.objects.filter(
+        pk=SNAPSHOT_PK, recomputed_at__gte=due_before
+    ).exists():
+        return False
+    recompute_dashboard_metrics()
+    return True
+
+
+def apply_dashboard_delta(**deltas):
+    """
+    Add `deltas` to the snapshot counters with a single UPDATE.
+
+    Runs in the caller's transaction, so a rolled back write never shows up
+    on the dashboard. Does nothing until the snapshot has been computed once.
+    """
+    changes = {name: F(name) + value for name, value in deltas.items() if value}
+    if changes:
+        DashboardMetrics.objects.filter(pk=SNAPSHOT_PK).update(
+            **changes, updated_at=timezone.now()
+        )
+
+
+def mark_dashboard_stale():
+    """Force a full recompute on the next read, for writes that skip signals."""
+    DashboardMetrics.objects.filter(pk=SNAPSHOT_PK).update(is_stale=True)
+
+
+def customer_counts(values):
+    if values is None:
+        return {"total_customers": 0, "active_customers": 0}
+    return {"total_customers": 1, "active_customers": int(values["is_active"])}
+
+
+def payment_counts(values):
+    if values is None:
+        return {
+            "paid_payments": 0,
+            "pending_payments": 0,
+            "total_revenue": Decimal("0.00"),
+            "current_period_paid_payments": 0,
+        }
+    paid = values["paid"]
+    return {
+        "paid_payments": int(paid),
+        "pending_payments": int(not paid),
+        "total_revenue": Decimal(values["amount"]) if paid else Decimal("0.00"),
+        "current_period_paid_payments": int(
+            paid and values["billing_period"] == current_billing_period()
+        ),
+    }
+
+
+def counts_delta(old, new):
+    return {name: new[name] - old[name] for name in new}
@@ -0,0 +1,253 @@
+"""
+Client for the MikroTik RouterOS REST API.
+
+One process-wide `requests.Session` keeps connections to the router alive
+and reuses them across calls and threads, instead of a new TCP/TLS handshake
+per call. Every call has connect/read timeouts, idempotent calls are retried
+with exponential backoff, and per-endpoint latency is kept in `metrics()`.
+"""
+
+import codecs
+import json
+import logging
+import re
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({502, 503, 504})
+BACKOFF_FACTOR = 0.3
+# RouterOS item ids look like *1A, collapse them so metrics group by endpoint
+re_item_id = re.compile(r"/\*[0-9A-Fa-f]+")
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class MikroTikClient:
+    """
+    Calls `/rest` endpoints of one router.
+
+    `print()` and `set()` are reads and absolute writes, so they are retried
+    like the idempotent HTTP methods even though `print()` is a POST.
+    """
+
+    def __init__(
+        self,
+        url=None,
+        user=None,
+        password=None,
+        pool_size=None,
+        timeout=None,
+        retries=None,
+        verify=None,
+    ):
+        self.url = (url or settings.MIKROTIK_URL).rstrip("/")
+        self.timeout = timeout or (
+            settings.MIKROTIK_CONNECT_TIMEOUT,
+            settings.MIKROTIK_READ_TIMEOUT,
+        )
+        self.retries = settings.MIKROTIK_RETRIES if retries is None else retries
+        pool_size = pool_size or settings.MIKROTIK_POOL_SIZE
+
+        self.session = requests.Session()
+        self.session.auth = (
+            user or settings.MIKROTIK_USER,
+            password or settings.MIKROTIK_PASS,
+        )
+        self.session.verify = settings.MIKROTIK_VERIFY_SSL if verify is None else verify
+        # One host, so one pool; maxsize bounds concurrent connections to it
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._metrics = {}
+        self._metrics_lock = threading.Lock()
+
+    def request(self, method, path, idempotent=None, **kwargs):
+        """
+        Call `/rest{path}` and return the response, whatever its status.
+
+        Retries connection errors, timeouts and 502/503/504 responses when the
+        call is idempotent. Raises requests.RequestException once out of tries.
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        kwargs.setdefault("timeout", self.timeout)
+        url = f"{self.url}/rest{path}"
+        tries = self.retries + 1 if idempotent else 1
+
+        for attempt in range(tries):
+            if attempt:
+                time.sleep(BACKOFF_FACTOR * 2 ** (attempt - 1))
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.record(method, path, None, time.perf_counter() - start)
+                if attempt + 1 == tries:
+                    raise
+                logger.warning(f"MikroTik {method} {path} failed, retrying: {e}")
+                continue
+            self.record(method, path, response.status_code, time.perf_counter() - start)
+            if response.status_code in RETRY_STATUSES and attempt + 1 < tries:
+                logger.warning(
+                    f"MikroTik {method} {path} returned {response.status_code}, retrying"
+                )
+                continue
+            return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def print(self, path, query=None, proplist=None, **kwargs):
+        """POST `{path}/print`, RouterOS's filtered read."""
+        payload = {}
+        if query:
+            payload[".query"] = list(query)
+        if proplist:
+            payload[".proplist"] = list(proplist)
+        return self.request(
+            "POST", f"{path}/print", idempotent=True, json=payload, **kwargs
+        )
+
+    def set(self, path, values, **kwargs):
+        """PATCH the item at `path` with absolute `values`."""
+        return self.request("PATCH", path, idempotent=True, json=values, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def record(self, method, path, status_code, elapsed):
+        endpoint = f"{method} {re_item_id.sub('/{id}', path)}"
+        logger.debug(f"MikroTik {endpoint} -> {status_code} in {elapsed * 1000:.1f}ms")
+        with self._metrics_lock:
+            stats = self._metrics.setdefault(
+                endpoint, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0}
+            )
+            stats["calls"] += 1
+            if status_code is None or status_code >= 400:
+                stats["errors"] += 1
+            stats["total_ms"] += elapsed * 1000
+            stats["max_ms"] = max(stats["max_ms"], elapsed * 1000)
+
+    def metrics(self):
+        """Calls, errors and latency per endpoint since the client was made."""
+        with self._metrics_lock:
+            return {
+                endpoint: {**stats, "avg_ms": stats["total_ms"] / stats["calls"]}
+                for endpoint, stats in self._metrics.items()
+            }
+
+    def close(self):
+        self.session.close()
+
+
+def iter_json_array(chunks):
+    """
+    Yield the items of a JSON array of objects, read from an iterable of
+    text chunks, without holding the whole document in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    for chunk in chunks:
+        buffer += chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The item continues in the next chunk
+                break
+            yield item
+        buffer = buffer[position:]
+    raise ValueError("Unterminated JSON array")
+
+
+def iter_response_items(response):
+    """`iter_json_array` over a response requested with stream=True."""
+    chunks = response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+    return iter_json_array(codecs.iterdecode(chunks, "utf-8"))
+
+
+class ActiveSessionIndex:
+    """
+    Name -> `.id` of the router's active PPP sessions, fetched once and kept
+    for `ttl` seconds, for batches that terminate many sessions.
+
+    Build one per batch; entries go stale as users connect and disconnect.
+    """
+
+    def __init__(self, client, ttl=30):
+        # ttl=None keeps the first fetch for the index's lifetime
+        self.client = client
+        self.ttl = ttl
+        self._sessions = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        response = self.client.print("/ppp/active", proplist=[".id", "name"])
+        response.raise_for_status()
+        self._sessions = {session["name"]: session[".id"] for session in response.json()}
+        self._loaded_at = time.monotonic()
+
+    def pop(self, name):
+        """The `.id` of `name`'s session, or None, forgetting it once terminated."""
+        with self._lock:
+            if self._sessions is None or (
+                self.ttl is not None and time.monotonic() - self._loaded_at > self.ttl
+            ):
+                self.load()
+            return self._sessions.pop(name, None)
+
+
+class RateLimiter:
+    """Spaces calls evenly to at most `rate` per second, across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_mikrotik_client():
+    """The process-wide client, so every caller shares its connection pool."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MikroTikClient()
+    return _client
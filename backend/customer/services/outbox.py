@@ -0,0 +1,191 @@
+"""
+Outbox of changes to push to the router.
+
+Customer saves queue a RouterCommand in their own transaction instead of
+calling the router, so a save never waits on it and a rollback never leaves
+the router changed. The `dispatch_router_commands` worker sends them,
+keeping only the latest command per user and retrying failures with
+exponential backoff. A new command supersedes the user's queued ones, so an
+older command backing off is never sent after it, and a user's commands wait
+while another worker is still sending one of theirs.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, Max, OuterRef, Q
+from django.utils import timezone
+
+from common.counts import tables_changed
+from customer.choices import RouterCommandState
+from customer.models import Customer, RouterCommand
+from customer.services.mikrotik import ActiveSessionIndex, get_mikrotik_client
+from customer.utils import toggle_customer, toggle_ppp_user
+
+MAX_ATTEMPTS = 8
+RETRY_DELAY = timedelta(seconds=30)
+MAX_RETRY_DELAY = timedelta(hours=1)
+# A SENDING command this old was claimed by a worker that died
+STALE_AFTER = timedelta(minutes=10)
+# Fetch the whole active session table once rather than query per user
+SESSION_INDEX_MIN = 10
+
+
+def enqueue_router_command(customer, disable):
+    """Queue enabling or disabling `customer`'s PPP secret."""
+    if not customer.username:
+        return None
+    supersede_router_commands({customer.username})
+    return RouterCommand.objects.create(
+        customer=customer, username=customer.username, disable=disable
+    )
+
+
+def enqueue_router_commands(customers, disable):
+    """`enqueue_router_command` for many customers, with one INSERT."""
+    supersede_router_commands(
+        {customer.username for customer in customers if customer.username}
+    )
+    commands = RouterCommand.objects.bulk_create(
+        RouterCommand(customer=customer, username=customer.username, disable=disable)
+        for customer in customers
+        if customer.username
+    )
+    if commands:
+        tables_changed(RouterCommand)
+    return commands
+
+
+def supersede_router_commands(usernames):
+    """
+    Drop the queued commands of users whose state was just pushed directly,
+    or who are about to get a newer command.
+    """
+    superseded = RouterCommand.objects.filter(
+        username__in=usernames, state=RouterCommandState.PENDING
+    ).update(state=RouterCommandState.SUPERSEDED, updated_at=timezone.now())
+    if superseded:
+        tables_changed(RouterCommand)
+    return superseded
+
+
+def due_router_commands(now=None):
+    """
+    Commands ready to send: pending ones whose retry is due and stale claims.
+
+    Users with a command another worker is still sending are left out, so a
+    newer command can't reach the router before the older one lands.
+    """
+    now = now or timezone.now()
+    stale_before = now - STALE_AFTER
+    sending = RouterCommand.objects.filter(
+        username=OuterRef("username"),
+        state=RouterCommandState.SENDING,
+        updated_at__gte=stale_before,
+    )
+    return RouterCommand.objects.filter(
+        Q(state=RouterCommandState.PENDING, next_attempt_at__lte=now)
+        | Q(state=RouterCommandState.SENDING, updated_at__lt=stale_before),
+        ~Exists(sending),
+    )
+
+
+def claim_router_commands(limit):
+    """Mark up to `limit` due commands as sending for the calling worker."""
+    now = timezone.now()
+    with transaction.atomic():
+        commands = list(
+            due_router_commands(now)
+            .select_for_update(skip_locked=True)
+            .order_by("pk")[:limit]
+        )
+        RouterCommand.objects.filter(pk__in=[command.pk for command in commands]).update(
+            state=RouterCommandState.SENDING, updated_at=now
+        )
+    return commands
+
+
+def retry_delay(attempts):
+    return min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def dispatch_router_commands(limit=500, client=None):
+    """
+    Send up to `limit` due commands, oldest first.
+
+    Returns:
+        Counter: commands sent, superseded, retried and failed.
+    """
+    commands = claim_router_commands(limit)
+    if not commands:
+        return Counter()
+    client = client or get_mikrotik_client()
+    now = timezone.now()
+    counts = Counter()
+
+    # Only the latest command of a user matters, the rest are coalesced
+    latest = {}
+    for command in commands:
+        previous = latest.get(command.username)
+        if previous is not None:
+            previous.state = RouterCommandState.SUPERSEDED
+            counts["superseded"] += 1
+        latest[command.username] = command
+
+    # A command sending when a newer one was queued may be back for a retry,
+    # or re-claimed after its worker died. Either way the newer one wins.
+    newest = dict(
+        RouterCommand.objects.filter(username__in=latest)
+        .order_by()
+        .values("username")
+        .annotate(newest=Max("pk"))
+        .values_list("username", "newest")
+    )
+    for username, command in list(latest.items()):
+        if command.pk < newest[username]:
+            command.state = RouterCommandState.SUPERSEDED
+            counts["superseded"] += 1
+            del latest[username]
+
+    customers = Customer.objects.only("id", "username", "secret_id").in_bulk(
+        {command.customer_id for command in latest.values() if command.customer_id}
+    )
+    disables = sum(command.disable for command in latest.values())
+    sessions = ActiveSessionIndex(client) if disables >= SESSION_INDEX_MIN else None
+
+    for command in latest.values():
+        customer = customers.get(command.customer_id)
+        if customer is not None and customer.username == command.username:
+            success, message = toggle_customer(
+                customer, command.disable, client=client, sessions=sessions
+            )
+        else:
+            success, message = toggle_ppp_user(
+                command.username, command.disable, client=client, sessions=sessions
+            )
+
+        command.attempts += 1
+        if success:
+            command.state = RouterCommandState.SENT
+            command.sent_at = timezone.now()
+            command.error = ""
+            counts["sent"] += 1
+        elif command.attempts >= MAX_ATTEMPTS:
+            command.state = RouterCommandState.FAILED
+            command.error = message
+            counts["failed"] += 1
+        else:
+            command.state = RouterCommandState.PENDING
+            command.next_attempt_at = timezone.now() + retry_delay(command.attempts)
+            command.error = message
+            counts["retried"] += 1
+
+    for command in commands:
+        command.updated_at = now
+    RouterCommand.objects.bulk_update(
+        commands,
+        ["state", "attempts", "next_attempt_at", "sent_at", "error", "updated_at"],
+    )
+    tables_changed(RouterCommand)
+    return counts
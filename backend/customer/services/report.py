@@ -0,0 +1,195 @@
+"""Revenue and collection reports aggregated from the revenue rollup."""
+
+import hashlib
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet, FullResultSet
+from django.db import connection
+from django.db.models import Sum
+
+from customer.models import Package, RevenueRollup
+from customer.services.revenue import ROLLUP_TOTALS, rollup_version
+
+REPORT_CACHE_TIMEOUT = 60 * 60
+
+# Report dimension -> rollup column, in their canonical ROLLUP order
+REPORT_DIMENSIONS = {
+    "month": "billing_period",
+    "package": "package_id",
+    "payment_method": "payment_method",
+    "entry_by": "entry_by_id",
+}
+# Report filter -> rollup lookup
+REPORT_FILTERS = {
+    "start": "billing_period__gte",
+    "end": "billing_period__lte",
+    "package": "package_id__in",
+    "payment_method": "payment_method__in",
+    "entry_by": "entry_by_id__in",
+}
+
+
+def normalize_report(dimensions, filters):
+    """Return the canonical (dimensions, filters) of a report request."""
+    dimensions = [name for name in REPORT_DIMENSIONS if name in set(dimensions)]
+    filters = {
+        name: sorted(value) if isinstance(value, (list, tuple, set)) else value
+        for name, value in sorted(filters.items())
+        if value not in (None, "", [], ())
+    }
+    return dimensions, filters
+
+
+def report_cache_key(dimensions, filters):
+    """Cache key of a normalized report, stale as soon as the rollup changes."""
+    signature = json.dumps([dimensions, filters], default=str, sort_keys=True)
+    digest = hashlib.sha1(signature.encode()).hexdigest()
+    return f"revenue-report:{rollup_version()}:{digest}"
+
+
+def revenue_report(dimensions, filters=None):
+    """
+    Totals grouped by `dimensions` with ROLLUP subtotals and a grand total.
+
+    Each row carries its dimension values and a `level`, the number of leading
+    dimensions it is grouped by: `len(dimensions)` for detail rows, down to 0
+    for the grand total. Results are cached per normalized request.
+    """
+    dimensions, filters = normalize_report(dimensions, filters or {})
+    key = report_cache_key(dimensions, filters)
+    rows = caches["shared"].get(key)
+    if rows is None:
+        queryset = RevenueRollup.objects.filter(
+            **{REPORT_FILTERS[name]: value for name, value in filters.items()}
+        )
+        if connection.vendor == "postgresql":
+            rows = _grouped_rollup_sql(queryset, dimensions)
+        else:
+            rows = _grouped_rollup_emulated(queryset, dimensions)
+        rows.sort(key=lambda row: _report_sort_key(row, dimensions))
+        _add_labels(rows, dimensions)
+        caches["shared"].set(key, rows, REPORT_CACHE_TIMEOUT)
+    return rows
+
+
+def _from_where(queryset):
+    """
+    The FROM and WHERE clauses of `queryset`, compiled from its query rather
+    than cut out of its SQL, so filters that join or nest subqueries survive.
+
+    Returns:
+        tuple: (from sql, where sql or "", params)
+    """
+    query = queryset.order_by().values("pk").query
+    compiler = query.get_compiler(connection=connection)
+    # Sets up the joins the filters need, for get_from_clause
+    compiler.pre_sql_setup()
+    try:
+        where, where_params = compiler.compile(query.where)
+    except EmptyResultSet:
+        where, where_params = "1 = 0", []
+    except FullResultSet:
+        where, where_params = "", []
+    from_parts, from_params = compiler.get_from_clause()
+    return " ".join(from_parts), where, [*from_params, *where_params]
+
+
+def _grouped_rollup_sql(queryset, dimensions):
+    """GROUP BY ROLLUP (...) in a single query."""
+    table = connection.ops.quote_name(RevenueRollup._meta.db_table)
+    from_sql, where, params = _from_where(queryset)
+    columns = [
+        f"{table}.{connection.ops.quote_name(REPORT_DIMENSIONS[name])}"
+        for name in dimensions
+    ]
+    selects = columns + [
+        f"SUM({table}.{connection.ops.quote_name(name)})" for name in ROLLUP_TOTALS
+    ]
+    group_by = f"ROLLUP ({', '.join(columns)})" if columns else "()"
+    if columns:
+        selects.append(f"GROUPING({', '.join(columns)})")
+    query = f"SELECT {', '.join(selects)} FROM {from_sql}"
+    if where:
+        query += f" WHERE {where}"
+    query += f" GROUP BY {group_by}"
+
+    rows = []
+    with connection.cursor() as cursor:
+        cursor.execute(query, params)
+        for values in cursor.fetchall():
+            row = dict(zip(dimensions, values))
+            totals = values[len(dimensions) : len(dimensions) + len(ROLLUP_TOTALS)]
+            row.update(zip(ROLLUP_TOTALS, totals))
+            mask = values[-1] if dimensions else 0
+            row["level"] = len(dimensions) - bin(mask).count("1")
+            rows.append(_with_zero_totals(row))
+    return rows
+
+
+def _grouped_rollup_emulated(queryset, dimensions):
+    """One GROUP BY over every dimension, subtotals summed up in Python."""
+    grouped = (
+        queryset.order_by()
+        .values(*(REPORT_DIMENSIONS[name] for name in dimensions))
+        .annotate(**{f"total_{name}": Sum(name) for name in ROLLUP_TOTALS})
+    )
+    levels = [{} for _ in range(len(dimensions) + 1)]
+    for values in grouped:
+        group = tuple(values[REPORT_DIMENSIONS[name]] for name in dimensions)
+        for level, subtotals in enumerate(levels):
+            row = subtotals.setdefault(
+                group[:level],
+                {
+                    **dict(zip(dimensions, group[:level] + (None,) * len(dimensions))),
+                    **dict.fromkeys(ROLLUP_TOTALS, 0),
+                    "level": level,
+                },
+            )
+            for name in ROLLUP_TOTALS:
+                row[name] += values[f"total_{name}"] or 0
+    if not levels[0]:
+        # Like SQL, an empty input still has a grand total row
+        levels[0][()] = {**dict.fromkeys(dimensions), "level": 0}
+    return [_with_zero_totals(row) for rows in levels for row in rows.values()]
+
+
+def _with_zero_totals(row):
+    for name in ROLLUP_TOTALS:
+        if row.get(name) is None:
+            row[name] = 0
+    for name in ("billed_amount", "collected_amount"):
+        row[name] = Decimal(row[name]).quantize(Decimal("0.01"))
+    return row
+
+
+def _add_labels(rows, dimensions):
+    if "package" in dimensions:
+        ids = {row["package"] for row in rows if row["package"] is not None}
+        names = dict(Package.objects.filter(id__in=ids).values_list("id", "name"))
+        for row in rows:
+            row["package_name"] = names.get(row["package"])
+    if "entry_by" in dimensions:
+        ids = {row["entry_by"] for row in rows if row["entry_by"] is not None}
+        users = get_user_model().objects.filter(id__in=ids)
+        names = {
+            pk: f"{first_name} {last_name}".strip()
+            for pk, first_name, last_name in users.values_list(
+                "id", "first_name", "last_name"
+            )
+        }
+        for row in rows:
+            row["entry_by_name"] = names.get(row["entry_by"])
+
+
+def _report_sort_key(row, dimensions):
+    # Ascending by dimension, NULLs first, subtotals after their detail rows
+    key = []
+    for index, name in enumerate(dimensions):
+        value = row[name]
+        key.append(
+            (index >= row["level"], value is not None, 0 if value is None else value)
+        )
+    return key
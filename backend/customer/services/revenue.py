@@ -0,0 +1,253 @@
+"""Monthly revenue rollup, the source for trend charts and reports."""
+
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from common.counts import table_versions, tables_changed
+from customer.models import Customer, Payment, RevenueRollup
+from customer.utils import shift_billing_period
+
+BATCH_SIZE = 1000
+ROLLUP_TOTALS = ("billed_amount", "collected_amount", "payments_count", "paid_count")
+
+
+def rollup_version():
+    """
+    Write version of the rollup table, for keying cached reports. Bumped
+    atomically on commit of every rollup change, see common.counts.
+    """
+    table = RevenueRollup._meta.db_table
+    return table_versions([table])[table]
+
+
+def rollup_key(billing_period, package_id, payment_method, entry_by_id):
+    return {
+        "billing_period": billing_period,
+        "package_id": package_id,
+        "payment_method": payment_method,
+        "entry_by_id": entry_by_id,
+    }
+
+
+def payment_rollup(values, package_id):
+    """Return (key, totals) a payment with tracked `values` adds to the rollup."""
+    paid = values["paid"]
+    key = rollup_key(
+        values["billing_period"],
+        package_id,
+        values["payment_method"],
+        values["entry_by_id"],
+    )
+    totals = {
+        "billed_amount": Decimal(values["bill_amount"]),
+        "collected_amount": Decimal(values["amount"]) if paid else Decimal("0.00"),
+        "payments_count": 1,
+        "paid_count": int(paid),
+    }
+    return key, totals
+
+
+def apply_rollup_delta(key, **deltas):
+    """Add `deltas` to the rollup row for `key`, creating the row if needed."""
+    changes = {name: F(name) + value for name, value in deltas.items() if value}
+    if not changes:
+        return
+    tables_changed(RevenueRollup)
+    if RevenueRollup.objects.filter(**key).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            RevenueRollup.objects.create(**key, **deltas)
+    except IntegrityError:
+        # Created by a concurrent write in the meantime
+        RevenueRollup.objects.filter(**key).update(**changes)
+
+
+def add_rollup_delta(deltas, key, totals, sign):
+    current = deltas.setdefault(tuple(key.values()), dict.fromkeys(ROLLUP_TOTALS, 0))
+    for name, value in totals.items():
+        current[name] += sign * (value or 0)
+
+
+def apply_payment_change(old, new, package_id):
+    """Move a payment's contribution from its `old` to its `new` values."""
+    apply_payment_changes([(old, new, package_id)])
+
+
+def apply_payment_changes(changes):
+    """
+    `apply_payment_change` for many (old, new, package_id) changes at once,
+    with one rollup update per key they touch.
+    """
+    deltas = {}
+    for old, new, package_id in changes:
+        for values, sign in ((old, -1), (new, 1)):
+            if values is not None:
+                add_rollup_delta(deltas, *payment_rollup(values, package_id), sign)
+    for key, totals in deltas.items():
+        apply_rollup_delta(rollup_key(*key), **totals)
+
+
+def apply_saved_payment(payment, old, new):
+    """
+    `apply_payment_change` for a saved or deleted `payment`, each of `old`
+    and `new` keyed by the package of the customer it belongs to.
+    """
+    customer_ids = {values["customer_id"] for values in (old, new) if values}
+    if Payment.customer.is_cached(payment) and customer_ids == {payment.customer_id}:
+        packages = {payment.customer_id: payment.customer.package_id}
+    else:
+        packages = dict(
+            Customer.objects.filter(pk__in=customer_ids)
+            .order_by()
+            .values_list("pk", "package_id")
+        )
+    if old and new and old["customer_id"] != new["customer_id"]:
+        changes = [
+            (old, None, packages.get(old["customer_id"])),
+            (None, new, packages.get(new["customer_id"])),
+        ]
+    else:
+        changes = [(old, new, packages.get((new or old)["customer_id"]))]
+    apply_payment_changes(changes)
+
+
+def move_customer_payments(moves):
+    """
+    Re-key the rollup contributions of customers whose package changed, with
+    one GROUP BY over their payments.
+
+    `moves` maps customer ids to (old package id, new package id).
+    """
+    moves = {pk: packages for pk, packages in moves.items() if packages[0] != packages[1]}
+    if not moves:
+        return
+    grouped = (
+        Payment.objects.filter(customer_id__in=moves)
+        .order_by()
+        .values("customer_id", "billing_period", "payment_method", "entry_by_id")
+        .annotate(
+            billed_amount=Sum("bill_amount"),
+            collected_amount=Sum("amount", filter=Q(paid=True)),
+            payments_count=Count("id"),
+            paid_count=Count("id", filter=Q(paid=True)),
+        )
+    )
+    deltas = {}
+    for row in grouped:
+        totals = {name: row[name] for name in ROLLUP_TOTALS}
+        for package_id, sign in zip(moves[row["customer_id"]], (-1, 1)):
+            key = rollup_key(
+                row["billing_period"],
+                package_id,
+                row["payment_method"],
+                row["entry_by_id"],
+            )
+            add_rollup_delta(deltas, key, totals, sign)
+    for key, totals in deltas.items():
+        apply_rollup_delta(rollup_key(*key), **totals)
+
+
+def rebuild_revenue_rollup(periods=None):
+    """
+    Recompute the rollup from payments with one GROUP BY pass.
+
+    `periods` limits the rebuild to those billing periods.
+    Returns:
+        int: Number of rollup rows written.
+    """
+    payments = Payment.objects.all()
+    rollups = RevenueRollup.objects.all()
+    if periods is not None:
+        payments = payments.filter(billing_period__in=periods)
+        rollups = rollups.filter(billing_period__in=periods)
+
+    grouped = (
+        payments.order_by()
+        .values("billing_period", "payment_method", "entry_by_id")
+        .annotate(
+            rollup_package_id=F("customer__package_id"),
+            billed_amount=Sum("bill_amount"),
+            collected_amount=Sum("amount", filter=Q(paid=True)),
+            payments_count=Count("id"),
+            paid_count=Count("id", filter=Q(paid=True)),
+        )
+    )
+
+    written = 0
+    with transaction.atomic():
+        tables_changed(RevenueRollup)
+        rollups.delete()
+        batch = []
+        for row in grouped.iterator(chunk_size=BATCH_SIZE):
+            batch.append(
+                RevenueRollup(
+                    **rollup_key(
+                        row["billing_period"],
+                        row["rollup_package_id"],
+                        row["payment_method"],
+                        row["entry_by_id"],
+                    ),
+                    billed_amount=row["billed_amount"] or Decimal("0.00"),
+                    collected_amount=row["collected_amount"] or Decimal("0.00"),
+                    payments_count=row["payments_count"],
+                    paid_count=row["paid_count"],
+                )
+            )
+            if len(batch) == BATCH_SIZE:
+                RevenueRollup.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        RevenueRollup.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+TIMESERIES_GROUPS = {
+    "package": "package_id",
+    "payment_method": "payment_method",
+    "entry_by": "entry_by_id",
+}
+
+
+def revenue_timeseries(start, end, group_by=None):
+    """
+    Monthly totals for billing periods `start`..`end`, read from the rollup only.
+
+    Without `group_by` every month in the range is present, empty ones as zeros.
+    """
+    fields = ["billing_period"]
+    if group_by:
+        fields.append(TIMESERIES_GROUPS[group_by])
+    rows = (
+        RevenueRollup.objects.filter(billing_period__range=(start, end))
+        .order_by()
+        .values(*fields)
+        .annotate(**{name: Sum(name) for name in ROLLUP_TOTALS})
+        .order_by(*fields)
+    )
+    if group_by:
+        return [
+            {**row, group_by: row.pop(TIMESERIES_GROUPS[group_by])} for row in rows
+        ]
+
+    by_period = {row["billing_period"]: row for row in rows}
+    series = []
+    period = start
+    while period <= end:
+        series.append(
+            by_period.get(
+                period,
+                {
+                    "billing_period": period,
+                    "billed_amount": Decimal("0.00"),
+                    "collected_amount": Decimal("0.00"),
+                    "payments_count": 0,
+                    "paid_count": 0,
+                },
+            )
+        )
+        period = shift_billing_period(period, 1)
+    return series
@@ -0,0 +1,519 @@
+"""
+Two-way sync of the router's PPP secrets and the Customer table, and the
+one-way import of the secrets as customers.
+
+The secrets are fetched once and each is reduced to the fields both sides
+hold (disabled flag, speed, password and MAC), hashed and compared to the
+customer's hash and to the RouterSecretSnapshot of the last state both sides
+agreed on. A user whose three hashes match is skipped, so a rerun on an
+unchanged router costs one fetch and one hash pass. For the others each
+field is applied in the direction it changed since the snapshot; a field
+changed on both sides, or not in a snapshot yet, follows the conflict policy.
+"""
+
+import hashlib
+import json
+import logging
+from collections import Counter
+from itertools import takewhile
+
+import requests
+from django.db import transaction
+from django.utils import timezone
+
+from common.counts import tables_changed
+from customer.choices import ConnectionType
+from customer.models import Customer, Package, RouterSecretSnapshot
+from customer.services.dashboard import apply_dashboard_delta
+from customer.services.mikrotik import get_mikrotik_client
+from customer.services.outbox import supersede_router_commands
+from customer.services.revenue import move_customer_payments
+from customer.services.search import index_customers, rebuild_customer_search_index
+from customer.utils import find_ppp_session_ids
+
+logger = logging.getLogger(__name__)
+
+# Name and price of the packages created for speeds first seen on the router
+PACKAGE_DETAIL = {
+    5: {"name": "Basic", "price": 500},
+    10: {"name": "Standard", "price": 750},
+    15: {"name": "Premium", "price": 1000},
+    20: {"name": "Package 20 Mbps", "price": 2000},
+    30: {"name": "Package 30 Mbps", "price": 3000},
+    50: {"name": "Package 50 Mbps", "price": 5000},
+}
+
+SECRET_PROPLIST = [
+    ".id",
+    "name",
+    "disabled",
+    "profile",
+    "password",
+    "caller-id",
+    "last-caller-id",
+    "service",
+    "comment",
+]
+SYNCED_FIELDS = ("disabled", "speed", "password", "mac")
+# Customer fields an import overwrites; name and address are only set on insert
+IMPORTED_FIELDS = (
+    "secret_id",
+    "package_id",
+    "password",
+    "mac_address",
+    "is_active",
+    "connection_type",
+)
+
+# Conflict policies: which side a field changed on both sides is taken from
+PREFER_ROUTER = "router"
+PREFER_DATABASE = "db"
+PREFER_NEITHER = "skip"
+CONFLICT_POLICIES = (PREFER_ROUTER, PREFER_DATABASE, PREFER_NEITHER)
+
+
+def parse_profile_speed(profile):
+    """Speed in Mbps of a PPP profile named like "10Mbps", 0 if it has none."""
+    digits = "".join(takewhile(str.isdigit, profile or ""))
+    return int(digits) if digits else 0
+
+
+def resolve_packages(speeds):
+    """
+    Return the package of each speed in `speeds`, creating the missing ones
+    with one INSERT. Speed 0, a profile without one, has no package.
+    """
+    packages = {}
+    for package in Package.objects.filter(speed_mbps__in=speeds).order_by("created_at"):
+        packages.setdefault(package.speed_mbps, package)
+    missing = [
+        Package(
+            name=PACKAGE_DETAIL.get(speed, {}).get("name", f"Package {speed} Mbps"),
+            speed_mbps=speed,
+            # Default price, can be updated later
+            price=PACKAGE_DETAIL.get(speed, {}).get("price", 0.0),
+        )
+        for speed in sorted(set(speeds) - set(packages) - {0})
+    ]
+    if missing:
+        # bulk_create skips the save signals, count the packages here
+        Package.objects.bulk_create(missing)
+        tables_changed(Package)
+        apply_dashboard_delta(total_packages=len(missing))
+        packages.update((package.speed_mbps, package) for package in missing)
+    return packages
+
+
+def secret_values(secret):
+    """The synced fields of a PPP secret as the REST API returns it."""
+    return {
+        "disabled": secret.get("disabled", "false") == "true",
+        "speed": parse_profile_speed(secret.get("profile", "")),
+        "password": secret.get("password", ""),
+        "mac": secret.get("caller-id") or secret.get("last-caller-id", ""),
+    }
+
+
+def customer_values(customer, speeds):
+    """The synced fields of `customer`, `speeds` maps package ids to speeds."""
+    return {
+        "disabled": not customer.is_active,
+        "speed": speeds.get(customer.package_id, 0),
+        "password": customer.password,
+        "mac": customer.mac_address,
+    }
+
+
+def values_digest(values):
+    data = json.dumps([values[field] for field in SYNCED_FIELDS])
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+def secret_to_customer(secret, packages):
+    """A new, unsaved Customer for a PPP secret the database doesn't have."""
+    username = secret.get("name", "")
+    values = secret_values(secret)
+    name = username.split(".")[1] if "." in username else username
+    package = packages.get(values["speed"])
+    return Customer(
+        name=name.capitalize(),
+        secret_id=secret.get(".id", ""),
+        username=username,
+        package_id=package.pk if package else None,
+        password=values["password"],
+        mac_address=values["mac"],
+        is_active=not values["disabled"],
+        address=secret.get("comment", ""),
+        connection_type=(
+            ConnectionType.PPPoE
+            if secret.get("service") == "pppoe"
+            else ConnectionType.DHCP
+        ),
+    )
+
+
+def import_secrets(secrets, batch_size=500):
+    """
+    Upsert customers from an iterable of PPP secrets, `batch_size` at a time,
+    on their unique username. Rows whose imported fields already match are
+    left alone.
+
+    Returns:
+        Counter: customers inserted, updated and unchanged.
+    """
+    packages = {}
+    for package in Package.objects.order_by("created_at"):
+        packages.setdefault(package.speed_mbps, package)
+    counts = Counter()
+    batch = {}
+    for secret in secrets:
+        if secret.get("name"):
+            batch[secret["name"]] = secret
+        if len(batch) >= batch_size:
+            counts.update(upsert_secrets(batch, packages))
+            batch = {}
+    if batch:
+        counts.update(upsert_secrets(batch, packages))
+    if counts["inserted"] or counts["updated"]:
+        rebuild_customer_search_index()
+    return counts
+
+
+def upsert_secrets(secrets, packages):
+    """
+    One batch of `import_secrets`, `secrets` maps usernames to secrets and
+    `packages` speeds to packages, completed with the speeds first seen.
+    """
+    counts = Counter()
+    speeds = {parse_profile_speed(secret.get("profile", "")) for secret in secrets.values()}
+    with transaction.atomic():
+        missing = speeds - packages.keys() - {0}
+        if missing:
+            packages.update(resolve_packages(missing))
+        existing = {
+            row[0]: (row[1], row[2:])
+            for row in Customer.objects.filter(username__in=secrets).values_list(
+                "username", "id", *IMPORTED_FIELDS
+            )
+        }
+        rows = []
+        toggled = []
+        moves = {}
+        activated = 0
+        for username, secret in secrets.items():
+            customer = secret_to_customer(secret, packages)
+            values = tuple(getattr(customer, field) for field in IMPORTED_FIELDS)
+            pk, old = existing.get(username, (None, None))
+            if old is None:
+                counts["inserted"] += 1
+                activated += customer.is_active
+            elif old == values:
+                counts["unchanged"] += 1
+                continue
+            else:
+                counts["updated"] += 1
+                was_active = old[IMPORTED_FIELDS.index("is_active")]
+                if was_active != customer.is_active:
+                    activated += customer.is_active - was_active
+                    toggled.append(username)
+                package_index = IMPORTED_FIELDS.index("package_id")
+                moves[pk] = (old[package_index], customer.package_id)
+            rows.append(customer)
+        if not rows:
+            return counts
+
+        # bulk_create skips the save signals, so nothing is queued for the router
+        Customer.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["username"],
+            update_fields=[
+                "secret_id",
+                "package",
+                "password",
+                "mac_address",
+                "is_active",
+                "connection_type",
+                "updated_at",
+            ],
+        )
+        tables_changed(Customer)
+        move_customer_payments(moves)
+        if toggled:
+            # Queued commands for these users predate the router's state
+            supersede_router_commands(toggled)
+        apply_dashboard_delta(
+            total_customers=counts["inserted"], active_customers=activated
+        )
+    return counts
+
+
+def profile_names(secrets):
+    """The most used profile name of each speed, to set a package's speed on the router."""
+    used = Counter(secret.get("profile", "") for secret in secrets)
+    names = {}
+    for profile, _ in used.most_common():
+        names.setdefault(parse_profile_speed(profile), profile)
+    names.pop(0, None)
+    return names
+
+
+def router_values(changes, profiles):
+    """The PATCH body setting `changes` of synced fields on a PPP secret."""
+    values = {}
+    for field, value in changes.items():
+        if field == "disabled":
+            values["disabled"] = "true" if value else "false"
+        elif field == "speed":
+            values["profile"] = profiles[value]
+        elif field == "password":
+            values["password"] = value
+        elif field == "mac":
+            values["caller-id"] = value
+    return values
+
+
+def apply_to_customer(customer, changes, packages):
+    for field, value in changes.items():
+        if field == "disabled":
+            customer.is_active = not value
+        elif field == "speed":
+            package = packages.get(value)
+            customer.package_id = package.pk if package else None
+        elif field == "password":
+            customer.password = value
+        elif field == "mac":
+            customer.mac_address = value
+
+
+def merge(base, database, router, prefer, profiles):
+    """
+    Three-way merge of one user's synced fields.
+
+    Returns:
+        tuple: (agreed values, changes for the database, changes for the
+            router, whether a field conflicted)
+    """
+    agreed, to_database, to_router = {}, {}, {}
+    conflicted = False
+    for field in SYNCED_FIELDS:
+        ours, theirs = database[field], router[field]
+        if ours == theirs:
+            agreed[field] = ours
+            continue
+        router_changed = field not in base or theirs != base[field]
+        database_changed = field not in base or ours != base[field]
+        if router_changed and database_changed:
+            conflicted = True
+            winner = prefer
+        else:
+            winner = PREFER_ROUTER if router_changed else PREFER_DATABASE
+        if winner == PREFER_DATABASE and field == "speed" and ours not in profiles:
+            logger.warning(f"No router profile for {ours} Mbps, speed left unsynced")
+            winner = PREFER_NEITHER
+        if winner == PREFER_ROUTER:
+            agreed[field] = to_database[field] = theirs
+        elif winner == PREFER_DATABASE:
+            agreed[field] = to_router[field] = ours
+        else:
+            # Left out of the snapshot so it comes up again next run
+            agreed[field] = base.get(field)
+    return agreed, to_database, to_router, conflicted
+
+
+def push_secret(secret, changes, profiles, client):
+    """PATCH `changes` onto a PPP secret. Returns: str: error, None on success."""
+    try:
+        response = client.set(
+            f"/ppp/secret/{secret['.id']}", router_values(changes, profiles)
+        )
+        if response.status_code != 200:
+            return response.json().get("message", "Unknown error")
+        if changes.get("disabled"):
+            for session_id in find_ppp_session_ids(secret["name"], client) or ():
+                client.delete(f"/ppp/active/{session_id}")
+    except requests.exceptions.RequestException as e:
+        return f"Network error: {str(e)}"
+    return None
+
+
+def reconcile_router(prefer=PREFER_ROUTER, dry_run=False, client=None):
+    """
+    Bring the router's PPP secrets and the Customer table back in step.
+
+    Secrets the database doesn't have, and never had, become customers.
+    Customers without a secret and secrets whose customer was deleted are
+    only counted. With `dry_run` nothing is written on either side.
+
+    Returns:
+        Counter: users unchanged, db_updated, router_updated, created,
+            conflicts, failed, missing_in_db and missing_on_router.
+    """
+    if prefer not in CONFLICT_POLICIES:
+        raise ValueError(f"Unknown conflict policy: {prefer!r}")
+    client = client or get_mikrotik_client()
+    response = client.print("/ppp/secret", proplist=SECRET_PROPLIST)
+    response.raise_for_status()
+    secrets = {secret["name"]: secret for secret in response.json() if secret.get("name")}
+
+    snapshots = {
+        snapshot.username: snapshot for snapshot in RouterSecretSnapshot.objects.all()
+    }
+    speeds = dict(Package.objects.values_list("id", "speed_mbps"))
+    customers = {}
+    # Newest first, so the oldest customer of a duplicated username wins
+    for customer in (
+        Customer.objects.exclude(username=None)
+        .order_by("-pk")
+        .only(
+            "id",
+            "username",
+            "secret_id",
+            "is_active",
+            "package_id",
+            "password",
+            "mac_address",
+        )
+    ):
+        customers[customer.username] = customer
+
+    counts = Counter()
+    profiles = profile_names(secrets.values())
+    new_secrets = []
+    plans = []
+    agreed = {}
+    for username, secret in secrets.items():
+        router = secret_values(secret)
+        digest = values_digest(router)
+        snapshot = snapshots.get(username)
+        customer = customers.get(username)
+        if customer is None:
+            if snapshot is None:
+                new_secrets.append(secret)
+                agreed[username] = router
+            else:
+                counts["missing_in_db"] += 1
+            continue
+        if (
+            snapshot is not None
+            and snapshot.digest == digest
+            and snapshot.secret_id == secret[".id"] == customer.secret_id
+            and values_digest(customer_values(customer, speeds)) == digest
+        ):
+            counts["unchanged"] += 1
+            continue
+        values, to_database, to_router, conflicted = merge(
+            snapshot.values if snapshot else {},
+            customer_values(customer, speeds),
+            router,
+            prefer,
+            profiles,
+        )
+        counts["conflicts"] += conflicted
+        agreed[username] = values
+        plans.append((customer, secret, to_database, to_router))
+    counts["missing_on_router"] = len(customers.keys() - secrets.keys())
+    gone = snapshots.keys() - secrets.keys()
+    if not (plans or new_secrets or gone):
+        return +counts
+
+    if dry_run:
+        counts["created"] = len(new_secrets)
+        counts["db_updated"] = sum(bool(plan[2]) for plan in plans)
+        counts["router_updated"] = sum(bool(plan[3]) for plan in plans)
+        return +counts
+
+    toggled = set()
+    for customer, secret, _, to_router in plans:
+        if not to_router:
+            continue
+        error = push_secret(secret, to_router, profiles, client)
+        if error:
+            logger.error(f"Failed to update PPP secret {secret['name']}: {error}")
+            counts["failed"] += 1
+            snapshot = snapshots.get(customer.username)
+            for field in to_router:
+                agreed[customer.username][field] = (
+                    snapshot.values.get(field) if snapshot else None
+                )
+            continue
+        counts["router_updated"] += 1
+        if "disabled" in to_router:
+            toggled.add(customer.username)
+
+    with transaction.atomic():
+        packages = resolve_packages(
+            {secret_values(secret)["speed"] for secret in new_secrets}
+            | {plan[2]["speed"] for plan in plans if "speed" in plan[2]}
+        )
+        now = timezone.now()
+        updated = []
+        moves = {}
+        activated = 0
+        for customer, secret, to_database, _ in plans:
+            if not to_database and customer.secret_id == secret[".id"]:
+                continue
+            was_active = customer.is_active
+            was_package_id = customer.package_id
+            apply_to_customer(customer, to_database, packages)
+            moves[customer.pk] = (was_package_id, customer.package_id)
+            customer.secret_id = secret[".id"]
+            customer.updated_at = now
+            updated.append(customer)
+            activated += customer.is_active - was_active
+            if "disabled" in to_database:
+                toggled.add(customer.username)
+            counts["db_updated"] += bool(to_database)
+        if updated:
+            # bulk_update skips the save signals, so nothing is queued for the router
+            Customer.objects.bulk_update(
+                updated,
+                [
+                    "is_active",
+                    "package",
+                    "password",
+                    "mac_address",
+                    "secret_id",
+                    "updated_at",
+                ],
+                batch_size=1000,
+            )
+            move_customer_payments(moves)
+        if toggled:
+            # Queued commands for these users predate the state just agreed on
+            supersede_router_commands(toggled)
+
+        created = Customer.objects.bulk_create(
+            [secret_to_customer(secret, packages) for secret in new_secrets],
+            batch_size=1000,
+        )
+        counts["created"] = len(created)
+        if created:
+            index_customers(created)
+            activated += sum(customer.is_active for customer in created)
+        if updated or created:
+            tables_changed(Customer)
+            apply_dashboard_delta(
+                total_customers=len(created), active_customers=activated
+            )
+
+        RouterSecretSnapshot.objects.bulk_create(
+            [
+                RouterSecretSnapshot(
+                    username=username,
+                    secret_id=secrets[username][".id"],
+                    digest=values_digest(values),
+                    values=values,
+                    updated_at=now,
+                )
+                for username, values in agreed.items()
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["username"],
+            update_fields=["secret_id", "digest", "values", "updated_at"],
+        )
+        if gone:
+            RouterSecretSnapshot.objects.filter(username__in=gone).delete()
+
+    return +counts
@@ -0,0 +1,132 @@
+"""
+Ranked customer search over name, username, phone, NID, MAC and IP.
+
+PostgreSQL matches with pg_trgm GIN indexes. SQLite matches with the
+`customer_search` FTS5 table (trigram tokenizer), kept in sync by signals.
+"""
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+
+from common.choices import Status
+from customer.models import Customer
+
+SEARCH_FIELDS = ("name", "username", "phone", "nid", "mac_address", "ip_address")
+# Free text fields match by trigram word similarity, the others by substring
+SIMILARITY_FIELDS = ("name", "username", "mac_address")
+SUBSTRING_FIELDS = ("phone", "nid", "ip_address")
+SEARCH_TABLE = "customer_search"
+DEFAULT_SEARCH_LIMIT = 20
+# The trigram tokenizer can't use its index for shorter terms
+MIN_INDEXED_LENGTH = 3
+
+
+def search_customers(q, limit=DEFAULT_SEARCH_LIMIT):
+    """Active customers matching `q`, best match first."""
+    q = q.strip()
+    if not q:
+        return []
+    customers = Customer.objects.filter(status=Status.ACTIVE).select_related(
+        "package"
+    )
+    if connection.vendor == "postgresql":
+        return list(_search_trigram(customers, q)[:limit])
+    return _search_fts(customers, q, limit)
+
+
+def _search_trigram(customers, q):
+    matches = Q()
+    for field in SIMILARITY_FIELDS:
+        matches |= Q(**{f"{field}__trigram_word_similar": q})
+    for field in SUBSTRING_FIELDS:
+        matches |= Q(**{f"{field}__contains": q})
+    rank = Greatest(
+        *(TrigramWordSimilarity(q, field) for field in SIMILARITY_FIELDS),
+        *(
+            Case(
+                When(**{f"{field}__contains": q}, then=Value(1.0)),
+                default=Value(0.0),
+            )
+            for field in SUBSTRING_FIELDS
+        ),
+    )
+    return customers.filter(matches).annotate(rank=rank).order_by("-rank", "-id")
+
+
+def _search_fts(customers, q, limit):
+    if len(q) >= MIN_INDEXED_LENGTH:
+        phrase = '"' + q.replace('"', '""') + '"'
+        sql = (
+            f"SELECT rowid FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank"
+        )
+        params = [phrase]
+    else:
+        escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        where = " OR ".join(f"{field} LIKE %s ESCAPE '\\'" for field in SEARCH_FIELDS)
+        sql = f"SELECT rowid FROM {SEARCH_TABLE} WHERE {where} ORDER BY rowid DESC"
+        params = [f"%{escaped}%"] * len(SEARCH_FIELDS)
+
+    with connection.cursor() as cursor:
+        # Over-fetch so inactive customers can be dropped below
+        cursor.execute(f"{sql} LIMIT %s", params + [limit * 2])
+        ids = [row[0] for row in cursor.fetchall()]
+    if not ids:
+        return []
+
+    order = Case(
+        *(When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)),
+        output_field=IntegerField(),
+    )
+    return list(customers.filter(pk__in=ids).order_by(order)[:limit])
+
+
+def index_customer(customer):
+    """Write `customer`'s searchable fields to the SQLite FTS table."""
+    index_customers([customer])
+
+
+def index_customers(customers):
+    """`index_customer` for many customers, e.g. after a bulk_create."""
+    if connection.vendor != "sqlite" or not customers:
+        return
+    columns = ", ".join(SEARCH_FIELDS)
+    placeholders = ", ".join(["%s"] * (len(SEARCH_FIELDS) + 1))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s",
+            [[customer.pk] for customer in customers],
+        )
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, {columns}) VALUES ({placeholders})",
+            [
+                [customer.pk] + [getattr(customer, field) or "" for field in SEARCH_FIELDS]
+                for customer in customers
+            ],
+        )
+
+
+def unindex_customer(customer_id):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [customer_id])
+
+
+def rebuild_customer_search_index():
+    """
+    Refill the SQLite FTS table from the customer table, after bulk writes
+    that skip signals. PostgreSQL indexes the table itself, nothing to do.
+    """
+    if connection.vendor != "sqlite":
+        return
+    columns = ", ".join(SEARCH_FIELDS)
+    selects = ", ".join(f"COALESCE({field}, '')" for field in SEARCH_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, {columns}) "
+            f"SELECT id, {selects} FROM {Customer._meta.db_table}"
+        )
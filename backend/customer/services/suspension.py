@@ -0,0 +1,225 @@
+"""
+Suspend or reactivate many customers' router accounts at once.
+
+The PPP secrets (and for suspensions, the active sessions) are fetched once
+for the whole batch. The PATCH/DELETE calls are then spread over a thread
+pool under a shared rate limit, and the customers whose router account was
+updated get their `is_active` changed with one bulk_update.
+
+Requests through the API are queued as a BulkToggleRun and run by the
+`run_jobs` worker, a few thousand router calls don't fit in a request.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from common.counts import tables_changed
+from customer.choices import BillingRunState
+from customer.models import BulkToggleRun, Customer
+from customer.services.dashboard import apply_dashboard_delta
+from customer.services.mikrotik import (
+    ActiveSessionIndex,
+    MikroTikClient,
+    RateLimiter,
+    get_mikrotik_client,
+)
+from customer.services.outbox import supersede_router_commands
+
+logger = logging.getLogger(__name__)
+
+UPDATED = "updated"
+FAILED = "failed"
+# A running toggle without progress for this long is considered dead and
+# rerun; customers already toggled are skipped the second time.
+STALE_TOGGLE_AFTER = timedelta(minutes=15)
+# Customers pushed to the router between calls of bulk_toggle's `progress`
+PROGRESS_EVERY = 100
+
+
+def bulk_toggle(
+    customers, is_active, concurrency=None, rate=None, client=None, progress=None
+):
+    """
+    Set `is_active` on the router and in the database for the customers of
+    the `customers` queryset not already in that state.
+
+    `concurrency` router calls run at once, at most `rate` per second
+    (settings.MIKROTIK_BULK_CONCURRENCY and MIKROTIK_RATE_LIMIT by default).
+    `progress(done)` is called every PROGRESS_EVERY customers pushed.
+    Returns:
+        list: {"id", "uid", "username", "status", "message"} per customer.
+    """
+    concurrency = concurrency or settings.MIKROTIK_BULK_CONCURRENCY
+    limiter = RateLimiter(settings.MIKROTIK_RATE_LIMIT if rate is None else rate)
+    own_client = client is None and concurrency > settings.MIKROTIK_POOL_SIZE
+    if own_client:
+        # The shared pool would make the extra threads wait for a connection
+        client = MikroTikClient(pool_size=concurrency)
+    client = client or get_mikrotik_client()
+    disable = not is_active
+
+    customers = list(
+        customers.exclude(is_active=is_active)
+        .order_by("pk")
+        .only("id", "uid", "username", "secret_id", "is_active")
+    )
+    outcomes = {}
+    pending = []
+    for customer in customers:
+        if customer.username:
+            pending.append(customer)
+        else:
+            outcomes[customer.pk] = (
+                FAILED,
+                "Username is required to toggle user status",
+            )
+
+    if pending:
+        try:
+            outcomes.update(
+                push_to_router(pending, disable, client, concurrency, limiter, progress)
+            )
+        finally:
+            if own_client:
+                client.close()
+
+    now = timezone.now()
+    updated = []
+    for customer in customers:
+        if outcomes[customer.pk][0] == UPDATED:
+            customer.is_active = is_active
+            customer.updated_at = now
+            updated.append(customer)
+    if updated:
+        with transaction.atomic():
+            # bulk_update skips the save signals, so the router isn't toggled again
+            Customer.objects.bulk_update(
+                updated, ["is_active", "secret_id", "updated_at"], batch_size=1000
+            )
+            tables_changed(Customer)
+            # Queued commands for these users are older than what was just pushed
+            supersede_router_commands({customer.username for customer in updated})
+            sign = 1 if is_active else -1
+            apply_dashboard_delta(active_customers=sign * len(updated))
+
+    return [
+        {
+            "id": customer.pk,
+            "uid": customer.uid,
+            "username": customer.username,
+            "status": outcomes[customer.pk][0],
+            "message": outcomes[customer.pk][1],
+        }
+        for customer in customers
+    ]
+
+
+def push_to_router(customers, disable, client, concurrency, limiter, progress=None):
+    """Returns: dict: customer pk -> (status, message)."""
+    try:
+        limiter.wait()
+        response = client.print("/ppp/secret", proplist=[".id", "name", "disabled"])
+        response.raise_for_status()
+        secrets = {secret["name"]: secret for secret in response.json()}
+        sessions = None
+        if disable:
+            limiter.wait()
+            sessions = ActiveSessionIndex(client, ttl=None)
+            sessions.load()
+    except requests.exceptions.RequestException as e:
+        return {customer.pk: (FAILED, f"Network error: {str(e)}") for customer in customers}
+
+    def push(customer):
+        secret = secrets.get(customer.username)
+        if secret is None:
+            return FAILED, "User not found in PPP secrets"
+        customer.secret_id = secret[".id"]
+        try:
+            if (secret.get("disabled") == "true") != disable:
+                limiter.wait()
+                patch_resp = client.set(
+                    f"/ppp/secret/{customer.secret_id}",
+                    {"disabled": "true" if disable else "false"},
+                )
+                if patch_resp.status_code != 200:
+                    error_detail = patch_resp.json().get("message", "Unknown error")
+                    return FAILED, f"Failed to update user: {error_detail}"
+            session_id = sessions.pop(customer.username) if disable else None
+            if session_id:
+                limiter.wait()
+                # A session that already ended is no reason to fail the toggle
+                client.delete(f"/ppp/active/{session_id}")
+        except requests.exceptions.RequestException as e:
+            return FAILED, f"Network error: {str(e)}"
+        return UPDATED, "User updated successfully"
+
+    outcomes = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for customer, outcome in zip(customers, executor.map(push, customers)):
+            outcomes[customer.pk] = outcome
+            if progress is not None and len(outcomes) % PROGRESS_EVERY == 0:
+                progress(len(outcomes))
+    return outcomes
+
+
+def enqueue_bulk_toggle(customers, is_active, concurrency=None):
+    """Queue `bulk_toggle` of the `customers` queryset for the run_jobs worker."""
+    customer_ids = customers.exclude(is_active=is_active).order_by("pk")
+    return BulkToggleRun.objects.create(
+        is_active=is_active,
+        customer_ids=list(customer_ids.values_list("pk", flat=True)),
+        concurrency=concurrency,
+    )
+
+
+def queued_bulk_toggles():
+    """Toggles waiting for a worker: pending, or running for too long."""
+    stale_before = timezone.now() - STALE_TOGGLE_AFTER
+    return BulkToggleRun.objects.filter(
+        Q(state=BillingRunState.PENDING)
+        | Q(state=BillingRunState.RUNNING, updated_at__lt=stale_before)
+    )
+
+
+def claim_bulk_toggle(run):
+    """Atomically mark `run` as running, False if another worker has it."""
+    now = timezone.now()
+    claimed = queued_bulk_toggles().filter(pk=run.pk).update(
+        state=BillingRunState.RUNNING, started_at=now, updated_at=now
+    )
+    if claimed:
+        run.refresh_from_db()
+    return bool(claimed)
+
+
+def run_bulk_toggle(run):
+    """Run a claimed toggle and record its results on it."""
+    customers = Customer.objects.filter(pk__in=run.customer_ids)
+
+    def heartbeat(done):
+        # Keeps another worker from taking over a long toggle as stale
+        BulkToggleRun.objects.filter(pk=run.pk).update(updated_at=timezone.now())
+
+    try:
+        results = bulk_toggle(
+            customers, run.is_active, concurrency=run.concurrency, progress=heartbeat
+        )
+    except Exception as e:
+        logger.exception(f"Failed to run {run}")
+        run.state = BillingRunState.FAILED
+        run.error = str(e)
+    else:
+        run.updated_count = sum(result["status"] == UPDATED for result in results)
+        run.failed_count = len(results) - run.updated_count
+        run.results = results
+        run.state = BillingRunState.COMPLETED
+    run.finished_at = timezone.now()
+    run.save()
+    return run
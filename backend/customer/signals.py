@@ -0,0 +1,118 @@
+"""
+Signal receivers that keep the dashboard snapshot, rollups and search index
+in step with writes, and queue the router changes they imply.
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from customer.models import Customer, Package, Payment
+from customer.services.dashboard import (
+    apply_dashboard_delta,
+    mark_dashboard_stale,
+    customer_counts,
+    payment_counts,
+    counts_delta,
+)
+from customer.services.outbox import enqueue_router_command
+from customer.services.revenue import (
+    apply_saved_payment,
+    move_customer_payments,
+    rebuild_revenue_rollup,
+)
+from customer.services.search import SEARCH_FIELDS, index_customer, unindex_customer
+
+
+def updated_attnames(instance, update_fields):
+    """Column attnames of `update_fields`, which may name a foreign key either way."""
+    return {instance._meta.get_field(name).attname for name in update_fields}
+
+
+def saved_values(instance, created, update_fields):
+    """
+    Return (old, new) tracked values of a saved instance.
+
+    Returns None for old when the row is new, and (None, None) if the old
+    values are unknown, e.g. the instance was loaded with only()/defer().
+    """
+    new = {name: getattr(instance, name) for name in instance.tracked_fields}
+    if created:
+        return None, new
+    old = instance.loaded_values
+    if set(old) != set(instance.tracked_fields):
+        return None, None
+    if update_fields is not None:
+        # Fields left out of update_fields still hold their old database value
+        updated = updated_attnames(instance, update_fields)
+        new = {name: new[name] if name in updated else old[name] for name in new}
+    return old, new
+
+
+@receiver(post_save, sender=Customer)
+def customer_saved(sender, instance, created, update_fields=None, **kwargs):
+    old, new = saved_values(instance, created, update_fields)
+    if new is None:
+        mark_dashboard_stale()
+        if update_fields is None or "package_id" in updated_attnames(
+            instance, update_fields
+        ):
+            # The package the rollup files its payments under may have changed
+            periods = instance.payments.values_list("billing_period", flat=True)
+            rebuild_revenue_rollup(periods=set(periods))
+        return
+    apply_dashboard_delta(**counts_delta(customer_counts(old), customer_counts(new)))
+    if old is not None and old["is_active"] != new["is_active"]:
+        # Sent by the dispatch_router_commands worker once this commits
+        enqueue_router_command(instance, disable=not new["is_active"])
+    if old is not None and old["package_id"] != new["package_id"]:
+        move_customer_payments({instance.pk: (old["package_id"], new["package_id"])})
+    instance.remember_loaded_values(new)
+
+
+@receiver(post_delete, sender=Customer)
+def customer_deleted(sender, instance, **kwargs):
+    old = instance.loaded_values or {"is_active": instance.is_active}
+    apply_dashboard_delta(**counts_delta(customer_counts(old), customer_counts(None)))
+
+
+@receiver(post_save, sender=Customer)
+def customer_search_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    index_customer(instance)
+
+
+@receiver(post_delete, sender=Customer)
+def customer_search_deleted(sender, instance, **kwargs):
+    unindex_customer(instance.pk)
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance, created, update_fields=None, **kwargs):
+    old, new = saved_values(instance, created, update_fields)
+    if new is None:
+        mark_dashboard_stale()
+        rebuild_revenue_rollup(periods=[instance.billing_period])
+        return
+    apply_dashboard_delta(**counts_delta(payment_counts(old), payment_counts(new)))
+    apply_saved_payment(instance, old, new)
+    instance.remember_loaded_values(new)
+
+
+@receiver(post_delete, sender=Payment)
+def payment_deleted(sender, instance, **kwargs):
+    old = {name: getattr(instance, name) for name in instance.tracked_fields}
+    old.update(instance.loaded_values)
+    apply_dashboard_delta(**counts_delta(payment_counts(old), payment_counts(None)))
+    apply_saved_payment(instance, old, None)
+
+
+@receiver(post_save, sender=Package)
+def package_saved(sender, instance, created, **kwargs):
+    if created:
+        apply_dashboard_delta(total_packages=1)
+
+
+@receiver(post_delete, sender=Package)
+def package_deleted(sender, instance, **kwargs):
+    apply_dashboard_delta(total_packages=-1)
@@ -1,3 +1,5 @@
+from datetime import date
+
 import factory
 from faker import Faker
 from django.utils import timezone
@@ -39,7 +41,7 @@ class CustomerFactory(factory.django.DjangoModelFactory):
 
     ip_address = factory.LazyAttribute(lambda _: fake.ipv4_public())
     mac_address = factory.LazyAttribute(lambda _: fake.mac_address())
-    username = factory.Faker("user_name")
+    username = factory.LazyAttribute(lambda _: fake.unique.user_name())
     password = factory.LazyAttribute(lambda _: fake.password())
     connection_type = factory.Iterator([ConnectionType.DHCP, ConnectionType.PPPoE])
 
@@ -51,7 +53,9 @@ class PaymentFactory(factory.django.DjangoModelFactory):
     customer = factory.Iterator(Customer().get_all_actives())
     entry_by = factory.Iterator(User().get_all_actives())
     amount = factory.LazyAttribute(lambda o: o.customer.package.price)
-    billing_month = factory.Iterator([month[0] for month in Months.choices])
+    billing_period = factory.Iterator(
+        [date(2025, month, 1) for month in range(1, len(Months.choices) + 1)]
+    )
     payment_method = factory.Iterator(
         [PaymentMethod.CASH, PaymentMethod.ONLINE_PAYMENT, PaymentMethod.BKASH]
     )
@@ -0,0 +1,75 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.choices import UserKind
+from core.tests import UserFactory
+from customer.models import Customer, Payment
+from customer.services.billing import generate_bills
+from customer.tests import CustomerFactory, PackageFactory
+
+JANUARY = date(2025, 1, 1)
+
+
+class CustomerBalanceTest(APITestCase):
+    def setUp(self):
+        self.package = PackageFactory(price=Decimal("500.00"))
+        self.customer = CustomerFactory(package=self.package)
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+
+    def test_generated_bills_are_added_to_balance(self):
+        """Test that bill generation updates the ledger"""
+        generate_bills(JANUARY)
+
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.outstanding_amount, Decimal("500.00"))
+        self.assertEqual(self.customer.unpaid_bills_count, 1)
+        self.assertIsNone(self.customer.last_paid_period)
+
+    def test_payment_clears_balance(self):
+        """Test that paying a generated bill updates the ledger in the same request"""
+        generate_bills(JANUARY)
+
+        response = self.client.post(
+            "/api/v1/payments",
+            {
+                "customer_id": self.customer.id,
+                "amount": "500.00",
+                "billing_period": "2025-01",
+                "payment_method": "CASH",
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.outstanding_amount, Decimal("0.00"))
+        self.assertEqual(self.customer.unpaid_bills_count, 0)
+        self.assertEqual(self.customer.last_paid_period, JANUARY)
+
+    def test_customers_with_dues_filter(self):
+        """Test that has_dues lists only customers that owe money"""
+        other = CustomerFactory(package=self.package)
+        generate_bills(JANUARY)
+        Payment.objects.filter(customer=other).update(paid=True)
+        call_command("rebuild_balances", stdout=StringIO())
+
+        response = self.client.get("/api/v1/customers?has_dues=true")
+
+        self.assertEqual(
+            [row["id"] for row in response.data["results"]], [self.customer.id]
+        )
+
+    def test_rebuild_balances_fixes_drift(self):
+        """Test that the rebuild command recomputes the ledger from payments"""
+        generate_bills(JANUARY)
+        Customer.objects.update(outstanding_amount=0, unpaid_bills_count=0)
+
+        call_command("rebuild_balances", stdout=StringIO())
+
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.outstanding_amount, Decimal("500.00"))
+        self.assertEqual(self.customer.unpaid_bills_count, 1)
@@ -0,0 +1,201 @@
+from datetime import date
+from decimal import Decimal
+
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.choices import UserKind
+from core.tests import UserFactory
+
+from customer.choices import BillingRunState
+from customer.models import Payment, BillingRun
+from customer.services.billing import generate_bills
+from customer.tests import CustomerFactory, PackageFactory, PaymentFactory
+from customer.utils import billing_period_from_month, parse_billing_period
+
+JANUARY = date(2025, 1, 1)
+
+
+class GenerateBillsTest(TestCase):
+    def setUp(self):
+        self.package = PackageFactory(price=Decimal("500.00"))
+        self.free_package = PackageFactory(price=Decimal("0.00"))
+        self.customers = CustomerFactory.create_batch(3, package=self.package)
+
+    def test_creates_one_bill_per_billable_customer(self):
+        """Test that every active paying customer gets an unpaid bill"""
+        result = generate_bills(JANUARY)
+
+        self.assertEqual(result["created"], 3)
+        self.assertEqual(result["total_bill_amount"], Decimal("1500.00"))
+        bills = Payment.objects.filter(billing_period=JANUARY)
+        self.assertEqual(bills.count(), 3)
+        self.assertEqual(set(bills.values_list("billing_month", flat=True)), {"JANUARY"})
+        self.assertFalse(bills.filter(paid=True).exists())
+
+    def test_skips_inactive_free_and_zero_price_customers(self):
+        """Test that inactive, free and zero-price customers are not billed"""
+        CustomerFactory(package=self.package, is_active=False)
+        CustomerFactory(package=self.package, is_free=True)
+        CustomerFactory(package=self.free_package)
+
+        result = generate_bills(JANUARY)
+
+        self.assertEqual(result["created"], 3)
+
+    def test_skips_customers_already_billed(self):
+        """Test that running generation twice does not duplicate bills"""
+        PaymentFactory(
+            customer=self.customers[0], entry_by=None, billing_period=JANUARY
+        )
+
+        first = generate_bills(JANUARY)
+        second = generate_bills(JANUARY)
+
+        self.assertEqual(first["created"], 2)
+        self.assertEqual(second["created"], 0)
+        self.assertEqual(
+            Payment.objects.filter(customer=self.customers[0]).count(), 1
+        )
+
+    def test_same_month_of_another_year_is_billed_separately(self):
+        """Test that a bill for January 2024 does not block January 2025"""
+        PaymentFactory(
+            customer=self.customers[0], entry_by=None, billing_period=date(2024, 1, 1)
+        )
+
+        result = generate_bills(JANUARY)
+
+        self.assertEqual(result["created"], 3)
+
+
+class BillingPeriodTest(TestCase):
+    def test_month_name_resolves_to_most_recent_occurrence(self):
+        """Test that month names resolve to the latest matching month"""
+        today = date(2025, 1, 15)
+        self.assertEqual(billing_period_from_month("DECEMBER", today), date(2024, 12, 1))
+        self.assertEqual(billing_period_from_month("january", today), date(2025, 1, 1))
+        self.assertEqual(billing_period_from_month("FEBRUARY", today), date(2025, 2, 1))
+        self.assertEqual(billing_period_from_month("MARCH", today), date(2024, 3, 1))
+
+    def test_parse_billing_period(self):
+        """Test that dated periods are normalized to the first of the month"""
+        self.assertEqual(parse_billing_period("2025-03"), date(2025, 3, 1))
+        self.assertEqual(parse_billing_period("2025-03-17"), date(2025, 3, 1))
+        with self.assertRaises(ValueError):
+            parse_billing_period("2025-13")
+        with self.assertRaises(ValueError):
+            parse_billing_period("SMARCH")
+
+
+class GenerateBillsCommandTest(TestCase):
+    def setUp(self):
+        package = PackageFactory(price=Decimal("500.00"))
+        self.customers = CustomerFactory.create_batch(5, package=package)
+
+    def call(self, **options):
+        call_command(
+            "generate_bills", period="2025-01", workers=1, stdout=StringIO(), **options
+        )
+
+    def test_bills_every_range_and_completes_run(self):
+        """Test that the command bills all ranges and records the run"""
+        self.call(range_size=2)
+
+        run = BillingRun.objects.get(billing_period=JANUARY)
+        self.assertEqual(run.state, BillingRunState.COMPLETED)
+        self.assertEqual(run.created_count, 5)
+        self.assertEqual(run.total_bill_amount, Decimal("2500.00"))
+        self.assertEqual(run.ranges.count(), 3)
+        self.assertEqual(Payment.objects.filter(billing_period=JANUARY).count(), 5)
+
+    def test_resumes_only_unfinished_ranges(self):
+        """Test that a rerun picks up the ranges a previous run left behind"""
+        self.call(range_size=2)
+        run = BillingRun.objects.get()
+        first_range = run.ranges.first()
+        Payment.objects.filter(
+            customer_id__gte=first_range.start_id, customer_id__lt=first_range.end_id
+        ).delete()
+        run.ranges.exclude(pk=first_range.pk).update(state=BillingRunState.FAILED)
+        run.state = BillingRunState.FAILED
+        run.save()
+
+        self.call()
+
+        run.refresh_from_db()
+        self.assertEqual(BillingRun.objects.count(), 1)
+        self.assertEqual(run.state, BillingRunState.COMPLETED)
+        # The completed first range is not billed again
+        self.assertEqual(Payment.objects.filter(billing_period=JANUARY).count(), 3)
+
+    def test_refuses_to_run_alongside_a_running_run(self):
+        """Test that a period being billed elsewhere can't be started again"""
+        BillingRun.objects.create(
+            billing_period=JANUARY, state=BillingRunState.RUNNING
+        )
+
+        with self.assertRaises(CommandError):
+            self.call()
+        self.assertFalse(Payment.objects.exists())
+
+        self.call(force=True)
+        self.assertEqual(BillingRun.objects.get().state, BillingRunState.COMPLETED)
+
+    def test_interrupted_run_can_be_rerun_right_away(self):
+        """Test that a stopped command releases its run instead of holding it"""
+        with mock.patch(
+            "customer.management.commands.generate_bills.bill_range",
+            side_effect=KeyboardInterrupt,
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                self.call()
+        run = BillingRun.objects.get()
+        self.assertEqual(run.state, BillingRunState.FAILED)
+        self.assertEqual(run.error, "Interrupted.")
+
+        self.call()
+        run.refresh_from_db()
+        self.assertEqual(run.state, BillingRunState.COMPLETED)
+        self.assertEqual(Payment.objects.filter(billing_period=JANUARY).count(), 5)
+
+
+class GenerateBillJobTest(APITestCase):
+    def setUp(self):
+        package = PackageFactory(price=Decimal("500.00"))
+        CustomerFactory.create_batch(3, package=package)
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+
+    def test_generate_queues_a_single_job_per_period(self):
+        """Test that the endpoint answers 202 and reuses the queued job"""
+        first = self.client.post("/api/v1/customers/bills/generate?period=2025-01")
+        second = self.client.post("/api/v1/customers/bills/generate?month=2025-01")
+
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(first.data["state"], BillingRunState.PENDING)
+        self.assertEqual(first.data["job_id"], second.data["job_id"])
+        self.assertEqual(BillingRun.objects.count(), 1)
+        self.assertFalse(Payment.objects.exists())
+
+    def test_run_jobs_bills_queued_job_and_reports_progress(self):
+        """Test that the worker runs the job and the status endpoint reports it"""
+        job_id = self.client.post(
+            "/api/v1/customers/bills/generate?period=2025-01"
+        ).data["job_id"]
+
+        call_command("run_jobs", once=True, stdout=StringIO())
+        response = self.client.get(f"/api/v1/customers/bills/runs/{job_id}")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["state"], BillingRunState.COMPLETED)
+        self.assertEqual(response.data["created_count"], 3)
+        self.assertEqual(response.data["ranges_total"], 1)
+        self.assertEqual(response.data["ranges_completed"], 1)
+        self.assertEqual(response.data["failed_ranges"], [])
+        self.assertEqual(Payment.objects.filter(billing_period=JANUARY).count(), 3)
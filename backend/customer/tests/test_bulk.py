@@ -0,0 +1,212 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.choices import UserKind
+from core.tests import UserFactory
+from customer.models import Customer, DashboardMetrics, Payment, RouterCommand
+from customer.services.billing import generate_bills
+from customer.services.dashboard import (
+    get_dashboard_metrics,
+    recompute_dashboard_metrics,
+)
+from customer.services.revenue import rebuild_revenue_rollup
+from customer.services.search import search_customers
+from customer.tests import CustomerFactory, PackageFactory
+from customer.tests.test_dashboard import METRIC_FIELDS
+from customer.tests.test_revenue import rollup_rows
+
+JANUARY = date(2025, 1, 1)
+
+
+class BulkPaymentsTest(APITestCase):
+    def setUp(self):
+        self.package = PackageFactory(price=Decimal("500.00"))
+        # No username, so activating customers doesn't call the router
+        self.billed = CustomerFactory(package=self.package, username="")
+        self.inactive = CustomerFactory(
+            package=self.package, username="", is_active=False
+        )
+        generate_bills(JANUARY)
+        self.new = CustomerFactory(package=self.package, username="")
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+        get_dashboard_metrics()
+
+    def post(self, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/v1/payments/bulk", items, format="json")
+
+    def payment(self, customer, **fields):
+        return {
+            "customer_id": customer.id,
+            "amount": "500.00",
+            "billing_period": "2025-01",
+            "payment_method": "CASH",
+            **fields,
+        }
+
+    def test_records_payments(self):
+        """Test that bills are updated or created, with a result per item"""
+        free = CustomerFactory(package=self.package, username="", is_free=True)
+        response = self.post(
+            [
+                self.payment(self.billed),
+                self.payment(self.inactive),
+                self.payment(self.new, amount="200.00"),
+                self.payment(self.billed),
+                self.payment(free),
+                {"customer_id": 0, "amount": "500.00", "billing_period": "2025-01"},
+                {"amount": "500.00"},
+            ]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            (response.data["created"], response.data["updated"], response.data["failed"]),
+            (2, 1, 4),
+        )
+        results = response.data["results"]
+        self.assertEqual(
+            [result["status"] for result in results],
+            ["updated", "created", "created", "error", "error", "error", "error"],
+        )
+        self.assertIn("billing_period", results[3]["errors"])
+        self.assertIn("customer_id", results[4]["errors"])
+        self.assertIn("customer_id", results[6]["errors"])
+        self.assertEqual(results[2]["data"]["customer"]["id"], self.new.id)
+
+        self.assertEqual(Payment.objects.filter(paid=True).count(), 2)
+        self.assertEqual(Payment.objects.count(), 3)
+        created = Payment.objects.get(customer=self.new)
+        self.assertFalse(created.paid)
+        self.assertEqual(created.bill_amount, Decimal("500.00"))
+        self.assertEqual(created.billing_month, "JANUARY")
+
+        self.inactive.refresh_from_db()
+        self.assertTrue(self.inactive.is_active)
+        self.new.refresh_from_db()
+        self.assertEqual(self.new.outstanding_amount, Decimal("300.00"))
+        self.billed.refresh_from_db()
+        self.assertEqual(self.billed.last_paid_period, JANUARY)
+
+    def test_paid_bill_is_rejected(self):
+        self.post([self.payment(self.billed)])
+        response = self.post([self.payment(self.billed)])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("billing_month", response.data["results"][0]["errors"])
+
+    def test_aggregates_follow_writes(self):
+        """Test that the dashboard and rollup match a full recompute"""
+        self.post(
+            [
+                self.payment(self.billed),
+                self.payment(self.inactive, amount="100.00"),
+                self.payment(self.new),
+            ]
+        )
+
+        snapshot = DashboardMetrics.objects.get()
+        expected = recompute_dashboard_metrics()
+        for field in METRIC_FIELDS:
+            self.assertEqual(getattr(snapshot, field), getattr(expected, field), field)
+        incremental = rollup_rows()
+        rebuild_revenue_rollup()
+        self.assertEqual(incremental, rollup_rows())
+
+    def test_activation_queues_router_command(self):
+        Customer.objects.filter(pk=self.inactive.pk).update(username="rahim")
+        self.post([self.payment(self.inactive)])
+        command = RouterCommand.objects.get()
+        self.assertEqual((command.username, command.disable), ("rahim", False))
+        self.assertEqual(command.customer_id, self.inactive.pk)
+
+    def test_queries_do_not_grow_with_items(self):
+        customers = [
+            CustomerFactory(package=self.package, username="") for _ in range(20)
+        ]
+        generate_bills(date(2025, 2, 1))
+
+        def count_queries(batch):
+            items = [self.payment(c, billing_period="2025-02") for c in batch]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.post(items)
+            self.assertEqual(response.data["updated"], len(batch))
+            return len(queries)
+
+        count_queries(customers[:1])  # Creates the rollup row and cache keys
+        self.assertEqual(count_queries(customers[1:3]), count_queries(customers[3:]))
+
+    def test_rejects_non_lists(self):
+        response = self.client.post(
+            "/api/v1/payments/bulk", self.payment(self.billed), format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post("/api/v1/payments/bulk", [], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkCustomersTest(APITestCase):
+    def setUp(self):
+        self.package = PackageFactory(price=Decimal("500.00"))
+        self.existing = CustomerFactory(package=self.package, username="")
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+        get_dashboard_metrics()
+
+    def customer(self, name, phone, **fields):
+        return {"name": name, "phone": phone, "package_id": self.package.id, **fields}
+
+    def test_creates_customers(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/v1/customers/bulk",
+                [
+                    self.customer("Rahim Uddin", "01710000001", email="r@example.com"),
+                    self.customer("Karim Mia", "01710000002", is_active=False),
+                    self.customer("Duplicate", "01710000002"),
+                    self.customer("Taken", self.existing.phone),
+                    self.customer("Email", "01710000003", email=self.existing.email),
+                    self.customer("No package", "01710000004", package_id=0),
+                ],
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["created"], response.data["failed"]), (1, 5))
+        results = response.data["results"]
+        self.assertEqual(results[0]["data"]["package"]["id"], self.package.id)
+        self.assertIn("phone", results[1]["errors"])
+        self.assertIn("phone", results[3]["errors"])
+        self.assertIn("email", results[4]["errors"])
+        self.assertIn("package_id", results[5]["errors"])
+
+        created = Customer.objects.get(phone="01710000001")
+        self.assertEqual(created.entry_by_id, response.wsgi_request.user.id)
+        snapshot = DashboardMetrics.objects.get()
+        self.assertEqual(snapshot.total_customers, 2)
+        self.assertEqual(snapshot.active_customers, 2)
+        if connection.vendor == "sqlite":
+            self.assertEqual(list(search_customers("Rahim")), [created])
+
+    def test_usernames_are_unique(self):
+        CustomerFactory(package=self.package, username="rahim")
+        response = self.client.post(
+            "/api/v1/customers/bulk",
+            [
+                self.customer("Taken", "01710000011", username="rahim"),
+                self.customer("Twice", "01710000012", username="karim"),
+                self.customer("Twice", "01710000013", username="karim"),
+                self.customer("Blank", "01710000014", username=""),
+                self.customer("Missing", "01710000015"),
+            ],
+            format="json",
+        )
+
+        self.assertEqual((response.data["created"], response.data["failed"]), (2, 3))
+        for result in response.data["results"][:3]:
+            self.assertIn("username", result["errors"])
+        # Blank usernames are stored as NULL so they don't collide
+        self.assertEqual(Customer.objects.filter(username=None).count(), 3)
@@ -0,0 +1,105 @@
+import gzip
+import io
+import json
+import unittest
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from common.middleware import brotli
+from common.renderers import ORJSONParser, ORJSONRenderer, orjson
+from core.choices import UserKind
+from core.tests import UserFactory
+from customer.tests import CustomerFactory, PackageFactory
+
+
+@unittest.skipIf(orjson is None, "orjson is not installed")
+class ORJSONTest(unittest.TestCase):
+    def test_renders_like_json_renderer(self):
+        data = {
+            "decimal": Decimal("12.50"),
+            "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "datetime": datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+            "date": date(2025, 1, 2),
+            "text": "বিল \u2028 \u2029",
+            1: [None, True, 1.5],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indent_falls_back(self):
+        rendered = ORJSONRenderer().render({"a": 1}, "application/json; indent=2")
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+
+    def test_parses(self):
+        body = json.dumps({"name": "রহিম", "amount": 1.5}).encode()
+        self.assertEqual(
+            ORJSONParser().parse(io.BytesIO(body)), {"name": "রহিম", "amount": 1.5}
+        )
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionTest(APITestCase):
+    def setUp(self):
+        package = PackageFactory(price=Decimal("500.00"))
+        for _ in range(20):
+            CustomerFactory(package=package, username="")
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+
+    def test_gzip(self):
+        plain = self.client.get("/api/v1/customers")
+        response = self.client.get("/api/v1/customers", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertTrue(response["ETag"].startswith('W/"'))
+
+        # The weakened ETag still validates
+        response = self.client.get(
+            "/api/v1/customers",
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    def test_brotli_preferred(self):
+        plain = self.client.get("/api/v1/customers")
+        response = self.client.get(
+            "/api/v1/customers", HTTP_ACCEPT_ENCODING="gzip, deflate, br"
+        )
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    def test_brotli_length_is_randomized(self):
+        """Test that brotli gets the BREACH padding gzip has"""
+        plain = self.client.get("/api/v1/customers")
+        sizes = set()
+        for _ in range(10):
+            response = self.client.get("/api/v1/customers", HTTP_ACCEPT_ENCODING="br")
+            self.assertEqual(brotli.decompress(response.content), plain.content)
+            sizes.add(len(response.content))
+        self.assertGreater(len(sizes), 1)
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    def test_brotli_stream(self):
+        plain = self.client.get("/api/v1/customers", {"format": "ndjson"})
+        response = self.client.get(
+            "/api/v1/customers", {"format": "ndjson"}, HTTP_ACCEPT_ENCODING="br"
+        )
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(
+            brotli.decompress(b"".join(response.streaming_content)),
+            b"".join(plain.streaming_content),
+        )
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.client.get(
+            "/api/v1/customers", {"page_size": 1}, HTTP_ACCEPT_ENCODING="gzip, br"
+        )
+        self.assertFalse(response.has_header("Content-Encoding"))
@@ -0,0 +1,124 @@
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from common.counts import bump_table_version, table_state
+from common.models import TableVersion
+from core.choices import UserKind
+from core.tests import UserFactory
+from customer.models import Customer, Package
+from customer.services.dashboard import get_dashboard_metrics
+from customer.tests import CustomerFactory, PackageFactory
+
+
+class ConditionalGetTest(APITestCase):
+    def setUp(self):
+        caches["shared"].clear()
+        self.package = PackageFactory(price=Decimal("500.00"))
+        self.customer = CustomerFactory(package=self.package, username="")
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+
+    def test_unchanged_list_is_not_modified(self):
+        """Test that a matching If-None-Match is answered without the list query"""
+        response = self.client.get("/api/v1/customers")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1/customers", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+        table = f'FROM "{Customer._meta.db_table}"'
+        self.assertFalse([q for q in queries if table in q["sql"]])
+        self.assertEqual(len(queries), 1)  # The table versions
+
+    def test_writes_change_the_etag(self):
+        etag = self.client.get("/api/v1/customers")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customer.name = "Renamed"
+            self.customer.save()
+
+        response = self.client.get("/api/v1/customers", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["results"][0]["name"], "Renamed")
+
+    def test_package_write_changes_customer_etags(self):
+        """Test that a related table's writes count too"""
+        url = f"/api/v1/customers/{self.customer.uid}"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.package.name = "Faster"
+            self.package.save()
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_200_OK,
+        )
+
+    def test_racing_bumps_change_the_etag(self):
+        """Test that two bumps left on the same version still change the ETag"""
+        table = Customer._meta.db_table
+        etag = self.client.get("/api/v1/customers")["ETag"]
+        version, _ = table_state([table])[table]
+        bump_table_version(table)
+        bump_table_version(table)
+        # As a lost update would leave it: one version for both writes
+        TableVersion.objects.filter(table=table).update(version=version)
+
+        response = self.client.get("/api/v1/customers", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_query_params_have_their_own_etag(self):
+        first = self.client.get("/api/v1/payments", {"paid": "true"})["ETag"]
+        second = self.client.get("/api/v1/payments", {"paid": "false"})["ETag"]
+        self.assertNotEqual(first, second)
+
+    def test_if_modified_since(self):
+        with patch("common.views.time") as clock:
+            clock.time.return_value = time.time() + 1
+            response = self.client.get("/api/v1/packages")
+            last_modified = response["Last-Modified"]
+            response = self.client.get(
+                "/api/v1/packages", HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_last_modified_waits_for_the_end_of_the_second(self):
+        """Test that a later write in the same second can't be answered 304"""
+        table = Package._meta.db_table
+        self.client.get("/api/v1/packages")
+        _, modified = table_state([table])[table]
+
+        with patch("common.views.time") as clock:
+            clock.time.return_value = modified
+            response = self.client.get("/api/v1/packages")
+            self.assertNotIn("Last-Modified", response)
+            self.assertIn("ETag", response)
+
+            clock.time.return_value = int(modified) + 1
+            response = self.client.get("/api/v1/packages")
+        self.assertEqual(response["Last-Modified"], http_date(int(modified) + 1))
+
+    def test_dashboard(self):
+        get_dashboard_metrics()
+        etag = self.client.get("/api/v1/dashboard")["ETag"]
+        response = self.client.get("/api/v1/dashboard", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        CustomerFactory(package=self.package, username="")
+        response = self.client.get("/api/v1/dashboard", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["total_customers"], 2)
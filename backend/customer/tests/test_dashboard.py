@@ -0,0 +1,81 @@
+from datetime import date
+from decimal import Decimal
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.choices import UserKind
+from core.tests import UserFactory
+from customer.models import Payment, DashboardMetrics
+from customer.services.billing import generate_bills
+from customer.services.dashboard import (
+    get_dashboard_metrics,
+    recompute_dashboard_metrics,
+)
+from customer.tests import CustomerFactory, PackageFactory, PaymentFactory
+from customer.utils import current_billing_period
+
+METRIC_FIELDS = (
+    "total_customers",
+    "active_customers",
+    "total_packages",
+    "paid_payments",
+    "pending_payments",
+    "total_revenue",
+    "current_period_paid_payments",
+)
+
+
+class DashboardMetricsTest(APITestCase):
+    def setUp(self):
+        self.package = PackageFactory(price=Decimal("500.00"))
+        # No username, so toggling is_active doesn't call the router
+        self.customer = CustomerFactory(package=self.package, username="")
+        get_dashboard_metrics()
+
+    def assertMatchesRecompute(self):
+        snapshot = DashboardMetrics.objects.get()
+        expected = recompute_dashboard_metrics()
+        for field in METRIC_FIELDS:
+            self.assertEqual(
+                getattr(snapshot, field), getattr(expected, field), field
+            )
+
+    def test_snapshot_follows_writes(self):
+        """Test that signal deltas keep the snapshot equal to a full recompute"""
+        CustomerFactory(package=self.package, is_active=False)
+        generate_bills(current_billing_period())
+        payment = Payment.objects.get(customer=self.customer)
+        payment.amount = Decimal("500.00")
+        payment.paid = True
+        payment.save()
+        PaymentFactory(
+            customer=self.customer,
+            entry_by=None,
+            billing_period=date(2024, 1, 1),
+            amount=Decimal("300.00"),
+            paid=True,
+        ).delete()
+        self.customer.is_active = False
+        self.customer.save(update_fields=["is_active"])
+        PackageFactory()
+
+        self.assertMatchesRecompute()
+
+    def test_deleting_customer_removes_its_payments(self):
+        """Test that cascaded payment deletes are counted"""
+        generate_bills(current_billing_period())
+        self.customer.delete()
+
+        self.assertMatchesRecompute()
+
+    def test_dashboard_reads_snapshot_without_aggregates(self):
+        """Test that a dashboard read is a single snapshot lookup"""
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/v1/dashboard")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["total_customers"], 1)
+        self.assertIn("metrics_recomputed_at", response.data)
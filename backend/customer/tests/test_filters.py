@@ -0,0 +1,186 @@
+import json
+from datetime import date
+from decimal import Decimal
+from itertools import combinations
+
+from django.db import connection, transaction
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from common.filters import IndexedFilterBackend
+from core.choices import UserKind
+from core.tests import UserFactory
+from customer.filters import CUSTOMER_FILTERS, PAYMENT_FILTERS
+from customer.models import Customer, Payment
+from customer.tests import CustomerFactory, PackageFactory, PaymentFactory
+
+# A value for each param; ConditionFilters are planned once per branch
+SAMPLE_VALUES = {
+    "name": ["rahim"],
+    "username": ["rahim"],
+    "user_id": ["1"],
+    "phone": ["01700000000"],
+    "package_id": ["1"],
+    "is_active": ["true", "false"],
+    "is_free": ["true", "false"],
+    "has_dues": ["true", "false"],
+    "paid": ["true", "false"],
+    "period": ["2025-01"],
+    "collected_by": ["karim"],
+    "customer_phone": ["01700000000"],
+    "customer_name": ["rahim"],
+}
+
+
+def sequential_scans(queryset):
+    """Tables `queryset` reads without an index condition."""
+    sql, params = queryset.query.sql_with_params()
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # Make any index the planner could use cheaper than a scan
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return _pg_scans(plan[0]["Plan"])
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall() if row[-1].startswith("SCAN ")]
+
+
+def _pg_scans(node):
+    scans = []
+    if node["Node Type"] == "Seq Scan" or (
+        node["Node Type"] in ("Index Scan", "Index Only Scan")
+        and "Index Cond" not in node
+    ):
+        scans.append(node["Relation Name"])
+    for child in node.get("Plans", ()):
+        scans += _pg_scans(child)
+    return scans
+
+
+class FilterIndexTest(TestCase):
+    """
+    Every combination of declared filters must be planned as an index search.
+
+    Filters run against the bare table, without the views' status filter and
+    ordering, whose indexes would otherwise hide an unindexed filter.
+    """
+
+    def filtered(self, model, filters, values):
+        request = Request(APIRequestFactory().get("/", values))
+        view = type("View", (), {"query_filters": filters})()
+        return IndexedFilterBackend().filter_queryset(
+            request, model.objects.order_by(), view
+        )
+
+    def indexed(self, filters):
+        return [
+            query_filter
+            for query_filter in filters
+            if query_filter.vendors is None or connection.vendor in query_filter.vendors
+        ]
+
+    def assert_no_sequential_scans(self, model, filters):
+        indexed = self.indexed(filters)
+        planned = 0
+        for size in range(1, len(filters) + 1):
+            for combination in combinations(filters, size):
+                # An unindexed filter is fine next to an indexed one
+                if not any(query_filter in indexed for query_filter in combination):
+                    continue
+                branches = max(len(SAMPLE_VALUES[f.param]) for f in combination)
+                for branch in range(branches):
+                    values = {
+                        f.param: SAMPLE_VALUES[f.param][
+                            min(branch, len(SAMPLE_VALUES[f.param]) - 1)
+                        ]
+                        for f in combination
+                    }
+                    queryset = self.filtered(model, filters, values)
+                    with self.subTest(values=values):
+                        self.assertEqual(sequential_scans(queryset), [])
+                    planned += 1
+        self.assertGreater(planned, 0)
+
+    def test_customer_filters_use_indexes(self):
+        self.assert_no_sequential_scans(Customer, CUSTOMER_FILTERS)
+
+    def test_payment_filters_use_indexes(self):
+        self.assert_no_sequential_scans(Payment, PAYMENT_FILTERS)
+
+    def test_declared_indexes_exist(self):
+        for model, filters in ((Customer, CUSTOMER_FILTERS), (Payment, PAYMENT_FILTERS)):
+            for query_filter in self.indexed(filters):
+                index = query_filter.index
+                with self.subTest(filter=query_filter):
+                    field = next(
+                        (f for f in model._meta.fields if f.name == index), None
+                    )
+                    if field is not None:
+                        self.assertTrue(field.db_index or field.unique)
+                        continue
+                    values = {query_filter.param: SAMPLE_VALUES[query_filter.param][0]}
+                    queryset = self.filtered(model, [query_filter], values)
+                    tables = {
+                        alias.table_name for alias in queryset.query.alias_map.values()
+                    }
+                    with connection.cursor() as cursor:
+                        names = {
+                            name
+                            for table in tables
+                            for name in connection.introspection.get_constraints(
+                                cursor, table
+                            )
+                        }
+                    self.assertIn(index, names)
+
+
+class PaymentFilterTest(APITestCase):
+    def setUp(self):
+        package = PackageFactory(price=Decimal("500.00"))
+        self.customer = CustomerFactory(package=package, username="", phone="0171")
+        other = CustomerFactory(package=package, username="", phone="0172")
+        self.paid = PaymentFactory(
+            customer=self.customer,
+            entry_by=None,
+            billing_period=date(2025, 1, 1),
+            paid=True,
+        )
+        PaymentFactory(
+            customer=self.customer,
+            entry_by=None,
+            billing_period=date(2025, 2, 1),
+            paid=False,
+        )
+        PaymentFactory(
+            customer=other, entry_by=None, billing_period=date(2025, 1, 1), paid=True
+        )
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+
+    def get_uids(self, **params):
+        response = self.client.get("/api/v1/payments", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["uid"] for row in response.data["results"]]
+
+    def test_customer_phone_keeps_other_filters(self):
+        """Test that customer_phone narrows the other filters instead of replacing them"""
+        uids = self.get_uids(customer_phone="0171", paid="true", period="2025-01")
+        self.assertEqual(uids, [str(self.paid.uid)])
+
+    def test_month_is_an_alias_of_period(self):
+        self.assertEqual(
+            len(self.get_uids(month="2025-01")), len(self.get_uids(period="2025-01"))
+        )
+
+    def test_invalid_values_are_rejected(self):
+        response = self.client.get("/api/v1/payments", {"period": "soon"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("period", response.data)
+
+        response = self.client.get("/api/v1/customers", {"package_id": "x"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("package_id", response.data)
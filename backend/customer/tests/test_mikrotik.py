@@ -0,0 +1,169 @@
+from decimal import Decimal
+from unittest import TestCase
+from unittest.mock import Mock, call, patch
+
+import requests
+from django.test import TestCase as DjangoTestCase
+
+from customer.models import Customer
+from customer.services.mikrotik import ActiveSessionIndex, MikroTikClient
+from customer.tests import CustomerFactory, PackageFactory
+from customer.utils import toggle_customer, toggle_ppp_user
+
+
+def response(status_code=200, data=None):
+    return Mock(status_code=status_code, json=Mock(return_value=data), text="")
+
+
+class MikroTikClientTest(TestCase):
+    def setUp(self):
+        self.client = MikroTikClient(
+            url="http://router/", user="u", password="p", timeout=(1, 2), retries=2
+        )
+        self.client.session.request = Mock()
+        sleep = patch("customer.services.mikrotik.time.sleep")
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def test_print_posts_the_query(self):
+        self.client.session.request.return_value = response(data=[])
+        self.client.print("/ppp/secret", query=["name=rahim"])
+        self.client.session.request.assert_called_once_with(
+            "POST",
+            "http://router/rest/ppp/secret/print",
+            json={".query": ["name=rahim"]},
+            timeout=(1, 2),
+        )
+        self.assertEqual(self.client.session.auth, ("u", "p"))
+
+    def test_idempotent_calls_are_retried_with_backoff(self):
+        self.client.session.request.side_effect = [
+            requests.ConnectionError("reset"),
+            response(503),
+            response(200),
+        ]
+        self.assertEqual(self.client.get("/ppp/active").status_code, 200)
+        self.assertEqual(self.client.session.request.call_count, 3)
+        self.assertEqual(self.sleep.call_args_list, [call(0.3), call(0.6)])
+
+    def test_retries_give_up(self):
+        self.client.session.request.side_effect = requests.Timeout("slow")
+        with self.assertRaises(requests.Timeout):
+            self.client.set("/ppp/secret/*1", {"disabled": "true"})
+        self.assertEqual(self.client.session.request.call_count, 3)
+
+    def test_other_calls_are_not_retried(self):
+        self.client.session.request.side_effect = requests.ConnectionError("reset")
+        with self.assertRaises(requests.ConnectionError):
+            self.client.request("POST", "/ppp/secret/add", json={"name": "rahim"})
+        self.assertEqual(self.client.session.request.call_count, 1)
+
+    def test_metrics_group_by_endpoint(self):
+        self.client.session.request.side_effect = [response(200), response(404)]
+        self.client.delete("/ppp/active/*1A")
+        self.client.delete("/ppp/active/*2B")
+        metrics = self.client.metrics()
+        self.assertEqual(list(metrics), ["DELETE /ppp/active/{id}"])
+        self.assertEqual(metrics["DELETE /ppp/active/{id}"]["calls"], 2)
+        self.assertEqual(metrics["DELETE /ppp/active/{id}"]["errors"], 1)
+
+
+class TogglePPPUserTest(TestCase):
+    def test_disable_terminates_session(self):
+        client = Mock()
+        client.print.side_effect = [
+            response(data=[{".id": "*1", "name": "rahim"}]),
+            response(data=[{".id": "*9", "name": "rahim"}]),
+        ]
+        client.set.return_value = response()
+        client.delete.return_value = response()
+
+        self.assertEqual(
+            toggle_ppp_user("rahim", True, client=client),
+            (True, "User updated successfully"),
+        )
+        client.set.assert_called_once_with("/ppp/secret/*1", {"disabled": "true"})
+        # Only the user's own session is fetched, not the whole table
+        client.print.assert_called_with(
+            "/ppp/active", query=["name=rahim"], proplist=[".id", "name"]
+        )
+        client.delete.assert_called_once_with("/ppp/active/*9")
+
+    def test_shared_session_index(self):
+        client = Mock()
+        client.set.return_value = response(data={"name": "rahim"})
+        client.print.return_value = response(
+            data=[{".id": "*9", "name": "rahim"}, {".id": "*8", "name": "karim"}]
+        )
+        client.delete.return_value = response()
+        sessions = ActiveSessionIndex(client)
+
+        toggle_ppp_user("rahim", True, client=client, secret_id="*1", sessions=sessions)
+        client.set.return_value = response(data={"name": "karim"})
+        toggle_ppp_user("karim", True, client=client, secret_id="*2", sessions=sessions)
+        client.set.return_value = response(data={"name": "rahim"})
+        toggle_ppp_user("rahim", True, client=client, secret_id="*1", sessions=sessions)
+
+        client.print.assert_called_once_with("/ppp/active", proplist=[".id", "name"])
+        self.assertEqual(
+            client.delete.call_args_list,
+            [call("/ppp/active/*9"), call("/ppp/active/*8")],
+        )
+
+    def test_network_error(self):
+        client = Mock()
+        client.print.side_effect = requests.ConnectionError("down")
+        success, message = toggle_ppp_user("rahim", False, client=client)
+        self.assertFalse(success)
+        self.assertIn("Network error", message)
+
+
+class ToggleCustomerTest(DjangoTestCase):
+    def setUp(self):
+        self.customer = CustomerFactory(
+            package=PackageFactory(price=Decimal("500.00")),
+            username="rahim",
+            secret_id="*1",
+        )
+        self.client = Mock()
+
+    def test_stored_secret_id_is_patched_directly(self):
+        self.client.set.return_value = response(data={".id": "*1", "name": "rahim"})
+        self.assertTrue(toggle_customer(self.customer, False, client=self.client)[0])
+        self.client.set.assert_called_once_with("/ppp/secret/*1", {"disabled": "false"})
+        self.client.print.assert_not_called()
+
+    def test_stale_secret_id_is_resolved_and_stored(self):
+        self.client.set.side_effect = [
+            response(404, {"message": "no such item"}),
+            response(data={".id": "*2", "name": "rahim"}),
+        ]
+        self.client.print.return_value = response(data=[{".id": "*2", "name": "rahim"}])
+
+        self.assertTrue(toggle_customer(self.customer, False, client=self.client)[0])
+        self.client.set.assert_called_with("/ppp/secret/*2", {"disabled": "false"})
+        self.assertEqual(self.customer.secret_id, "*2")
+        self.assertEqual(Customer.objects.get(pk=self.customer.pk).secret_id, "*2")
+
+    def test_secret_id_of_another_user_is_restored(self):
+        """Test that karim's secret, patched under a reused id, is put back"""
+        CustomerFactory(
+            package=self.customer.package, username="karim", is_active=True
+        )
+        secrets = {
+            "*1": {".id": "*1", "name": "karim", "disabled": "false"},
+            "*3": {".id": "*3", "name": "rahim", "disabled": "false"},
+        }
+
+        def set_(path, values):
+            secret = secrets[path.rsplit("/", 1)[1]]
+            secret.update(values)
+            return response(data=secret)
+
+        self.client.set.side_effect = set_
+        self.client.print.return_value = response(data=[{".id": "*3", "name": "rahim"}])
+
+        self.assertTrue(toggle_customer(self.customer, True, client=self.client)[0])
+        self.assertEqual(secrets["*1"]["disabled"], "false")
+        self.assertEqual(secrets["*3"]["disabled"], "true")
+        self.assertEqual(Customer.objects.get(pk=self.customer.pk).secret_id, "*3")
@@ -0,0 +1,186 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.choices import UserKind
+from core.tests import UserFactory
+from customer.choices import RouterCommandState
+from customer.models import Customer, RouterCommand
+from customer.services.outbox import MAX_ATTEMPTS, dispatch_router_commands
+from customer.tests import CustomerFactory, PackageFactory
+
+
+def response(status_code=200, data=None):
+    return Mock(status_code=status_code, json=Mock(return_value=data), text="")
+
+
+class RouterOutboxTest(APITestCase):
+    def setUp(self):
+        self.package = PackageFactory(price=Decimal("500.00"))
+        self.customer = CustomerFactory(
+            package=self.package, username="rahim", secret_id="*1"
+        )
+        self.customer = Customer.objects.get(pk=self.customer.pk)
+        self.router = Mock()
+        self.router.set.return_value = response(data={".id": "*1", "name": "rahim"})
+        self.router.print.side_effect = lambda path, **kwargs: response(
+            data=[{".id": "*1", "name": "rahim"}] if path == "/ppp/secret" else []
+        )
+
+    def suspend(self):
+        self.customer.is_active = False
+        self.customer.save(update_fields=["is_active"])
+
+    def test_save_queues_command_without_reading_the_row(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.suspend()
+        table = f'FROM "{Customer._meta.db_table}"'
+        self.assertFalse([q for q in queries if table in q["sql"]])
+
+        command = RouterCommand.objects.get()
+        self.assertEqual((command.username, command.disable), ("rahim", True))
+        self.assertEqual(command.state, RouterCommandState.PENDING)
+        self.router.set.assert_not_called()
+
+    def test_rollback_drops_command(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.suspend()
+                raise RuntimeError
+        self.assertFalse(RouterCommand.objects.exists())
+
+    def test_unchanged_status_queues_nothing(self):
+        self.customer.name = "Renamed"
+        self.customer.save()
+        self.assertFalse(RouterCommand.objects.exists())
+
+    def test_dispatch_coalesces_to_final_state(self):
+        self.suspend()
+        self.customer.is_active = True
+        self.customer.save(update_fields=["is_active"])
+        self.suspend()
+
+        counts = dispatch_router_commands(client=self.router)
+
+        # Superseded as the newer commands were queued
+        self.assertEqual(counts, {"sent": 1})
+        self.router.set.assert_called_once_with("/ppp/secret/*1", {"disabled": "true"})
+        states = RouterCommand.objects.order_by("pk").values_list("state", flat=True)
+        self.assertEqual(
+            list(states),
+            [
+                RouterCommandState.SUPERSEDED,
+                RouterCommandState.SUPERSEDED,
+                RouterCommandState.SENT,
+            ],
+        )
+        self.assertEqual(dispatch_router_commands(client=self.router), {})
+
+    def test_failures_are_retried_then_given_up(self):
+        self.suspend()
+        self.router.set.return_value = response(500, {"message": "busy"})
+
+        self.assertEqual(dispatch_router_commands(client=self.router), {"retried": 1})
+        command = RouterCommand.objects.get()
+        self.assertEqual(command.state, RouterCommandState.PENDING)
+        self.assertGreater(command.next_attempt_at, timezone.now())
+        self.assertIn("busy", command.error)
+        # Not due yet
+        self.assertEqual(dispatch_router_commands(client=self.router), {})
+
+        RouterCommand.objects.update(
+            attempts=MAX_ATTEMPTS - 1, next_attempt_at=timezone.now()
+        )
+        self.assertEqual(dispatch_router_commands(client=self.router), {"failed": 1})
+        self.assertEqual(RouterCommand.objects.get().state, RouterCommandState.FAILED)
+
+    def test_failed_old_command_is_not_sent_after_a_newer_one(self):
+        """Test: failed old command, newer command sent, old retry due"""
+        self.suspend()
+        self.router.set.return_value = response(500, {"message": "busy"})
+        self.assertEqual(dispatch_router_commands(client=self.router), {"retried": 1})
+        old = RouterCommand.objects.get()
+
+        self.router.set.return_value = response(data={".id": "*1", "name": "rahim"})
+        self.customer.is_active = True
+        self.customer.save(update_fields=["is_active"])
+        self.assertEqual(dispatch_router_commands(client=self.router), {"sent": 1})
+        old.refresh_from_db()
+        self.assertEqual(old.state, RouterCommandState.SUPERSEDED)
+
+        # As if a worker still sending it when the newer one was queued had
+        # put it back for a retry
+        RouterCommand.objects.filter(pk=old.pk).update(
+            state=RouterCommandState.PENDING, next_attempt_at=timezone.now()
+        )
+        counts = dispatch_router_commands(client=self.router)
+        self.assertEqual(counts, {"superseded": 1})
+        self.assertEqual(
+            [call.args[1]["disabled"] for call in self.router.set.call_args_list],
+            ["true", "false"],
+        )
+
+    def test_stale_claims_are_resent(self):
+        self.suspend()
+        RouterCommand.objects.update(
+            state=RouterCommandState.SENDING,
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(dispatch_router_commands(client=self.router), {"sent": 1})
+
+    def test_user_with_a_command_being_sent_waits(self):
+        """Test that a newer command isn't sent while an older one is in flight"""
+        self.suspend()
+        old = RouterCommand.objects.get()
+        RouterCommand.objects.filter(pk=old.pk).update(
+            state=RouterCommandState.SENDING
+        )
+        self.customer.is_active = True
+        self.customer.save(update_fields=["is_active"])
+
+        self.assertEqual(dispatch_router_commands(client=self.router), {})
+        self.router.set.assert_not_called()
+
+        RouterCommand.objects.filter(pk=old.pk).update(state=RouterCommandState.SENT)
+        self.assertEqual(dispatch_router_commands(client=self.router), {"sent": 1})
+        self.router.set.assert_called_once_with("/ppp/secret/*1", {"disabled": "false"})
+
+    def test_stale_claim_with_a_newer_command_is_superseded(self):
+        self.suspend()
+        RouterCommand.objects.update(
+            state=RouterCommandState.SENDING,
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+        self.customer.is_active = True
+        self.customer.save(update_fields=["is_active"])
+
+        counts = dispatch_router_commands(client=self.router)
+        self.assertEqual(counts, {"sent": 1, "superseded": 1})
+        self.router.set.assert_called_once_with("/ppp/secret/*1", {"disabled": "false"})
+
+    def test_status_toggle_queues(self):
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+        response = self.client.post(
+            "/api/v1/customers/status/toggle",
+            {"username": "rahim", "is_active": False},
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(RouterCommand.objects.get().disable, True)
+        self.assertFalse(Customer.objects.get(pk=self.customer.pk).is_active)
+
+    def test_command(self):
+        self.suspend()
+        out = StringIO()
+        with patch(
+            "customer.services.outbox.get_mikrotik_client", return_value=self.router
+        ):
+            call_command("dispatch_router_commands", "--once", stdout=out)
+        self.assertIn("1 sent", out.getvalue())
@@ -0,0 +1,131 @@
+import threading
+from datetime import timedelta
+
+from django.db import connection, connections
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from common.counts import bump_table_version, table_versions
+from core.choices import UserKind
+from core.tests import UserFactory
+from customer.models import Customer
+from customer.tests import CustomerFactory, PackageFactory
+
+
+class KeysetPaginationTest(APITestCase):
+    def setUp(self):
+        package = PackageFactory()
+        customers = [CustomerFactory(package=package, username="") for _ in range(7)]
+        # Customers share timestamps in pairs so ties are broken by id
+        now = timezone.now()
+        for offset, customer in enumerate(customers):
+            Customer.objects.filter(pk=customer.pk).update(
+                created_at=now - timedelta(minutes=offset // 2)
+            )
+        self.expected = list(
+            Customer.objects.order_by("-created_at", "-id").values_list("uid", flat=True)
+        )
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+
+    def get_page(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_walks_forward_and_back(self):
+        """Test that next/previous cursors visit every row exactly once"""
+        page = self.get_page("/api/v1/customers", pagination="cursor", page_size=3)
+        self.assertIsNone(page["count"])
+        self.assertIsNone(page["previous"])
+
+        seen, pages = [], [page]
+        while True:
+            seen += [row["uid"] for row in page["results"]]
+            if not page["next"]:
+                break
+            page = self.get_page(page["next"])
+            pages.append(page)
+        self.assertEqual(seen, [str(uid) for uid in self.expected])
+        self.assertEqual(len(pages), 3)
+
+        back = self.get_page(pages[-1]["previous"])
+        self.assertEqual(back["results"], pages[1]["results"])
+        back = self.get_page(back["previous"])
+        self.assertEqual(back["results"], pages[0]["results"])
+        self.assertIsNone(back["previous"])
+
+    def test_page_number_mode_is_default(self):
+        page = self.get_page("/api/v1/customers", page=2, page_size=3)
+        self.assertEqual(page["count"], 7)
+        self.assertIn("page=3", page["next"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/v1/customers", {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+CUSTOMER_COUNT = 'SELECT COUNT(*) AS "__count" FROM "customer_customer"'
+
+
+class CountModeTest(APITestCase):
+    def setUp(self):
+        self.package = PackageFactory()
+        for _ in range(3):
+            CustomerFactory(package=self.package, username="")
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+
+    def count_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1/customers", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counts = [query for query in queries if query["sql"].startswith(CUSTOMER_COUNT)]
+        return response.data["count"], len(counts)
+
+    def test_cached_count_invalidated_on_write(self):
+        """Test that cached counts are reused until the table is written to"""
+        self.assertEqual(self.count_queries(is_active="true"), (3, 1))
+        self.assertEqual(self.count_queries(is_active="true"), (3, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            CustomerFactory(package=self.package, username="")
+        self.assertEqual(self.count_queries(is_active="true"), (4, 1))
+
+    def test_exact_count_always_counts(self):
+        self.count_queries(count_mode="exact")
+        self.assertEqual(self.count_queries(count_mode="exact"), (3, 1))
+
+    def test_estimate_falls_back_to_count_on_sqlite(self):
+        self.assertEqual(self.count_queries(count_mode="estimate")[0], 3)
+
+    def test_invalid_count_mode(self):
+        response = self.client.get("/api/v1/customers", {"count_mode": "guess"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TableVersionTest(TransactionTestCase):
+    def test_concurrent_bumps_are_all_counted(self):
+        """Test that racing writers each get their own version"""
+        table = Customer._meta.db_table
+        start = table_versions([table])[table]
+        barrier = threading.Barrier(4)
+        errors = []
+
+        def bump():
+            try:
+                barrier.wait()
+                for _ in range(5):
+                    bump_table_version(table)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=bump) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(table_versions([table])[table], start + 20)
@@ -0,0 +1,96 @@
+from datetime import date
+from itertools import combinations
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from common.projection import (
+    PROJECTION_CACHE_SIZE,
+    NotProjectable,
+    _cached_projection,
+    get_projection,
+)
+from common.serializers import parse_field_paths, prune_fields
+from core.choices import UserKind
+from core.serializers.user import UserListSerializer
+from core.tests import UserFactory
+from customer.models import Customer, Payment
+from customer.serializers.customer import CustomerListSerializer
+from customer.serializers.payment import PaymentListSerializer
+from customer.tests import CustomerFactory, PackageFactory, PaymentFactory
+
+
+class ProjectionTest(APITestCase):
+    def setUp(self):
+        package = PackageFactory(price=Decimal("700.50"))
+        collector = UserFactory(kind=UserKind.STAFF)
+        with_package = CustomerFactory(
+            package=package, username="", email=None, credentials={"vlan": 12}
+        )
+        without_package = CustomerFactory(package=None, username="")
+        PaymentFactory(
+            customer=with_package,
+            entry_by=collector,
+            billing_period=date(2025, 1, 1),
+            amount=Decimal("700.50"),
+            paid=True,
+        )
+        PaymentFactory(
+            customer=without_package,
+            entry_by=None,
+            billing_period=date(2025, 2, 1),
+            bill_amount=Decimal("0.00"),
+            amount=Decimal("0.00"),
+            payment_date=None,
+        )
+        self.context = {"request": Request(APIRequestFactory().get("/"))}
+
+    def assertSameBytes(self, serializer_class, queryset):
+        serializer = serializer_class(context=self.context)
+        projection = get_projection(serializer)
+        expected = serializer_class(queryset, many=True, context=self.context).data
+        projected = [projection.project(row) for row in projection.queryset(queryset)]
+        self.assertEqual(
+            JSONRenderer().render(projected), JSONRenderer().render(expected)
+        )
+
+    def test_customer_list_is_byte_identical(self):
+        self.assertSameBytes(CustomerListSerializer, Customer.objects.all())
+
+    def test_payment_list_is_byte_identical(self):
+        """Test nested customer/entry_by, including a null collector"""
+        self.assertSameBytes(PaymentListSerializer, Payment.objects.all())
+
+    def test_unprojectable_serializer(self):
+        # The user image is a file field, its URL needs the request
+        with self.assertRaises(NotProjectable):
+            get_projection(UserListSerializer(context=self.context))
+
+    def test_endpoint_output_unchanged(self):
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+        response = self.client.get("/api/v1/payments")
+        expected = PaymentListSerializer(
+            Payment.objects.order_by("-created_at"), many=True, context=self.context
+        ).data
+        self.assertEqual(
+            JSONRenderer().render(response.data["results"]),
+            JSONRenderer().render(expected),
+        )
+
+    def test_projection_cache_is_bounded(self):
+        """Test that every ?fields= combination can't grow the cache forever"""
+        _cached_projection.cache_clear()
+        names = list(CustomerListSerializer().fields)
+        for fields in list(combinations(names, 3))[: PROJECTION_CACHE_SIZE + 10]:
+            serializer = CustomerListSerializer()
+            prune_fields(serializer, parse_field_paths(",".join(fields)), {})
+            get_projection(serializer)
+
+        self.assertEqual(_cached_projection.cache_info().currsize, PROJECTION_CACHE_SIZE)
+        serializer = CustomerListSerializer()
+        prune_fields(serializer, parse_field_paths("uid,package.name"), {})
+        projection = get_projection(serializer)
+        self.assertIn("package__name", projection.columns)
+        self.assertIs(get_projection(serializer), projection)
@@ -0,0 +1,208 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.choices import UserKind
+from core.tests import UserFactory
+from customer.choices import PaymentMethod
+from customer.models import Customer, Package, Payment, RevenueRollup
+from customer.services.billing import generate_bills
+from customer.services.report import _from_where
+from customer.services.revenue import rebuild_revenue_rollup, rollup_version
+from customer.tests import CustomerFactory, PackageFactory, PaymentFactory
+
+ROLLUP_FIELDS = (
+    "billing_period",
+    "package_id",
+    "payment_method",
+    "entry_by_id",
+    "billed_amount",
+    "collected_amount",
+    "payments_count",
+    "paid_count",
+)
+
+
+def rollup_rows():
+    return sorted(
+        RevenueRollup.objects.exclude(payments_count=0).values_list(*ROLLUP_FIELDS),
+        key=str,
+    )
+
+
+class RevenueRollupTest(APITestCase):
+    def setUp(self):
+        self.package = PackageFactory(price=Decimal("500.00"))
+        self.customer = CustomerFactory(package=self.package, username="")
+
+    def test_incremental_updates_match_rebuild(self):
+        """Test that signal deltas keep the rollup equal to a full rebuild"""
+        CustomerFactory(package=self.package, username="")
+        generate_bills(date(2025, 3, 1))
+        payment = Payment.objects.get(
+            customer=self.customer, billing_period=date(2025, 3, 1)
+        )
+        payment.amount = Decimal("500.00")
+        payment.paid = True
+        payment.payment_method = PaymentMethod.BKASH
+        payment.save()
+        payment.billing_period = date(2025, 4, 1)
+        payment.save()
+        PaymentFactory(
+            customer=self.customer,
+            entry_by=None,
+            billing_period=date(2025, 1, 1),
+            amount=Decimal("300.00"),
+            paid=True,
+        ).delete()
+
+        incremental = rollup_rows()
+        rebuild_revenue_rollup()
+        self.assertEqual(incremental, rollup_rows())
+        self.assertEqual(len(incremental), 2)
+
+    def test_package_change_moves_payments(self):
+        """Test that a customer's package change re-keys their older payments"""
+        generate_bills(date(2025, 3, 1))
+        self.customer.package = PackageFactory(price=Decimal("800.00"))
+        self.customer.save()
+        self.assertEqual(rollup_rows()[0][1], self.customer.package_id)
+
+        payment = Payment.objects.get(customer=self.customer)
+        payment.amount = Decimal("500.00")
+        payment.paid = True
+        with CaptureQueriesContext(connection) as queries:
+            payment.save()
+        # One package lookup, not the whole customer row
+        customer_queries = [
+            q for q in queries if f'FROM "{Customer._meta.db_table}"' in q["sql"]
+        ]
+        self.assertEqual(len(customer_queries), 1)
+        self.assertNotIn('"name"', customer_queries[0]["sql"])
+
+        incremental = rollup_rows()
+        rebuild_revenue_rollup()
+        self.assertEqual(incremental, rollup_rows())
+
+    def test_rebuild_command_limited_to_period(self):
+        """Test that --period only rewrites rows of that period"""
+        generate_bills(date(2025, 3, 1))
+        generate_bills(date(2025, 4, 1))
+        RevenueRollup.objects.all().delete()
+        call_command("rebuild_revenue_rollup", "--period", "2025-04", stdout=StringIO())
+        self.assertEqual(
+            list(RevenueRollup.objects.values_list("billing_period", flat=True)),
+            [date(2025, 4, 1)],
+        )
+
+    def test_timeseries_endpoint(self):
+        """Test that the timeseries fills empty months and supports group_by"""
+        generate_bills(date(2025, 3, 1))
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+
+        response = self.client.get(
+            "/api/v1/dashboard/timeseries", {"months": 3, "end": "2025-04"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row["billing_period"], row["billed_amount"]) for row in response.data["results"]],
+            [("2025-02", "0.00"), ("2025-03", "500.00"), ("2025-04", "0.00")],
+        )
+
+        response = self.client.get(
+            "/api/v1/dashboard/timeseries",
+            {"months": 3, "end": "2025-04", "group_by": "package"},
+        )
+        self.assertEqual(response.data["results"][0]["package"], self.package.id)
+
+        response = self.client.get(
+            "/api/v1/dashboard/timeseries", {"group_by": "customer"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RevenueReportTest(APITestCase):
+    def setUp(self):
+        self.basic = PackageFactory(price=Decimal("500.00"))
+        self.premium = PackageFactory(price=Decimal("1000.00"))
+        for package in (self.basic, self.basic, self.premium):
+            CustomerFactory(package=package, username="")
+        generate_bills(date(2025, 3, 1))
+        generate_bills(date(2025, 4, 1))
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+
+    def get_report(self, **params):
+        response = self.client.get("/api/v1/reports/revenue", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["results"]
+
+    def test_rollup_subtotals(self):
+        """Test that rows include per-month subtotals and a grand total"""
+        rows = self.get_report(dimensions="package,month", start="2025-03")
+        self.assertEqual(
+            [
+                (row["month"], row["package"], row["level"], row["billed_amount"])
+                for row in rows
+            ],
+            [
+                ("2025-03", self.basic.id, 2, "1000.00"),
+                ("2025-03", self.premium.id, 2, "1000.00"),
+                ("2025-03", None, 1, "2000.00"),
+                ("2025-04", self.basic.id, 2, "1000.00"),
+                ("2025-04", self.premium.id, 2, "1000.00"),
+                ("2025-04", None, 1, "2000.00"),
+                (None, None, 0, "4000.00"),
+            ],
+        )
+        self.assertEqual(rows[0]["package_name"], self.basic.name)
+
+    def test_cached_until_payments_change(self):
+        """Test that reports are cached and invalidated by payment writes"""
+        self.get_report(dimensions="month", package=str(self.basic.id))
+        with self.assertNumQueries(2):
+            # Only the rollup's table version and the cached report
+            rows = self.get_report(package=str(self.basic.id), dimensions="month")
+        self.assertEqual(rows[-1]["collected_amount"], "0.00")
+
+        payment = Payment.objects.filter(customer__package=self.basic).first()
+        payment.amount = payment.bill_amount
+        payment.paid = True
+        version = rollup_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.save()
+        self.assertGreater(rollup_version(), version)
+        rows = self.get_report(dimensions="month", package=str(self.basic.id))
+        self.assertEqual(rows[-1]["collected_amount"], "500.00")
+
+    def test_compiled_where_keeps_joins_and_subqueries(self):
+        """Test that the ROLLUP query's WHERE survives joins and nested WHEREs"""
+        rollups = RevenueRollup.objects.all()
+        querysets = [
+            rollups,
+            rollups.filter(package__name=self.basic.name),
+            rollups.filter(
+                package__in=Package.objects.filter(price__gt=0).values("pk"),
+                billing_period=date(2025, 3, 1),
+            ),
+            rollups.filter(package__in=[]),
+        ]
+        for queryset in querysets:
+            from_sql, where, params = _from_where(queryset)
+            sql = f"SELECT COUNT(*) FROM {from_sql}"
+            if where:
+                sql += f" WHERE {where}"
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                self.assertEqual(cursor.fetchone()[0], queryset.count())
+
+    def test_rejects_unknown_dimension(self):
+        response = self.client.get(
+            "/api/v1/reports/revenue", {"dimensions": "month,customer"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
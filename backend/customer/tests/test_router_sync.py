@@ -0,0 +1,275 @@
+import json
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from customer.models import Customer, DashboardMetrics, RouterSecretSnapshot
+from customer.services.dashboard import (
+    get_dashboard_metrics,
+    recompute_dashboard_metrics,
+)
+from customer.services.router_sync import (
+    PREFER_DATABASE,
+    PREFER_NEITHER,
+    parse_profile_speed,
+    reconcile_router,
+)
+from customer.tests import CustomerFactory, PackageFactory
+
+
+class SecretRouter:
+    """Answers the calls of MikroTikClient from in-memory PPP secrets."""
+
+    def __init__(self, *secrets):
+        self.secrets = {
+            secret["name"]: {".id": f"*{index + 1}", "disabled": "false", **secret}
+            for index, secret in enumerate(secrets)
+        }
+        self.calls = []
+
+    def respond(self, data=None, status_code=200):
+        return Mock(status_code=status_code, json=Mock(return_value=data))
+
+    def print(self, path, query=None, proplist=None):
+        self.calls.append(("print", path))
+        if path == "/ppp/secret":
+            return self.respond(list(self.secrets.values()))
+        return self.respond([])
+
+    def set(self, path, values):
+        self.calls.append(("set", path, values))
+        for secret in self.secrets.values():
+            if path == f"/ppp/secret/{secret['.id']}":
+                secret.update(values)
+                return self.respond(secret)
+        return self.respond({"message": "no such item"}, 404)
+
+    def delete(self, path):
+        self.calls.append(("delete", path))
+        return self.respond()
+
+
+class ReconcileRouterTest(APITestCase):
+    def setUp(self):
+        self.package = PackageFactory(price=Decimal("500.00"), speed_mbps=10)
+        self.rahim = CustomerFactory(
+            package=self.package,
+            username="rahim",
+            password="secret",
+            mac_address="AA:BB",
+            secret_id="*1",
+        )
+        self.router = SecretRouter(
+            {
+                "name": "rahim",
+                "profile": "10Mbps",
+                "password": "secret",
+                "caller-id": "AA:BB",
+            },
+            {
+                "name": "dhaka.karim",
+                "profile": "20Mbps",
+                "password": "karim123",
+                "disabled": "true",
+                "last-caller-id": "CC:DD",
+                "service": "pppoe",
+            },
+        )
+        get_dashboard_metrics()
+
+    def reconcile(self, **kwargs):
+        self.router.calls = []
+        return reconcile_router(client=self.router, **kwargs)
+
+    def assertDashboardConsistent(self):
+        snapshot = DashboardMetrics.objects.get()
+        expected = recompute_dashboard_metrics()
+        for name in ("total_customers", "active_customers", "total_packages"):
+            self.assertEqual(getattr(snapshot, name), getattr(expected, name))
+
+    def test_first_run_imports_new_secrets(self):
+        counts = self.reconcile()
+
+        self.assertEqual(counts, {"created": 1})
+        karim = Customer.objects.get(username="dhaka.karim")
+        self.assertEqual(karim.name, "Karim")
+        self.assertEqual(karim.package.speed_mbps, 20)
+        self.assertEqual(
+            (karim.is_active, karim.mac_address, karim.connection_type),
+            (False, "CC:DD", "PPPoE"),
+        )
+        self.assertEqual(RouterSecretSnapshot.objects.count(), 2)
+        self.assertDashboardConsistent()
+
+    def test_rerun_on_unchanged_router_writes_nothing(self):
+        self.reconcile()
+        with CaptureQueriesContext(connection) as queries:
+            counts = self.reconcile()
+
+        self.assertEqual(counts, {"unchanged": 2})
+        self.assertEqual(self.router.calls, [("print", "/ppp/secret")])
+        writes = [q for q in queries if not q["sql"].startswith("SELECT")]
+        self.assertEqual(writes, [])
+
+    def test_router_changes_are_applied_to_the_database(self):
+        self.reconcile()
+        self.router.secrets["rahim"].update(disabled="true", profile="20Mbps")
+
+        self.assertEqual(self.reconcile(), {"db_updated": 1, "unchanged": 1})
+        rahim = Customer.objects.get(pk=self.rahim.pk)
+        self.assertFalse(rahim.is_active)
+        self.assertEqual(rahim.package.speed_mbps, 20)
+        self.assertEqual([call[0] for call in self.router.calls], ["print"])
+        self.assertDashboardConsistent()
+
+    def test_database_changes_are_pushed_to_the_router(self):
+        self.reconcile()
+        Customer.objects.filter(pk=self.rahim.pk).update(
+            password="changed", is_active=False
+        )
+
+        self.assertEqual(self.reconcile(), {"router_updated": 1, "unchanged": 1})
+        self.assertIn(
+            ("set", "/ppp/secret/*1", {"disabled": "true", "password": "changed"}),
+            self.router.calls,
+        )
+        self.assertEqual(self.reconcile(), {"unchanged": 2})
+
+    def test_conflict_policy(self):
+        self.reconcile()
+        Customer.objects.filter(pk=self.rahim.pk).update(password="from-db")
+        self.router.secrets["rahim"]["password"] = "from-router"
+
+        self.assertEqual(
+            self.reconcile(prefer=PREFER_NEITHER), {"conflicts": 1, "unchanged": 1}
+        )
+        # Still a conflict, the skipped field wasn't agreed on
+        counts = self.reconcile(prefer=PREFER_DATABASE)
+        self.assertEqual(counts, {"conflicts": 1, "router_updated": 1, "unchanged": 1})
+        self.assertEqual(self.router.secrets["rahim"]["password"], "from-db")
+
+        Customer.objects.filter(pk=self.rahim.pk).update(password="db-again")
+        self.router.secrets["rahim"]["password"] = "router-again"
+        self.assertEqual(
+            self.reconcile(), {"conflicts": 1, "db_updated": 1, "unchanged": 1}
+        )
+        self.assertEqual(
+            Customer.objects.get(pk=self.rahim.pk).password, "router-again"
+        )
+
+    def test_failed_push_is_retried(self):
+        self.reconcile()
+        Customer.objects.filter(pk=self.rahim.pk).update(password="changed")
+        self.router.secrets["rahim"][".id"] = "*9"
+        Customer.objects.filter(pk=self.rahim.pk).update(secret_id="*9")
+        self.router.set = Mock(
+            return_value=self.router.respond({"message": "busy"}, 500)
+        )
+
+        self.assertEqual(self.reconcile()["failed"], 1)
+        self.assertEqual(self.reconcile()["failed"], 1)
+
+    def test_dry_run(self):
+        counts = self.reconcile(dry_run=True)
+
+        self.assertEqual(counts, {"created": 1})
+        self.assertFalse(Customer.objects.filter(username="dhaka.karim").exists())
+        self.assertFalse(RouterSecretSnapshot.objects.exists())
+
+    def test_profile_speed(self):
+        self.assertEqual(parse_profile_speed("15Mbps-home"), 15)
+        self.assertEqual(parse_profile_speed("default"), 0)
+
+    def test_command(self):
+        out = StringIO()
+        with patch(
+            "customer.services.router_sync.get_mikrotik_client",
+            return_value=self.router,
+        ):
+            call_command("reconcile_router", stdout=out)
+        self.assertIn("1 created", out.getvalue())
+
+
+def secrets_response(secrets, chunk_size=40):
+    body = json.dumps(secrets).encode()
+    chunks = [body[i : i + chunk_size] for i in range(0, len(body), chunk_size)]
+    return Mock(status_code=200, iter_content=Mock(return_value=iter(chunks)))
+
+
+class ImportSecretsTest(APITestCase):
+    def setUp(self):
+        self.package = PackageFactory(price=Decimal("500.00"), speed_mbps=10)
+        self.rahim = CustomerFactory(
+            package=self.package,
+            username="rahim",
+            name="Rahim Uddin",
+            address="Mirpur",
+            secret_id="*1",
+        )
+        self.secrets = [
+            {
+                ".id": "*1",
+                "name": "rahim",
+                "profile": "10Mbps",
+                "password": "changed",
+                "disabled": "true",
+                "last-caller-id": "AA:BB",
+                "comment": "From the router",
+            },
+            {".id": "*2", "name": "dhaka.karim", "profile": "25Mbps-home"},
+            {".id": "*3", "name": "salam", "profile": "25Mbps-home", "service": "pppoe"},
+        ]
+        get_dashboard_metrics()
+
+    def run_command(self, *args):
+        out = StringIO()
+        client = Mock()
+        client.print.return_value = secrets_response(self.secrets)
+        with patch(
+            "customer.management.commands.get_customers_from_server.get_mikrotik_client",
+            return_value=client,
+        ):
+            call_command("get_customers_from_server", *args, stdout=out)
+        client.print.assert_called_once()
+        self.assertTrue(client.print.call_args.kwargs["stream"])
+        return out.getvalue()
+
+    def test_upserts(self):
+        out = self.run_command("--batch-size", "2")
+
+        self.assertIn("Inserted 2, updated 1, unchanged 0 customer(s)", out)
+        rahim = Customer.objects.get(pk=self.rahim.pk)
+        self.assertEqual(
+            (rahim.password, rahim.is_active, rahim.mac_address),
+            ("changed", False, "AA:BB"),
+        )
+        # Only set when the customer is created
+        self.assertEqual((rahim.name, rahim.address), ("Rahim Uddin", "Mirpur"))
+        karim = Customer.objects.get(username="dhaka.karim")
+        salam = Customer.objects.get(username="salam")
+        self.assertEqual(karim.name, "Karim")
+        self.assertEqual(karim.package_id, salam.package_id)
+        self.assertEqual(karim.package.speed_mbps, 25)
+        self.assertEqual(salam.connection_type, "PPPoE")
+        snapshot = DashboardMetrics.objects.get()
+        expected = recompute_dashboard_metrics()
+        for name in ("total_customers", "active_customers", "total_packages"):
+            self.assertEqual(getattr(snapshot, name), getattr(expected, name))
+
+        self.assertIn("Inserted 0, updated 0, unchanged 3 customer(s)", self.run_command())
+
+    def test_queries_per_batch(self):
+        self.run_command()
+        self.secrets += [
+            {".id": f"*{index}", "name": f"user{index}", "profile": "10Mbps"}
+            for index in range(4, 40)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            self.run_command("--batch-size", "100")
+        table = f'INTO "{Customer._meta.db_table}"'
+        self.assertEqual(len([q for q in queries if table in q["sql"]]), 1)
@@ -0,0 +1,53 @@
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from common.choices import Status
+from core.choices import UserKind
+from core.tests import UserFactory
+from customer.services.search import rebuild_customer_search_index
+from customer.tests import CustomerFactory, PackageFactory
+
+
+class CustomerSearchTest(APITestCase):
+    def setUp(self):
+        package = PackageFactory()
+        self.karim = CustomerFactory(
+            package=package,
+            username="",
+            name="Abdul Karim",
+            phone="01711000001",
+            mac_address="AA:BB:CC:00:11:22",
+        )
+        self.rahim = CustomerFactory(
+            package=package, username="", name="Rahim Uddin", phone="01811000002"
+        )
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+
+    def search(self, q):
+        response = self.client.get("/api/v1/customers/search", {"q": q})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["uid"] for row in response.data["results"]]
+
+    def test_matches_any_field(self):
+        self.assertEqual(self.search("karim"), [str(self.karim.uid)])
+        self.assertEqual(self.search("018110"), [str(self.rahim.uid)])
+        self.assertEqual(self.search("bb:cc"), [str(self.karim.uid)])
+        self.assertEqual(self.search("im"), [str(self.rahim.uid), str(self.karim.uid)])
+
+    def test_index_follows_writes(self):
+        """Test that saves and deletes keep the search table in sync"""
+        self.karim.name = "Abdul Kader"
+        self.karim.save()
+        self.assertEqual(self.search("karim"), [])
+        self.assertEqual(self.search("kader"), [str(self.karim.uid)])
+
+        self.rahim.delete()
+        self.assertEqual(self.search("rahim"), [])
+
+    def test_skips_inactive_and_rebuilds(self):
+        self.rahim.status = Status.INACTIVE
+        self.rahim.save()
+        self.assertEqual(self.search("rahim"), [])
+
+        rebuild_customer_search_index()
+        self.assertEqual(self.search("karim"), [str(self.karim.uid)])
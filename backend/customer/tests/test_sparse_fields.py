@@ -0,0 +1,95 @@
+from datetime import date
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers, status
+from rest_framework.test import APITestCase
+
+from common.serializers import sparse_queryset
+from core.choices import UserKind
+from core.tests import UserFactory
+from customer.models import Payment
+from customer.tests import CustomerFactory, PackageFactory, PaymentFactory
+
+
+class SparseFieldsTest(APITestCase):
+    def setUp(self):
+        self.package = PackageFactory(name="Home 10")
+        self.customer = CustomerFactory(package=self.package, username="")
+        for month in (1, 2):
+            PaymentFactory(
+                customer=self.customer,
+                entry_by=None,
+                billing_period=date(2025, month, 1),
+            )
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        selects = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('SELECT "')
+            and "django_cache" not in query["sql"]
+            and "common_tableversion" not in query["sql"]
+        ]
+        return response.data["results"], selects
+
+    def test_fields_prune_output_and_columns(self):
+        rows, selects = self.get("/api/v1/customers", fields="uid,name,package.name")
+        self.assertEqual(
+            rows[0],
+            {
+                "uid": str(self.customer.uid),
+                "name": self.customer.name,
+                "package": {"name": "Home 10"},
+            },
+        )
+        self.assertEqual(len(selects), 1)
+        self.assertNotIn("credentials", selects[0])
+        self.assertNotIn('"customer_package"."price"', selects[0])
+
+    def test_fields_drop_unused_joins(self):
+        rows, selects = self.get("/api/v1/payments", fields="uid,amount,billing_period")
+        self.assertEqual(set(rows[0]), {"uid", "amount", "billing_period"})
+        self.assertNotIn("JOIN", selects[0])
+
+    def test_exclude(self):
+        rows, selects = self.get(
+            "/api/v1/customers", exclude="credentials,password,package"
+        )
+        self.assertNotIn("credentials", rows[0])
+        self.assertIn("name", rows[0])
+        self.assertNotIn("JOIN", selects[0])
+
+    def test_cursor_pages_with_sparse_fields(self):
+        """Test that keyset cursors still work without extra queries per row"""
+        rows, selects = self.get(
+            "/api/v1/payments", fields="uid", pagination="cursor", page_size=1
+        )
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(len(selects), 1)
+
+    def test_unknown_field(self):
+        response = self.client.get("/api/v1/customers", {"fields": "uid,secret"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unprunable_fields_keep_the_views_joins(self):
+        """Test that a dotted source keeps select_related instead of an N+1"""
+
+        class PaymentPackageSerializer(serializers.ModelSerializer):
+            package_name = serializers.CharField(source="customer.package.name")
+
+            class Meta:
+                model = Payment
+                fields = ("uid", "package_name")
+
+        queryset = sparse_queryset(
+            Payment.objects.select_related("customer__package"),
+            PaymentPackageSerializer(),
+        )
+        with self.assertNumQueries(1):
+            rows = PaymentPackageSerializer(queryset, many=True).data
+        self.assertEqual(rows[0]["package_name"], "Home 10")
@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+from datetime import date
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.choices import UserKind
+from core.tests import UserFactory
+from customer.tests import CustomerFactory, PackageFactory, PaymentFactory
+
+
+class StreamingListTest(APITestCase):
+    def setUp(self):
+        package = PackageFactory()
+        customer = CustomerFactory(package=package, username="", name="Karim, Sr.")
+        for month in (1, 2, 3):
+            PaymentFactory(
+                customer=customer, entry_by=None, billing_period=date(2025, month, 1)
+            )
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+
+    def get_stream(self, **params):
+        response = self.client.get("/api/v1/payments", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_showall_streams_json_array(self):
+        response, content = self.get_stream(page_size="showall")
+        self.assertEqual(response["Content-Type"], "application/json; charset=utf-8")
+        rows = json.loads(content)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["customer"]["name"], "Karim, Sr.")
+
+    def test_ndjson(self):
+        response, content = self.get_stream(format="ndjson", period="2025-02")
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row["billing_period"] for row in rows], ["2025-02-01"])
+
+    def test_csv(self):
+        response, content = self.get_stream(format="csv")
+        self.assertIn('filename="payments.csv"', response["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["customer.name"], "Karim, Sr.")
+        # Null nested objects still get their columns from the serializer
+        self.assertEqual(rows[0]["entry_by.id"], "")
+
+    def test_empty_csv_has_header(self):
+        _, content = self.get_stream(format="csv", period="2024-01")
+        self.assertTrue(content.startswith("id,uid,customer.id,"))
+
+    def test_paginated_by_default(self):
+        response = self.client.get("/api/v1/payments")
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.data["count"], 3)
@@ -0,0 +1,237 @@
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.choices import UserKind
+from core.tests import UserFactory
+from customer.choices import BillingRunState, RouterCommandState
+from customer.models import BulkToggleRun, Customer, DashboardMetrics, RouterCommand
+from customer.services.dashboard import (
+    get_dashboard_metrics,
+    recompute_dashboard_metrics,
+)
+from customer.services.mikrotik import RateLimiter
+from customer.services.suspension import (
+    STALE_TOGGLE_AFTER,
+    bulk_toggle,
+    claim_bulk_toggle,
+    enqueue_bulk_toggle,
+    queued_bulk_toggles,
+    run_bulk_toggle,
+)
+from customer.tests import CustomerFactory, PackageFactory
+
+
+class FakeRouter:
+    """Answers the calls of MikroTikClient from in-memory secrets and sessions."""
+
+    def __init__(self, secrets, sessions=(), delay=0):
+        self.secrets = {
+            name: {".id": f"*{index + 1}", "name": name, "disabled": disabled}
+            for index, (name, disabled) in enumerate(secrets.items())
+        }
+        self.sessions = {name: f"*A{index}" for index, name in enumerate(sessions)}
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def respond(self, data=None, status_code=200):
+        return Mock(status_code=status_code, json=Mock(return_value=data))
+
+    def track(self, *call):
+        with self.lock:
+            self.calls.append(call)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+
+    def print(self, path, query=None, proplist=None):
+        self.track("print", path)
+        if path == "/ppp/secret":
+            conditions = [condition.split("=", 1) for condition in query or ()]
+            return self.respond(
+                [
+                    secret
+                    for secret in self.secrets.values()
+                    if all(secret[key] == value for key, value in conditions)
+                ]
+            )
+        return self.respond(
+            [{".id": id, "name": name} for name, id in self.sessions.items()]
+        )
+
+    def set(self, path, values):
+        self.track("set", path)
+        for secret in self.secrets.values():
+            if path == f"/ppp/secret/{secret['.id']}":
+                secret.update(values)
+                return self.respond(secret)
+        return self.respond({"message": "no such item"}, 404)
+
+    def delete(self, path):
+        self.track("delete", path)
+        return self.respond()
+
+
+class BulkToggleTest(APITestCase):
+    def setUp(self):
+        self.package = PackageFactory(price=Decimal("500.00"))
+        self.rahim = CustomerFactory(package=self.package, username="rahim")
+        self.karim = CustomerFactory(package=self.package, username="karim")
+        self.unknown = CustomerFactory(package=self.package, username="unknown")
+        self.local = CustomerFactory(package=self.package, username="")
+        self.router = FakeRouter(
+            {"rahim": "false", "karim": "true"}, sessions=["rahim", "karim"]
+        )
+        get_dashboard_metrics()
+
+    def test_suspends(self):
+        queued = RouterCommand.objects.create(
+            customer=self.rahim, username="rahim", disable=False
+        )
+        results = bulk_toggle(Customer.objects.all(), False, client=self.router)
+
+        outcomes = {result["id"]: result["status"] for result in results}
+        self.assertEqual(
+            outcomes,
+            {
+                self.rahim.pk: "updated",
+                self.karim.pk: "updated",
+                self.unknown.pk: "failed",
+                self.local.pk: "failed",
+            },
+        )
+        # One list of each, a PATCH only where the router differs
+        self.assertEqual(
+            sorted(self.router.calls),
+            [
+                ("delete", "/ppp/active/*A0"),
+                ("delete", "/ppp/active/*A1"),
+                ("print", "/ppp/active"),
+                ("print", "/ppp/secret"),
+                ("set", "/ppp/secret/*1"),
+            ],
+        )
+        self.assertEqual(
+            set(Customer.objects.filter(is_active=False).values_list("pk", flat=True)),
+            {self.rahim.pk, self.karim.pk},
+        )
+        self.assertEqual(Customer.objects.get(pk=self.karim.pk).secret_id, "*2")
+        snapshot = DashboardMetrics.objects.get()
+        self.assertEqual(
+            snapshot.active_customers, recompute_dashboard_metrics().active_customers
+        )
+        # The queued enable is older than the suspension just pushed
+        queued.refresh_from_db()
+        self.assertEqual(queued.state, RouterCommandState.SUPERSEDED)
+
+    def test_customers_in_the_target_state_are_skipped(self):
+        results = bulk_toggle(Customer.objects.all(), True, client=self.router)
+        self.assertEqual(results, [])
+        self.assertEqual(self.router.calls, [])
+
+    def test_concurrency(self):
+        names = [f"user{index}" for index in range(16)]
+        for name in names:
+            CustomerFactory(package=self.package, username=name)
+        router = FakeRouter(dict.fromkeys(names, "false"), delay=0.02)
+
+        results = bulk_toggle(
+            Customer.objects.filter(username__in=names),
+            False,
+            concurrency=4,
+            rate=0,
+            client=router,
+        )
+        self.assertTrue(all(result["status"] == "updated" for result in results))
+        self.assertEqual(router.peak, 4)
+
+    def test_rate_limit(self):
+        limiter = RateLimiter(100)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+    def test_progress(self):
+        done = []
+        with patch("customer.services.suspension.PROGRESS_EVERY", 1):
+            bulk_toggle(
+                Customer.objects.all(), False, client=self.router, progress=done.append
+            )
+        self.assertEqual(done, [1, 2, 3])
+
+    def test_long_run_is_not_taken_over(self):
+        """Test that a toggle past STALE_TOGGLE_AFTER isn't claimed again"""
+        run = enqueue_bulk_toggle(Customer.objects.all(), False)
+        self.assertTrue(claim_bulk_toggle(run))
+        claimable = []
+
+        def long_toggle(customers, is_active, concurrency=None, progress=None):
+            long_ago = timezone.now() - STALE_TOGGLE_AFTER * 2
+            BulkToggleRun.objects.filter(pk=run.pk).update(updated_at=long_ago)
+            progress(100)
+            claimable.append(queued_bulk_toggles().filter(pk=run.pk).exists())
+            return []
+
+        with patch("customer.services.suspension.bulk_toggle", long_toggle):
+            run_bulk_toggle(run)
+        self.assertEqual(claimable, [False])
+
+    def test_api(self):
+        """Test that the toggle is queued, run by the worker and then polled"""
+        self.client.force_authenticate(UserFactory(kind=UserKind.ADMIN))
+        response = self.client.post(
+            "/api/v1/customers/status/bulk", {"is_active": False}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(
+            "/api/v1/customers/status/bulk?package_id=" + str(self.package.pk),
+            {"is_active": False, "uids": [str(self.rahim.uid)]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["state"], BillingRunState.PENDING)
+        self.assertEqual(self.router.calls, [])
+        url = f"/api/v1/customers/status/bulk/{response.data['job_id']}"
+
+        with patch(
+            "customer.services.suspension.get_mikrotik_client", return_value=self.router
+        ):
+            call_command("run_jobs", "--once", stdout=StringIO())
+
+        response = self.client.get(url)
+        self.assertEqual(response.data["state"], BillingRunState.COMPLETED)
+        self.assertEqual(response.data["customers_total"], 1)
+        self.assertEqual(
+            (response.data["updated_count"], response.data["failed_count"]), (1, 0)
+        )
+        self.assertEqual(response.data["results"][0]["username"], "rahim")
+        self.assertFalse(Customer.objects.get(pk=self.rahim.pk).is_active)
+
+    def test_command(self):
+        out = StringIO()
+        with patch(
+            "customer.services.suspension.get_mikrotik_client", return_value=self.router
+        ):
+            call_command(
+                "bulk_toggle",
+                "--suspend",
+                "--filter",
+                f"package_id={self.package.pk}",
+                stdout=out,
+                stderr=StringIO(),
+            )
+        self.assertIn("Updated 2 customer(s), 2 failed", out.getvalue())
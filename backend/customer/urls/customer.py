@@ -2,17 +2,31 @@ from django.urls import path
 
 from customer.views.customer import (
     CustomerList,
+    CustomerBulkCreate,
+    CustomerSearch,
     CustomerDetail,
     CustomerPaymentsList,
     GenerateBill,
+    BillingRunDetail,
     StatusToggle,
+    BulkStatusToggle,
+    BulkStatusToggleDetail,
 )
 
 
 urlpatterns = [
     path("", CustomerList.as_view(), name="customer-list"),
+    path("/bulk", CustomerBulkCreate.as_view(), name="customer-bulk"),
+    path("/search", CustomerSearch.as_view(), name="customer-search"),
     path("/<str:uid>", CustomerDetail.as_view(), name="customer-detail"),
     path("/<str:uid>/payments", CustomerPaymentsList.as_view(), name="customer-detail"),
     path("/bills/generate", GenerateBill.as_view(), name="generate-bill"),
+    path("/bills/runs/<str:uid>", BillingRunDetail.as_view(), name="billing-run-detail"),
     path("/status/toggle", StatusToggle.as_view(), name="toggle-status"),
+    path("/status/bulk", BulkStatusToggle.as_view(), name="bulk-toggle-status"),
+    path(
+        "/status/bulk/<str:uid>",
+        BulkStatusToggleDetail.as_view(),
+        name="bulk-toggle-status-detail",
+    ),
 ]
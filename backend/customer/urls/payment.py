@@ -1,8 +1,9 @@
 from django.urls import path
 
-from customer.views.payment import PaymentsList, PaymentDetail
+from customer.views.payment import PaymentsList, PaymentsBulkCreate, PaymentDetail
 
 urlpatterns = [
     path("", PaymentsList.as_view(), name="payment-list"),
+    path("/bulk", PaymentsBulkCreate.as_view(), name="payment-bulk"),
     path("/<str:uid>", PaymentDetail.as_view(), name="payment-detail"),
 ]
@@ -1,92 +1,229 @@
+import logging
+from datetime import date
+
 import requests
-from django.conf import settings
+from django.utils import timezone
+
+from customer.choices import Months
+from customer.services.mikrotik import get_mikrotik_client
+
+logger = logging.getLogger(__name__)
+
+
+def current_billing_period():
+    """Return the first day of the current month."""
+    return timezone.localdate().replace(day=1)
+
+
+def billing_period_month(period):
+    """Return the `Months` value (e.g. "JANUARY") for a billing period."""
+    return Months.values[period.month - 1]
+
+
+def billing_period_from_month(month, reference=None):
+    """
+    Resolve a bare month name (e.g. "JANUARY") to a billing period.
+
+    Picks the most recent occurrence of that month relative to `reference`
+    (today by default), allowing one month ahead for advance billing. So in
+    January, "DECEMBER" means last December and "FEBRUARY" means next month.
+    """
+    reference = reference or timezone.localdate()
+    month_number = Months.values.index(month.upper()) + 1
+    offset = (month_number - reference.month) % 12
+    if offset > 1:
+        offset -= 12
+    return shift_billing_period(reference, offset)
+
+
+def shift_billing_period(period, months):
+    """Return the billing period `months` months after (or before) `period`."""
+    months = period.year * 12 + period.month - 1 + months
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def parse_billing_period(value, reference=None):
+    """
+    Parse "YYYY-MM", "YYYY-MM-DD" or a month name into a billing period.
+
+    Raises:
+        ValueError: If the value can't be parsed.
+    """
+    value = (value or "").strip()
+    if value.upper() in Months.values:
+        return billing_period_from_month(value, reference)
+    parts = value.split("-")
+    if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
+        raise ValueError(f"Invalid billing period: {value!r}")
+    return date(int(parts[0]), int(parts[1]), 1)
+
+
+def find_ppp_secret_id(username, client):
+    """
+    Return the router's `.id` of the PPP secret named `username`.
+
+    Returns:
+        tuple: (secret_id or None, error message or None)
+    """
+    response = client.print(
+        "/ppp/secret", query=[f"name={username}"], proplist=[".id", "name"]
+    )
+    if response.status_code != 200:
+        return None, f"Failed to query user: HTTP {response.status_code}"
+    data = response.json()
+    if not data:
+        return None, "User not found in PPP secrets"
+    return data[0][".id"], None
+
 
-MIKROTIK_URL = settings.MIKROTIK_URL
-MIKROTIK_USER = settings.MIKROTIK_USER
-MIKROTIK_PASS = settings.MIKROTIK_PASS
+def find_ppp_session_ids(username, client):
+    """`.id`s of `username`'s active PPP sessions, None if the query failed."""
+    response = client.print(
+        "/ppp/active", query=[f"name={username}"], proplist=[".id", "name"]
+    )
+    if response.status_code != 200:
+        return None
+    return [session[".id"] for session in response.json()]
 
 
-def toggle_ppp_user(username, disable=True):
+def set_ppp_secret_disabled(username, disable, client, secret_id=""):
+    """
+    PATCH the `disabled` flag of `username`'s PPP secret.
+
+    A known `secret_id` is patched directly, in one round trip, and the name
+    the router answers with is checked. It is looked up by name when there is
+    none, the router no longer has it (404) or it now belongs to another user,
+    whose flag is then put back, see restore_ppp_secret.
+
+    Returns:
+        tuple: (success: bool, message: str, secret_id: str)
+    """
+    values = {"disabled": "true" if disable else "false"}
+    if secret_id:
+        patch_resp = client.set(f"/ppp/secret/{secret_id}", values)
+        if patch_resp.status_code == 200:
+            name = patch_resp.json().get("name")
+            if name == username:
+                return True, "User updated successfully", secret_id
+            logger.error(f"PPP secret {secret_id} belongs to {name}, not {username}")
+            restore_ppp_secret(secret_id, name, client)
+        elif patch_resp.status_code != 404:
+            error_detail = patch_resp.json().get("message", "Unknown error")
+            return False, f"Failed to update user: {error_detail}", secret_id
+
+    secret_id, error = find_ppp_secret_id(username, client)
+    if error:
+        return False, error, ""
+    patch_resp = client.set(f"/ppp/secret/{secret_id}", values)
+    if patch_resp.status_code != 200:
+        error_detail = patch_resp.json().get("message", "Unknown error")
+        return False, f"Failed to update user: {error_detail}", secret_id
+    return True, "User updated successfully", secret_id
+
+
+def restore_ppp_secret(secret_id, name, client):
+    """
+    Put back the `disabled` flag of `name`'s secret after a PATCH meant for
+    another user, from `name`'s customer status. Returns whether it was.
+    """
+    # customer.models imports this module
+    from customer.models import Customer
+
+    is_active = (
+        Customer.objects.filter(username=name)
+        .values_list("is_active", flat=True)
+        .first()
+    )
+    if is_active is None:
+        logger.error(f"No customer {name} to restore PPP secret {secret_id} from")
+        return False
+    response = client.set(
+        f"/ppp/secret/{secret_id}", {"disabled": "false" if is_active else "true"}
+    )
+    if response.status_code != 200:
+        logger.error(
+            f"Failed to restore PPP secret {secret_id} of {name}: "
+            f"HTTP {response.status_code}"
+        )
+        return False
+    return True
+
+
+def toggle_ppp_user(
+    username, disable=True, client=None, secret_id="", sessions=None
+):
     """
     Enable or disable a PPP user on MikroTik and optionally terminate their active session.
 
     Args:
         username (str): The PPP username (name field in /ppp secret)
         disable (bool): If True, disables the user. If False, enables them.
+        client (MikroTikClient): Defaults to the shared, pooled client.
+        secret_id (str): The secret's router `.id` if known, skips the lookup.
+        sessions (ActiveSessionIndex): Find the session to terminate in this
+            index shared by a batch, instead of querying the router for it.
 
     Returns:
         tuple: (success: bool, message: str)
     """
-    if not username:
-        return False, "Username is required to toggle user status"
-    try:
-        # Step 1: Find the PPP secret by username
-        query_url = f"{MIKROTIK_URL}/rest/ppp/secret/print"
-        response = requests.post(
-            query_url,
-            json={".query": [f"name={username}"]},
-            auth=(MIKROTIK_USER, MIKROTIK_PASS),
-            verify=False,  # Set to True in production with valid CA
-        )
+    success, message, _ = _toggle_ppp_user(
+        username, disable, client, secret_id, sessions
+    )
+    return success, message
 
-        if response.status_code != 200:
-            return False, f"Failed to query user: HTTP {response.status_code}"
 
-        data = response.json()
+def toggle_customer(customer, disable=True, client=None, sessions=None):
+    """
+    `toggle_ppp_user` for a customer, using and keeping up to date its stored
+    `secret_id`.
 
-        if not data:
-            return False, "User not found in PPP secrets"
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    success, message, secret_id = _toggle_ppp_user(
+        customer.username, disable, client, customer.secret_id, sessions
+    )
+    if secret_id and secret_id != customer.secret_id:
+        customer.secret_id = secret_id
+        if customer.pk:
+            # update() so it's stored without the save signals toggling again
+            type(customer).objects.filter(pk=customer.pk).update(secret_id=secret_id)
+    return success, message
 
-        secret = data[0]
-        secret_id = secret[".id"]
-        disabled_str = "true" if disable else "false"
 
-        # Step 2: Update the 'disabled' status of the PPP secret
-        patch_url = f"{MIKROTIK_URL}/rest/ppp/secret/{secret_id}"
-        patch_resp = requests.patch(
-            patch_url,
-            json={"disabled": disabled_str},
-            auth=(MIKROTIK_USER, MIKROTIK_PASS),
-            verify=False,
+def _toggle_ppp_user(username, disable, client, secret_id, sessions=None):
+    if not username:
+        return False, "Username is required to toggle user status", secret_id
+    client = client or get_mikrotik_client()
+    try:
+        # Step 1 and 2: Update the 'disabled' status of the PPP secret
+        success, message, secret_id = set_ppp_secret_disabled(
+            username, disable, client, secret_id
         )
+        if not success:
+            return False, message, secret_id
 
-        if patch_resp.status_code != 200:
-            error_detail = patch_resp.json().get("message", "Unknown error")
-            return False, f"Failed to update user: {error_detail}"
-
-        # Step 3: If disabling, check and terminate active session
+        # Step 3: If disabling, terminate their active session
         if disable:
-            active_sessions_url = f"{MIKROTIK_URL}/rest/ppp/active"
-            active_resp = requests.get(
-                active_sessions_url,
-                auth=(MIKROTIK_USER, MIKROTIK_PASS),
-                verify=False,
-            )
-
-            if active_resp.status_code == 200:
-                active_sessions = active_resp.json()
-                for session in active_sessions:
-                    if session.get("name") == username:
-                        session_id = session[".id"]
-                        delete_url = f"{MIKROTIK_URL}/rest/ppp/active/{session_id}"
-                        delete_resp = requests.delete(
-                            delete_url,
-                            auth=(MIKROTIK_USER, MIKROTIK_PASS),
-                            verify=False,
-                        )
-                        if delete_resp.status_code == 200:
-                            print(f"Terminated active session for {username}")
-                        else:
-                            print(
-                                f"Failed to terminate session {session_id}: {delete_resp.text}"
-                            )
-                        break  # Only one session per user typically
+            if sessions is not None:
+                session_id = sessions.pop(username)
+                session_ids = [session_id] if session_id else []
             else:
-                print("Warning: Could not fetch active sessions")
+                session_ids = find_ppp_session_ids(username, client)
+            if session_ids is None:
+                logger.warning(f"Could not fetch active sessions of {username}")
+            for session_id in session_ids or ():
+                delete_resp = client.delete(f"/ppp/active/{session_id}")
+                if delete_resp.status_code in (200, 204):
+                    logger.info(f"Terminated active session for {username}")
+                else:
+                    logger.warning(
+                        f"Failed to terminate session {session_id}: {delete_resp.text}"
+                    )
 
-        return True, "User updated successfully"
+        return True, "User updated successfully", secret_id
 
     except requests.exceptions.RequestException as e:
-        return False, f"Network error: {str(e)}"
+        return False, f"Network error: {str(e)}", secret_id
     except Exception as e:
-        return False, f"Unexpected error: {str(e)}"
+        return False, f"Unexpected error: {str(e)}", secret_id
@@ -1,15 +1,27 @@
-from django.utils import timezone
-from django.db.models import Q, Count, Sum
+from django.db.models import Q, Count
 
 from rest_framework import status
 from rest_framework.views import APIView
-from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
+from rest_framework.generics import (
+    ListCreateAPIView,
+    RetrieveAPIView,
+    RetrieveUpdateDestroyAPIView,
+)
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
 
 
 # from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 
+from common.filters import IndexedFilterBackend, apply_query_filters
+from common.views import (
+    BulkWriteView,
+    ConditionalGetMixin,
+    ProjectionListMixin,
+    SparseFieldsViewMixin,
+)
+from core.models import User
 from core.permissions import (
     IsAdminUser,
     IsAuthenticated,
@@ -19,19 +31,41 @@ from core.permissions import (
     AllowAny,
 )
 
-from customer.models import Customer, Payment, Package
+from customer.choices import BillingRunState
+from customer.filters import CUSTOMER_FILTERS
+from customer.models import Customer, Payment, Package, BillingRun, BulkToggleRun
+from customer.serializers.billing import BillingRunSerializer
 from customer.serializers.customer import (
     CustomerListSerializer,
+    CustomerBulkSerializer,
     CustomerDetailSerializer,
     StatusToggleSerializer,
+    BulkStatusToggleSerializer,
+    BulkToggleRunSerializer,
 )
 from customer.serializers.payment import PaymentListSerializer
-from customer.utils import toggle_ppp_user
+from customer.services.billing import enqueue_billing_run
+from customer.services.bulk import create_customers
+from customer.services.dashboard import (
+    get_current_snapshot,
+    get_dashboard_metrics,
+)
+from customer.services.search import DEFAULT_SEARCH_LIMIT, search_customers
+from customer.services.suspension import enqueue_bulk_toggle
+from customer.utils import (
+    current_billing_period,
+    parse_billing_period,
+)
 
 
-class CustomerList(ListCreateAPIView):
+class CustomerList(
+    ConditionalGetMixin, SparseFieldsViewMixin, ProjectionListMixin, ListCreateAPIView
+):
     serializer_class = CustomerListSerializer
     permission_classes = [IsAdminUser | IsManager | IsStaff]
+    filter_backends = [IndexedFilterBackend]
+    query_filters = CUSTOMER_FILTERS
+    conditional_models = (Customer, Package)
 
     # def get_permissions(self):
     #     if self.request.method in SAFE_METHODS:
@@ -41,37 +75,48 @@ class CustomerList(ListCreateAPIView):
     #     ]  # Only Admin and Manager can create customers
 
     def get_queryset(self):
-        queryset = Customer().get_all_actives().select_related("package")
-        name: str = self.request.query_params.get("name", None)
-        username: str = self.request.query_params.get("username", None)
-        user_id: int = self.request.query_params.get("user_id", None)
-        phone: str = self.request.query_params.get("phone", None)
-        package_id = self.request.query_params.get("package_id", None)
-        is_active: bool = self.request.query_params.get("is_active", None)
-        is_free: bool = self.request.query_params.get("is_free", None)
-        if is_free:
-            queryset = queryset.filter(is_free=is_free)
-        if username:
-            queryset = queryset.filter(username__icontains=username)
-        if is_active:
-            queryset = queryset.filter(is_active=is_active.lower() == "true")
-        if name:
-            queryset = queryset.filter(name__icontains=name)
-        if user_id:
-            queryset = queryset.filter(user_id=user_id)
-        if phone:
-            queryset = queryset.filter(phone=phone)
-        if package_id:
-            queryset = queryset.filter(package_id=package_id)
-
-        return queryset
-
-
-class CustomerDetail(RetrieveUpdateDestroyAPIView):
+        return Customer().get_all_actives().select_related("package")
+
+
+class CustomerBulkCreate(BulkWriteView):
+    """Create up to `max_items` customers in one request."""
+
+    serializer_class = CustomerBulkSerializer
+    permission_classes = [IsAdminUser | IsManager | IsStaff]
+
+    def perform_bulk(self, entries, user):
+        return create_customers(entries, user)
+
+
+class CustomerSearch(APIView):
+    """
+    Ranked search over customer name, username, phone, NID, MAC and IP.
+
+    Query params: `q` and `limit` (default 20, at most 100).
+    """
+
+    permission_classes = [IsAdminUser | IsManager | IsStaff]
+    max_limit = 100
+
+    def get(self, request, *args, **kwargs):
+        q = request.query_params.get("q", "")
+        try:
+            limit = int(request.query_params.get("limit", DEFAULT_SEARCH_LIMIT))
+        except ValueError:
+            raise ValidationError({"limit": "Must be an integer."})
+        limit = max(1, min(limit, self.max_limit))
+
+        customers = search_customers(q, limit)
+        serializer = CustomerListSerializer(customers, many=True)
+        return Response({"results": serializer.data}, status=status.HTTP_200_OK)
+
+
+class CustomerDetail(ConditionalGetMixin, RetrieveUpdateDestroyAPIView):
     queryset = Customer().get_all_actives().select_related("package", "user")
     serializer_class = CustomerDetailSerializer
     permission_classes = [IsAdminUser | IsManager | IsStaff]
     lookup_field = "uid"
+    conditional_models = (Customer, Package, User)
 
     def get_permissions(self):
         if self.request.method in SAFE_METHODS:
@@ -81,7 +126,9 @@ class CustomerDetail(RetrieveUpdateDestroyAPIView):
         ]  # Only Admin and Manager can modify customers
 
 
-class CustomerPaymentsList(ListCreateAPIView):
+class CustomerPaymentsList(
+    SparseFieldsViewMixin, ProjectionListMixin, ListCreateAPIView
+):
     serializer_class = PaymentListSerializer
     permission_classes = [IsAdminUser | IsManager | IsStaff]
 
@@ -103,114 +150,91 @@ class CustomerPaymentsList(ListCreateAPIView):
 
 class GenerateBill(APIView):
     """
-    Placeholder for GenerateBill API view.
-    This can be implemented later as per requirements.
+    Queue generation of unpaid bills for every active, paying customer for a
+    month. The `run_jobs` worker does the work; poll the returned job id.
     """
 
     permission_classes = [IsAdminUser | IsManager]
 
     def post(self, request, *args, **kwargs):
-        month = request.query_params.get("month", timezone.now().strftime("%B").upper())
-
-        # Step 1: Get all active customers
-        active_customers = Customer.objects.filter(
-            is_active=True, is_free=False, package__price__gt=0
-        ).select_related("package")
-
-        # Step 2: Get customer IDs with existing payments for current month
-        existing_payments = Payment.objects.filter(billing_month=month)
-        paid_customer_ids = set(existing_payments.values_list("customer_id", flat=True))
-
-        # Step 3: Filter customers who haven't been billed
-        customers_to_bill = [
-            c for c in active_customers if c.id not in paid_customer_ids
-        ]
-
-        # Step 4: Create payment records in bulk
-        payments_to_create = []
-        for customer in customers_to_bill:
-            bill_amount = customer.package.price if customer.package else 0.0
-            payments_to_create.append(
-                Payment(
-                    customer=customer,
-                    bill_amount=bill_amount,
-                    amount=0.0,
-                    billing_month=month,
-                    payment_method="OTHER",
-                    paid=False,
-                    note=f"Auto-generated bill for {month}",
-                )
-            )
+        period = request.query_params.get(
+            "period", request.query_params.get("month", None)
+        )
+        try:
+            period = parse_billing_period(period) if period else current_billing_period()
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Bulk create payments
-        Payment.objects.bulk_create(payments_to_create)
+        run, created = enqueue_billing_run(period)
 
         return Response(
             {
-                "message": f"Billing for {month} processed.",
-                "created_payments_count": len(payments_to_create),
-                # "payments": payments_to_create,
-            }
+                "message": (
+                    f"Billing for {period:%B %Y} queued."
+                    if created
+                    else f"Billing for {period:%B %Y} is already {run.state.lower()}."
+                ),
+                "job_id": run.uid,
+                "billing_period": period,
+                "state": run.state,
+            },
+            status=status.HTTP_202_ACCEPTED,
         )
 
 
-class Dashboard(APIView):
+class BillingRunDetail(RetrieveAPIView):
     """
-    Optimized dashboard API returning key metrics and recent activity.
+    API to check the progress of a bill generation job.
     """
 
-    permission_classes = [IsAuthenticated]
-
-    def get(self, request, *args, **kwargs):
-        now = timezone.now()
-        current_month = now.strftime("%B").upper()  # e.g., "April"
-        # thirty_days_ago = now - timezone.timedelta(days=30)
+    queryset = BillingRun.objects.annotate(
+        ranges_total=Count("ranges"),
+        ranges_completed=Count(
+            "ranges", filter=Q(ranges__state=BillingRunState.COMPLETED)
+        ),
+    )
+    serializer_class = BillingRunSerializer
+    permission_classes = [IsAdminUser | IsManager]
+    lookup_field = "uid"
 
-        # === 1. Aggregated Stats ===
-        customer_stats = Customer.objects.aggregate(
-            total=Count("id"), active=Count("id", filter=Q(is_active=True))
-        )
 
-        package_stats = Package.objects.aggregate(total=Count("id"))
+class Dashboard(ConditionalGetMixin, APIView):
+    """
+    Optimized dashboard API returning key metrics and recent activity.
+    """
 
-        payment_stats = Payment.objects.aggregate(
-            total_paid=Count("id", filter=Q(paid=True)),
-            total_amount=Sum("amount", filter=Q(paid=True)),
-            pending=Count("id", filter=Q(paid=False)),
-            current_month_count=Count(
-                "id", filter=Q(paid=True, billing_month=current_month)
-            ),
-        )
+    permission_classes = [IsAuthenticated]
+    snapshot = None
+
+    def get_validators(self, request):
+        # The snapshot row changes whenever a number on the dashboard does,
+        # recomputes included. Nothing in the body may change without it, so
+        # the metrics' age is left to clients, from metrics_recomputed_at
+        self.snapshot = get_current_snapshot()
+        if self.snapshot is None:
+            return None, None
+        updated_at = self.snapshot.updated_at
+        return updated_at, updated_at.timestamp()
 
-        # === 2. Recent Data ===
-        # recent_customers = (
-        #     Customer.objects.filter(created_at__gte=thirty_days_ago)
-        #     .select_related("package")
-        #     .order_by("-created_at")[:10]
-        # )
+    def get(self, request, *args, **kwargs):
+        return self.conditional_get(request, self.get_dashboard, *args, **kwargs)
 
-        # recent_payments = (
-        #     Payment.objects.filter(paid=True, created_at__gte=thirty_days_ago)
-        #     .select_related("customer", "entry_by")
-        #     .order_by("-created_at")[:10]
-        # )
+    def get_dashboard(self, request, *args, **kwargs):
+        # Served from a snapshot kept up to date on writes, see
+        # customer.services.dashboard
+        metrics = self.snapshot or get_dashboard_metrics()
 
-        # === 3. Response ===
         return Response(
             {
-                "total_customers": customer_stats["total"],
-                "active_customers": customer_stats["active"],
-                "total_packages": package_stats["total"],
-                "total_payments": payment_stats["total_paid"],
-                "total_revenue": f"{payment_stats['total_amount'] or 0.0:.2f}",
-                "pending_payments": payment_stats["pending"],
-                "current_month_payments": payment_stats["current_month_count"],
-                # "recent_customers": CustomerListSerializer(
-                #     recent_customers, many=True
-                # ).data,
-                # "recent_payments": PaymentListSerializer(
-                #     recent_payments, many=True
-                # ).data,
+                "total_customers": metrics.total_customers,
+                "active_customers": metrics.active_customers,
+                "total_packages": metrics.total_packages,
+                "total_payments": metrics.paid_payments,
+                "total_revenue": f"{metrics.total_revenue:.2f}",
+                "pending_payments": metrics.pending_payments,
+                "current_month_payments": metrics.current_period_paid_payments,
+                "metrics_updated_at": metrics.updated_at,
+                "metrics_recomputed_at": metrics.recomputed_at,
             },
             status=status.HTTP_200_OK,
         )
@@ -218,7 +242,8 @@ class Dashboard(APIView):
 
 class StatusToggle(APIView):
     """
-    API to toggle the status of a customer.
+    API to toggle the status of a customer. The router is updated by the
+    dispatch_router_commands worker.
     """
 
     permission_classes = [IsAdminUser | IsManager]
@@ -237,11 +262,66 @@ class StatusToggle(APIView):
                 {"error": "Customer not found."},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        customer.is_active = is_active
-        success, message = toggle_ppp_user(username, not is_active)
-        if not success:
-            return Response({"error": message}, status=status.HTTP_400_BAD_REQUEST)
+        if customer.is_active == is_active:
+            return Response(
+                {"message": "Customer status is unchanged."}, status=status.HTTP_200_OK
+            )
 
+        # Queues the router command in the same transaction, see customer.signals
+        customer.is_active = is_active
         customer.save(update_fields=["is_active"])
 
-        return Response({"message": message}, status=status.HTTP_200_OK)
+        return Response(
+            {"message": "Status updated, the router change is queued."},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class BulkStatusToggle(APIView):
+    """
+    Queue the suspension or reactivation of many customers, e.g.
+    `?has_dues=true` after the due date. Takes the customer list's query
+    filters and/or a list of `uids`. The `run_jobs` worker makes the router
+    calls; poll the returned job id.
+    """
+
+    permission_classes = [IsAdminUser | IsManager]
+    serializer_class = BulkStatusToggleSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        uids = serializer.validated_data.get("uids")
+
+        customers = Customer().get_all_actives()
+        if uids:
+            customers = customers.filter(uid__in=uids)
+        filtered = apply_query_filters(customers, CUSTOMER_FILTERS, request.query_params)
+        if not uids and filtered is customers:
+            # Never toggle every customer by accident
+            raise ValidationError({"uids": "Pass uids or a filter."})
+
+        run = enqueue_bulk_toggle(
+            filtered,
+            serializer.validated_data["is_active"],
+            concurrency=serializer.validated_data.get("concurrency"),
+        )
+        return Response(
+            {
+                "message": f"Toggling {len(run.customer_ids)} customer(s) queued.",
+                "job_id": run.uid,
+                "state": run.state,
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class BulkStatusToggleDetail(RetrieveAPIView):
+    """
+    API to check the progress and results of a bulk status toggle.
+    """
+
+    queryset = BulkToggleRun.objects.all()
+    serializer_class = BulkToggleRunSerializer
+    permission_classes = [IsAdminUser | IsManager]
+    lookup_field = "uid"
@@ -14,6 +14,11 @@ from customer.serializers.package import (
 )
 
 from customer.serializers.customer import CustomerListSerializer
+from common.views import (
+    ConditionalGetMixin,
+    SparseFieldsViewMixin,
+    StreamingListMixin,
+)
 from core.permissions import (
     AllowAny,
     IsAuthenticated,
@@ -24,12 +29,15 @@ from core.permissions import (
 )
 
 
-class PackageList(ListCreateAPIView):
+class PackageList(
+    ConditionalGetMixin, SparseFieldsViewMixin, StreamingListMixin, ListCreateAPIView
+):
     """API view to list and create packages."""
 
     queryset = Package().get_all_actives()
     serializer_class = PackageListSerializer
     permission_classes = [IsAdminUser | IsManager | IsStaff]
+    conditional_models = (Package,)
 
     def get_permissions(self):
         if self.request.method in SAFE_METHODS:
@@ -53,7 +61,7 @@ class PackageDetail(RetrieveUpdateDestroyAPIView):
         return [(IsAdminUser | IsManager)()]
 
 
-class PackageCustomerList(ListAPIView):
+class PackageCustomerList(SparseFieldsViewMixin, StreamingListMixin, ListAPIView):
     """API view to list customers of a package."""
 
     serializer_class = CustomerListSerializer
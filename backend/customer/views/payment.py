@@ -1,6 +1,16 @@
+from django.db import transaction
+
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework.permissions import SAFE_METHODS
 
+from common.filters import IndexedFilterBackend
+from common.views import (
+    BulkWriteView,
+    ConditionalGetMixin,
+    ProjectionListMixin,
+    SparseFieldsViewMixin,
+)
+from core.models import User
 from core.permissions import (
     IsAdminUser,
     IsAuthenticated,
@@ -9,16 +19,24 @@ from core.permissions import (
     IsStaff,
     AllowAny,
 )
-from customer.models import Payment
+from customer.filters import PAYMENT_FILTERS
+from customer.models import Customer, Payment
+from customer.services.balance import refresh_customer_balance
+from customer.services.bulk import record_payments
 from customer.serializers.payment import (
     PaymentListSerializer,
     PaymentDetailSerializer,
 )
 
 
-class PaymentsList(ListCreateAPIView):
+class PaymentsList(
+    ConditionalGetMixin, SparseFieldsViewMixin, ProjectionListMixin, ListCreateAPIView
+):
     serializer_class = PaymentListSerializer
     permission_classes = [IsAdminUser | IsManager | IsStaff]
+    filter_backends = [IndexedFilterBackend]
+    query_filters = PAYMENT_FILTERS
+    conditional_models = (Payment, Customer, User)
 
     # def get_permissions(self):
     #     if self.request.method in SAFE_METHODS:
@@ -28,27 +46,20 @@ class PaymentsList(ListCreateAPIView):
     # ]  # Only Admin and Manager can create payments
 
     def get_queryset(self):
-        paid: bool = self.request.query_params.get("paid", None)
-        queryset = Payment().get_all_actives().select_related("customer", "entry_by")
-        customer_name = self.request.query_params.get("customer_name", None)
-        customer_phone = self.request.query_params.get("customer_phone", None)
-        collected_by = self.request.query_params.get("collected_by", None)
-        month = self.request.query_params.get("month", None)
-        if paid:
-            paid = paid.lower() == "true"
-            queryset = queryset.filter(paid=paid)
-        if month:
-            queryset = queryset.filter(billing_month=month)
-        if collected_by:
-            queryset = queryset.filter(entry_by__first_name__icontains=collected_by)
-        if customer_phone:
-            queryset = (
-                Payment().get_all_actives().filter(customer__phone=customer_phone)
-            )
+        return Payment().get_all_actives().select_related("customer", "entry_by")
+
+
+class PaymentsBulkCreate(BulkWriteView):
+    """
+    Record up to `max_items` payments in one request, e.g. a day's
+    collections, with the same rules as a POST to PaymentsList.
+    """
 
-        if customer_name:
-            queryset = queryset.filter(customer__name__icontains=customer_name)
-        return queryset
+    serializer_class = PaymentListSerializer
+    permission_classes = [IsAdminUser | IsManager | IsStaff]
+
+    def perform_bulk(self, entries, user):
+        return record_payments(entries, user)
 
 
 class PaymentDetail(RetrieveUpdateDestroyAPIView):
@@ -64,3 +75,8 @@ class PaymentDetail(RetrieveUpdateDestroyAPIView):
 
         # Admin, Manager, or Staff can view or update
         return [IsAdminUser() or IsManager() or IsStaff()]
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        refresh_customer_balance(instance.customer_id)
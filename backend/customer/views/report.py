@@ -0,0 +1,136 @@
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.permissions import IsAdminUser, IsAuthenticated, IsManager
+
+from customer.choices import PaymentMethod
+from customer.services.report import REPORT_DIMENSIONS, revenue_report
+from customer.services.revenue import TIMESERIES_GROUPS, revenue_timeseries
+from customer.utils import (
+    current_billing_period,
+    parse_billing_period,
+    shift_billing_period,
+)
+
+MAX_TIMESERIES_MONTHS = 120
+
+
+class DashboardTimeseries(APIView):
+    """
+    Monthly billed/collected totals for trend charts, read from the revenue rollup.
+
+    Query params: `months` (default 24), `end` ("YYYY-MM", default current
+    period) and `group_by` (package, payment_method or entry_by).
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        try:
+            months = int(params.get("months", 24))
+        except ValueError:
+            raise ValidationError({"months": "Must be an integer."})
+        if not 1 <= months <= MAX_TIMESERIES_MONTHS:
+            raise ValidationError(
+                {"months": f"Must be between 1 and {MAX_TIMESERIES_MONTHS}."}
+            )
+
+        end = current_billing_period()
+        if params.get("end"):
+            try:
+                end = parse_billing_period(params["end"])
+            except ValueError as e:
+                raise ValidationError({"end": str(e)})
+
+        group_by = params.get("group_by") or None
+        if group_by and group_by not in TIMESERIES_GROUPS:
+            raise ValidationError(
+                {"group_by": f"Must be one of: {', '.join(TIMESERIES_GROUPS)}."}
+            )
+
+        start = shift_billing_period(end, 1 - months)
+        series = revenue_timeseries(start, end, group_by)
+        for row in series:
+            row["billing_period"] = row["billing_period"].strftime("%Y-%m")
+            for name in ("billed_amount", "collected_amount"):
+                row[name] = f"{row[name]:.2f}"
+
+        return Response(
+            {
+                "start": start.strftime("%Y-%m"),
+                "end": end.strftime("%Y-%m"),
+                "group_by": group_by,
+                "results": series,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+def query_list(params, name):
+    """Values of a query param given repeated and/or comma separated."""
+    return [
+        value.strip()
+        for param in params.getlist(name)
+        for value in param.split(",")
+        if value.strip()
+    ]
+
+
+class RevenueReport(APIView):
+    """
+    Billed/collected totals grouped by any of month, package, payment_method and
+    entry_by, with ROLLUP subtotals and a grand total.
+
+    Query params: `dimensions` (default month), `start`/`end` ("YYYY-MM") and
+    `package`, `payment_method`, `entry_by` filters (comma separated).
+    """
+
+    permission_classes = [IsAdminUser | IsManager]
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        dimensions = query_list(params, "dimensions") or ["month"]
+        unknown = set(dimensions) - set(REPORT_DIMENSIONS)
+        if unknown:
+            raise ValidationError(
+                {"dimensions": f"Must be any of: {', '.join(REPORT_DIMENSIONS)}."}
+            )
+
+        filters = {}
+        for name in ("start", "end"):
+            if params.get(name):
+                try:
+                    filters[name] = parse_billing_period(params[name])
+                except ValueError as e:
+                    raise ValidationError({name: str(e)})
+        for name in ("package", "entry_by"):
+            try:
+                filters[name] = [int(value) for value in query_list(params, name)]
+            except ValueError:
+                raise ValidationError({name: "Must be a list of ids."})
+        methods = query_list(params, "payment_method")
+        if set(methods) - set(PaymentMethod.values):
+            raise ValidationError(
+                {"payment_method": f"Must be any of: {', '.join(PaymentMethod.values)}."}
+            )
+        filters["payment_method"] = methods
+
+        results = []
+        for row in revenue_report(dimensions, filters):
+            row = dict(row)
+            if row.get("month") is not None:
+                row["month"] = row["month"].strftime("%Y-%m")
+            for name in ("billed_amount", "collected_amount"):
+                row[name] = f"{row[name]:.2f}"
+            results.append(row)
+
+        return Response(
+            {
+                "dimensions": [name for name in REPORT_DIMENSIONS if name in dimensions],
+                "results": results,
+            },
+            status=status.HTTP_200_OK,
+        )
@@ -255,7 +255,7 @@ export default function CustomerDetailPage() {
                           <div className="flex items-center justify-between">
                             <div>
                               <p className="text-sm font-medium text-gray-900">
-                                {payment.billing_month} {new Date().getFullYear()}
+                                {payment.billing_month} {payment.billing_period?.slice(0, 4) ?? new Date().getFullYear()}
                               </p>
                               <p className="text-sm text-gray-500">{payment.payment_method}</p>
                             </div>
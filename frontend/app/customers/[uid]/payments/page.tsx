@@ -408,7 +408,7 @@ export default function CustomerPaymentsPage() {
                   <tr key={payment.uid} className="hover:bg-gray-50">
                     <td className="px-6 py-4 whitespace-nowrap">
                       <div className="text-sm font-medium text-gray-900">
-                        {payment.billing_month} {new Date().getFullYear()}
+                        {payment.billing_month} {payment.billing_period?.slice(0, 4) ?? new Date().getFullYear()}
                       </div>
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap">
@@ -150,7 +150,7 @@ export default function CustomersPage() {
     
     try {
       await customerService.generateBills(month || undefined);
-      alert('Bills generated successfully!');
+      alert('Bill generation has been queued. New bills will appear shortly.');
       fetchData(); // Refresh the list to show new payments
     } catch (error) {
       console.error('Error generating bills:', error);
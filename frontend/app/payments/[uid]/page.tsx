@@ -137,7 +137,7 @@ export default function PaymentDetailPage() {
                   <div>
                     <label className="block text-sm font-medium text-gray-500">Billing Month</label>
                     <p className="mt-1 text-sm text-gray-900">
-                      {payment.billing_month} {new Date().getFullYear()}
+                      {payment.billing_month} {payment.billing_period?.slice(0, 4) ?? new Date().getFullYear()}
                     </p>
                   </div>
                   <div>
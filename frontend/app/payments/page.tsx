@@ -413,7 +413,7 @@ export default function PaymentsPage() {
                       </div>
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap">
-                      <div className="text-sm font-medium text-gray-900">{payment.billing_month} {new Date().getFullYear()}</div>
+                      <div className="text-sm font-medium text-gray-900">{payment.billing_month} {payment.billing_period?.slice(0, 4) ?? new Date().getFullYear()}</div>
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap">
                       <div>
@@ -124,6 +124,7 @@ export interface PaymentBase {
   bill_amount?: string; // Total bill amount for the payment
   amount?: string; // Decimal format from backend
   billing_month?: 'JANUARY' | 'FEBRUARY' | 'MARCH' | 'APRIL' | 'MAY' | 'JUNE' | 'JULY' | 'AUGUST' | 'SEPTEMBER' | 'OCTOBER' | 'NOVEMBER' | 'DECEMBER';
+  billing_period?: string; // First day of the billing month, YYYY-MM-DD
   payment_method?: 'BANK_TRANSFER' | 'BKASH' | 'CASH' | 'NAGAD' | 'MOBILE_BANKING' | 'ONLINE_PAYMENT' | 'ROCKET' | 'OTHER';
   paid?: boolean;
   transaction_id?: string;